@@ -0,0 +1,340 @@
+"""Benchmark the file analysis endpoints
+
+The benchmark generates measurement files of different sizes (see
+``benchmark.generate``) and requests
+
+- ``/files/analyze/{name}`` and
+- ``/files/analyze/meta/{name}``
+
+for each of them. Every request runs in a fresh process, so that the reported
+peak resident set size (RSS) only contains the memory used for this request.
+
+Example:
+
+    Run the default benchmark cases and store the results
+
+        python -m benchmark.file_routes --output bench_output.txt
+
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import subprocess
+import sys
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Any
+
+from benchmark.generate import create_measurement_file
+
+# -- Constants ----------------------------------------------------------------
+
+ENDPOINTS = {
+    "analyze": "files/analyze/{name}",
+    "meta": "files/analyze/meta/{name}",
+}
+"""Benchmarked endpoints"""
+
+DEFAULT_DURATIONS = (60, 600, 3600)
+"""Default measurement durations in seconds"""
+
+DEFAULT_CHANNELS = (1, 3)
+"""Default number of measurement channels"""
+
+# -- Classes ------------------------------------------------------------------
+
+# pylint: disable=too-many-instance-attributes
+
+
+@dataclass
+class BenchmarkResult:
+    """Result of a single benchmark request"""
+
+    endpoint: str
+    duration: float
+    channels: int
+    file_size: int
+    status_code: int
+    time_to_first_byte: float
+    total_time: float
+    bytes_streamed: int
+    peak_rss: int | None
+    baseline_rss: int | None
+
+
+# pylint: enable=too-many-instance-attributes
+
+# -- Functions ----------------------------------------------------------------
+
+
+def get_peak_rss() -> int | None:
+    """Get the peak resident set size of the current process in bytes
+
+    Returns:
+
+        The peak RSS or ``None`` if the platform does not support retrieving
+        this information
+
+    """
+
+    try:
+        # pylint: disable=import-outside-toplevel
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports the value in kibibytes, macOS in bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+async def request_endpoint(
+    measurement_dir: str, url: str
+) -> tuple[int, float, float, int]:
+    """Stream the response of an endpoint of the API
+
+    The request is passed to the ASGI application directly, since the ASGI
+    transport of HTTPX collects the whole response body before returning it.
+
+    Args:
+
+        measurement_dir:
+            The measurement directory used by the API
+
+        url:
+            The (relative) URL of the endpoint
+
+    Returns:
+
+        A tuple containing the status code, the time to first byte, the total
+        time and the number of received bytes
+
+    """
+
+    # pylint: disable=import-outside-toplevel
+    from icoapi.api import app
+    from icoapi.scripts.file_handling import get_measurement_dir
+
+    # pylint: enable=import-outside-toplevel
+
+    app.dependency_overrides[get_measurement_dir] = lambda: measurement_dir
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": f"/api/v1/{url}",
+        "raw_path": f"/api/v1/{url}".encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"benchmark")],
+        "client": ("127.0.0.1", 0),
+        "server": ("benchmark", 80),
+    }
+    status_code = 0
+    time_to_first_byte = 0.0
+    bytes_streamed = 0
+
+    request_sent = False
+    disconnected = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status_code, time_to_first_byte, bytes_streamed
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+        elif message["type"] == "http.response.body":
+            body = message.get("body", b"")
+            if body and bytes_streamed == 0:
+                time_to_first_byte = perf_counter() - start
+            bytes_streamed += len(body)
+
+    start = perf_counter()
+    await app(scope, receive, send)
+    total_time = perf_counter() - start
+    disconnected.set()
+
+    return status_code, time_to_first_byte, total_time, bytes_streamed
+
+
+def run_request(
+    measurement_dir: str, url: str, results: multiprocessing.Queue
+) -> None:
+    """Run a single benchmark request (in a child process)"""
+
+    baseline_rss = get_peak_rss()
+    status_code, ttfb, total_time, bytes_streamed = asyncio.run(
+        request_endpoint(measurement_dir, url)
+    )
+    results.put(
+        (status_code, ttfb, total_time, bytes_streamed, get_peak_rss(),
+         baseline_rss)
+    )
+
+
+def benchmark_file(
+    file_path: Path, endpoint: str, duration: float, channels: int
+) -> BenchmarkResult:
+    """Benchmark an endpoint for a single measurement file"""
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(
+        target=run_request,
+        args=(
+            str(file_path.parent),
+            ENDPOINTS[endpoint].format(name=file_path.name),
+            results,
+        ),
+    )
+    process.start()
+    status_code, ttfb, total_time, bytes_streamed, peak, baseline = (
+        results.get()
+    )
+    process.join()
+
+    return BenchmarkResult(
+        endpoint=endpoint,
+        duration=duration,
+        channels=channels,
+        file_size=file_path.stat().st_size,
+        status_code=status_code,
+        time_to_first_byte=ttfb,
+        total_time=total_time,
+        bytes_streamed=bytes_streamed,
+        peak_rss=peak,
+        baseline_rss=baseline,
+    )
+
+
+def get_revision() -> str | None:
+    """Get the current Git revision of the repository"""
+
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def add_output_argument(parser: argparse.ArgumentParser) -> None:
+    """Add the command line argument for storing benchmark results"""
+
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        help="append results as JSON lines to this file",
+    )
+
+
+def append_result(
+    output: Path, timestamp: str, revision: str | None, result: Any
+) -> None:
+    """Append a benchmark result (dataclass) as JSON line to a file"""
+
+    with output.open("a", encoding="utf-8") as output_file:
+        output_file.write(
+            json.dumps({
+                "timestamp": timestamp,
+                "revision": revision,
+                **asdict(result),
+            })
+            + "\n"
+        )
+
+
+def format_result(result: BenchmarkResult) -> str:
+    """Format a benchmark result as table row"""
+
+    def mebibytes(value: int | None) -> str:
+        return "–" if value is None else f"{value / 2**20:.1f}"
+
+    return (
+        f"{result.endpoint:<8} {result.duration:>7.0f} {result.channels:>3} "
+        f"{mebibytes(result.file_size):>9} {result.status_code:>4} "
+        f"{result.time_to_first_byte:>8.3f} {result.total_time:>8.3f} "
+        f"{mebibytes(result.bytes_streamed):>9} "
+        f"{mebibytes(result.peak_rss):>9}"
+    )
+
+
+def main() -> None:
+    """Run benchmark based on command line arguments"""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "-d",
+        "--durations",
+        type=float,
+        nargs="+",
+        default=DEFAULT_DURATIONS,
+        help="measurement durations in seconds (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-c",
+        "--channels",
+        type=int,
+        nargs="+",
+        choices=(1, 2, 3),
+        default=DEFAULT_CHANNELS,
+        help="numbers of measurement channels (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-e",
+        "--endpoints",
+        nargs="+",
+        choices=tuple(ENDPOINTS),
+        default=tuple(ENDPOINTS),
+        help="benchmarked endpoints (default: %(default)s)",
+    )
+    add_output_argument(parser)
+    arguments = parser.parse_args()
+
+    revision = get_revision()
+    timestamp = datetime.now().isoformat()
+    print(
+        f"{'endpoint':<8} {'seconds':>7} {'ch':>3} {'file MiB':>9} "
+        f"{'code':>4} {'ttfb s':>8} {'total s':>8} {'sent MiB':>9} "
+        f"{'peak MiB':>9}"
+    )
+    with TemporaryDirectory() as directory:
+        for duration in arguments.durations:
+            for channels in arguments.channels:
+                file_path = create_measurement_file(
+                    Path(directory) / f"benchmark_{duration:g}s_{channels}.hdf5",
+                    duration,
+                    channels,
+                )
+                for endpoint in arguments.endpoints:
+                    result = benchmark_file(
+                        file_path, endpoint, duration, channels
+                    )
+                    print(format_result(result), flush=True)
+                    if arguments.output:
+                        append_result(
+                            arguments.output, timestamp, revision, result
+                        )
+                file_path.unlink()
+
+
+if __name__ == "__main__":
+    main()
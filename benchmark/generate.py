@@ -0,0 +1,378 @@
+"""Generate realistic measurement files for benchmarks
+
+The generated files use the same layout as files written by
+``run_measurement``: an ``/acceleration`` table (written via the ICOtronic
+storage format), a ``/sensors`` table, picture arrays below the root node and
+embedded files below ``/embedded_files``.
+
+Example:
+
+    Create a ten minute measurement with three channels
+
+        python -m benchmark.generate --duration 600 --channels 3 out.hdf5
+
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import tables
+
+from icoapi.scripts.data_handling import SensorDescription, get_sensor_defaults
+
+# -- Constants ----------------------------------------------------------------
+
+SAMPLE_RATE = 9524
+"""Default ADC sample rate of a sensor node in Hz"""
+
+AXES = ("x", "y", "z")
+"""Column names of the measurement channels in the acceleration table"""
+
+CHUNK_SECONDS = 10
+"""Number of seconds of measurement data generated at once"""
+
+# -- Functions ----------------------------------------------------------------
+
+
+def get_rows_per_second(channels: int, sample_rate: float) -> float:
+    """Get the number of table rows stored per second of measurement
+
+    Args:
+
+        channels:
+            The number of enabled measurement channels
+
+        sample_rate:
+            The ADC sample rate in Hz
+
+    Returns:
+
+        The number of rows per second in the acceleration table
+
+    Examples:
+
+        >>> round(get_rows_per_second(1, 9524))
+        9524
+        >>> round(get_rows_per_second(3, 9524))
+        3175
+
+    """
+
+    # Every streaming message contains three values. For a single channel
+    # every value is stored in its own row, otherwise every message is one
+    # row containing the values of all channels.
+    messages_per_second = sample_rate / 3
+    return messages_per_second * 3 if channels == 1 else messages_per_second
+
+
+def create_acceleration_rows(
+    start_row: int,
+    number_of_rows: int,
+    channels: int,
+    rows_per_second: float,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """Create acceleration table rows containing a synthetic cutting signal
+
+    Args:
+
+        start_row:
+            The index of the first row that should be created
+
+        number_of_rows:
+            The number of rows that should be created
+
+        channels:
+            The number of enabled measurement channels
+
+        rows_per_second:
+            The number of rows stored per second
+
+        rng:
+            The random number generator used for the noise part of the signal
+
+    Returns:
+
+        A structured array that can be appended to the acceleration table
+
+    """
+
+    samples_per_message = 3 if channels == 1 else 1
+    rows = np.arange(start_row, start_row + number_of_rows, dtype=np.int64)
+    messages = rows // samples_per_message
+    message_rate = rows_per_second / samples_per_message
+
+    dtype: list[tuple[str, type]] = [
+        ("counter", np.uint8),
+        ("timestamp", np.uint64),
+    ]
+    dtype.extend((axis, np.float32) for axis in AXES[:channels])
+    data = np.empty(number_of_rows, dtype=dtype)
+    data["counter"] = messages % 256
+    data["timestamp"] = (messages / message_rate * 1_000_000).astype(
+        np.uint64
+    )
+
+    seconds = rows / rows_per_second
+    for index, axis in enumerate(AXES[:channels]):
+        frequency = 120 * (index + 1)
+        data[axis] = (
+            np.sin(2 * np.pi * frequency * seconds)
+            + 0.3 * np.sin(2 * np.pi * 3.7 * frequency * seconds)
+            + rng.normal(0, 0.2, number_of_rows)
+        )
+
+    return data
+
+
+def create_metadata() -> str:
+    """Create serialized pre or post measurement metadata"""
+
+    return json.dumps({
+        "version": "1.0",
+        "profile": "benchmark",
+        "parameters": {
+            "tool_name": {"value": "Benchmark Tool", "unit": "string"},
+            "spindle_speed": {"value": 12000, "unit": "rpm"},
+            "feed_rate": {"value": 0.12, "unit": "mm"},
+        },
+    })
+
+
+def create_picture(size: int, rng: np.random.Generator) -> bytes:
+    """Create a base64 encoded (fake) JPEG data URL of the given size"""
+
+    payload = b"\xff\xd8\xff\xe0" + rng.bytes(max(size - 4, 0))
+    encoded = base64.b64encode(payload).decode("ascii")
+    return f"data:image/jpeg;base64,{encoded}".encode("utf-8")
+
+
+def add_pictures(
+    hdf5_file: tables.File,
+    pictures: int,
+    picture_size: int,
+    rng: np.random.Generator,
+) -> None:
+    """Add picture arrays like ``write_and_remove_picture_metadata`` does"""
+
+    if pictures <= 0:
+        return
+
+    for prefix in ("pre", "post"):
+        encoded = [create_picture(picture_size, rng) for _ in range(pictures)]
+        max_length = max(len(image) for image in encoded)
+        hdf5_file.create_array(
+            hdf5_file.root,
+            f"{prefix}__tool_pictures",
+            np.array(encoded, dtype=f"S{max_length}"),
+        )
+
+
+def add_embedded_files(
+    hdf5_file: tables.File,
+    embedded_files: int,
+    embedded_file_size: int,
+    rng: np.random.Generator,
+) -> None:
+    """Add embedded files like ``append_embedded_files_to_hdf5`` does"""
+
+    if embedded_files <= 0:
+        return
+
+    group = hdf5_file.create_group("/", "embedded_files")
+    for index in range(embedded_files):
+        content = rng.bytes(embedded_file_size)
+        dataset = hdf5_file.create_array(
+            group,
+            f"attachment_{index}_bin",
+            np.frombuffer(content, dtype=np.uint8),
+        )
+        dataset.attrs["size"] = len(content)
+        dataset.attrs["mime"] = "application/octet-stream"
+        dataset.attrs["original_name"] = f"attachment_{index}.bin"
+        dataset.attrs["sha256"] = hashlib.sha256(content).hexdigest()
+
+
+# pylint: disable=too-many-arguments, too-many-locals
+
+
+def create_measurement_file(
+    file_path: str | Path,
+    duration: float,
+    channels: int = 1,
+    *,
+    sample_rate: float = SAMPLE_RATE,
+    pictures: int = 2,
+    picture_size: int = 200_000,
+    embedded_files: int = 2,
+    embedded_file_size: int = 1_000_000,
+    seed: int = 0,
+) -> Path:
+    """Create a measurement file with synthetic data
+
+    Args:
+
+        file_path:
+            The location of the created HDF5 file
+
+        duration:
+            The measurement duration in seconds
+
+        channels:
+            The number of enabled measurement channels (1 – 3)
+
+        sample_rate:
+            The ADC sample rate in Hz
+
+        pictures:
+            The number of pictures stored for pre and post metadata each
+
+        picture_size:
+            The (binary) size of a single picture in bytes
+
+        embedded_files:
+            The number of embedded files
+
+        embedded_file_size:
+            The size of a single embedded file in bytes
+
+        seed:
+            The seed of the random number generator
+
+    Returns:
+
+        The path of the created file
+
+    Examples:
+
+        >>> from tempfile import TemporaryDirectory
+        >>> with TemporaryDirectory() as directory:
+        ...     path = create_measurement_file(
+        ...         Path(directory) / "test.hdf5", duration=1, channels=3,
+        ...         pictures=1, picture_size=10, embedded_files=1,
+        ...         embedded_file_size=10)
+        ...     with tables.open_file(str(path)) as hdf5_file:
+        ...         table = hdf5_file.get_node("/acceleration")
+        ...         print(table.colnames, table.nrows)
+        ['counter', 'timestamp', 'x', 'y', 'z'] 3174
+
+    """
+
+    if not 1 <= channels <= 3:
+        raise ValueError(f"Unsupported number of channels: {channels}")
+
+    path = Path(file_path)
+    rng = np.random.default_rng(seed)
+    rows_per_second = get_rows_per_second(channels, sample_rate)
+    total_rows = int(duration * rows_per_second)
+    chunk_rows = int(CHUNK_SECONDS * rows_per_second)
+
+    description = {
+        "counter": tables.UInt8Col(),
+        "timestamp": tables.UInt64Col(),
+    }
+    for axis in AXES[:channels]:
+        description[axis] = tables.Float32Col()
+
+    with tables.open_file(
+        str(path),
+        mode="w",
+        filters=tables.Filters(4, "zlib"),
+        title="STH Measurement Data",
+    ) as hdf5_file:
+        table = hdf5_file.create_table(
+            hdf5_file.root,
+            name="acceleration",
+            description=description,
+            title="Sensor Node Data",
+            expectedrows=total_rows,
+        )
+        for start in range(0, total_rows, chunk_rows):
+            number_of_rows = min(chunk_rows, total_rows - start)
+            table.append(
+                create_acceleration_rows(
+                    start, number_of_rows, channels, rows_per_second, rng
+                )
+            )
+        table.flush()
+
+        table.attrs["Start_Time"] = datetime.now().isoformat()
+        table.attrs["Sample_Rate"] = f"{sample_rate} Hz"
+        table.attrs["conversion"] = "true"
+        table.attrs["adc_reference_voltage"] = "3.3"
+        table.attrs["pre_metadata"] = create_metadata()
+        table.attrs["post_metadata"] = create_metadata()
+
+        sensors = hdf5_file.create_table(
+            hdf5_file.root,
+            name="sensors",
+            description=SensorDescription,
+            title="Sensor Data",
+        )
+        for sensor in get_sensor_defaults()[:channels]:
+            row = sensors.row
+            for key, value in sensor.model_dump().items():
+                row[key] = value if value is not None else ""
+            row.append()
+        sensors.flush()
+
+        add_pictures(hdf5_file, pictures, picture_size, rng)
+        add_embedded_files(hdf5_file, embedded_files, embedded_file_size, rng)
+
+    return path
+
+
+# pylint: enable=too-many-arguments, too-many-locals
+
+
+def main() -> None:
+    """Generate a measurement file based on command line arguments"""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", type=Path, help="location of the HDF5 file")
+    parser.add_argument(
+        "-d",
+        "--duration",
+        type=float,
+        default=60,
+        help="measurement duration in seconds (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-c",
+        "--channels",
+        type=int,
+        choices=(1, 2, 3),
+        default=1,
+        help="number of measurement channels (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--pictures",
+        type=int,
+        default=2,
+        help="pictures per metadata prefix (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--embedded-files",
+        type=int,
+        default=2,
+        help="number of embedded files (default: %(default)s)",
+    )
+    arguments = parser.parse_args()
+
+    path = create_measurement_file(
+        arguments.path,
+        arguments.duration,
+        arguments.channels,
+        pictures=arguments.pictures,
+        embedded_files=arguments.embedded_files,
+    )
+    print(f"Created {path} ({path.stat().st_size / 2**20:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
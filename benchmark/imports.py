@@ -0,0 +1,146 @@
+"""Profile the import time of the API
+
+The profile imports a module (by default ``icoapi.api``) in a fresh Python
+interpreter using ``python -X importtime`` and lists the modules with the
+largest cumulative import time.
+
+Example:
+
+    Show the 30 slowest imports of the API
+
+        python -m benchmark.imports --limit 30
+
+"""
+
+import argparse
+import subprocess
+import sys
+from dataclasses import dataclass
+
+# -- Constants ----------------------------------------------------------------
+
+DEFAULT_MODULE = "icoapi.api"
+"""Default profiled module"""
+
+DEFAULT_LIMIT = 25
+"""Default number of listed modules"""
+
+# -- Classes ------------------------------------------------------------------
+
+
+@dataclass
+class ImportTime:
+    """Import time of a single module"""
+
+    module: str
+    self_time: int
+    cumulative_time: int
+    depth: int
+
+
+# -- Functions ----------------------------------------------------------------
+
+
+def parse_import_times(output: str) -> list[ImportTime]:
+    """Parse the output of ``python -X importtime``
+
+    Args:
+
+        output:
+            The (standard error) output of the interpreter
+
+    Returns:
+
+        The import times of all imported modules in microseconds
+
+    Examples:
+
+        >>> output = '''import time: self [us] | cumulative | imported package
+        ... import time:       100 |        100 |   json.decoder
+        ... import time:       200 |        300 | json
+        ... Unrelated line'''
+        >>> for import_time in parse_import_times(output):
+        ...     print(import_time.module, import_time.cumulative_time,
+        ...           import_time.depth)
+        json.decoder 100 1
+        json 300 0
+
+    """
+
+    import_times = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_time, cumulative_time, module = line[12:].split("|")
+        if not self_time.strip().isdigit():
+            continue  # Header
+        name = module.rstrip()
+        import_times.append(
+            ImportTime(
+                module=name.strip(),
+                self_time=int(self_time),
+                cumulative_time=int(cumulative_time),
+                depth=(len(name) - len(name.lstrip()) - 1) // 2,
+            )
+        )
+
+    return import_times
+
+
+def profile_imports(module: str) -> list[ImportTime]:
+    """Import a module in a fresh interpreter and record the import times
+
+    Args:
+
+        module:
+            The name of the profiled module
+
+    Returns:
+
+        The import times of all modules imported by the module
+
+    """
+
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+    return parse_import_times(process.stderr)
+
+
+def main() -> None:
+    """Profile imports based on command line arguments"""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "module",
+        nargs="?",
+        default=DEFAULT_MODULE,
+        help="profiled module (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-l",
+        "--limit",
+        type=int,
+        default=DEFAULT_LIMIT,
+        help="number of listed modules (default: %(default)s)",
+    )
+    arguments = parser.parse_args()
+
+    import_times = profile_imports(arguments.module)
+    print(f"{'cumulative ms':>13} {'self ms':>8}  module")
+    for import_time in sorted(
+        import_times, key=lambda import_time: -import_time.cumulative_time
+    )[: arguments.limit]:
+        print(
+            f"{import_time.cumulative_time / 1000:>13.1f} "
+            f"{import_time.self_time / 1000:>8.1f}  "
+            f"{'  ' * import_time.depth}{import_time.module}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""Benchmark the startup time of the API
+
+Every run starts a fresh process, which
+
+1. imports the API (``icoapi.api``),
+2. runs the startup part of the lifespan of the application and
+3. requests ``/state``.
+
+The benchmark reports the time of each step and the time to first request
+(the sum of all steps), which is the time a client has to wait after
+starting the API.
+
+Example:
+
+    Run the benchmark ten times and store the results
+
+        python -m benchmark.startup --runs 10 --output bench_output.txt
+
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import statistics
+from dataclasses import dataclass
+from datetime import datetime
+from time import perf_counter
+
+# -- Constants ----------------------------------------------------------------
+
+STARTUP_URL = "state"
+"""Endpoint requested after the startup"""
+
+DEFAULT_RUNS = 5
+"""Default number of benchmark runs"""
+
+# -- Classes ------------------------------------------------------------------
+
+
+@dataclass
+class StartupResult:
+    """Result of a single startup of the API"""
+
+    import_time: float
+    startup_time: float
+    request_time: float
+    time_to_first_request: float
+    status_code: int
+    peak_rss: int | None
+
+
+# -- Functions ----------------------------------------------------------------
+
+
+async def request_state(app) -> int:
+    """Request the state endpoint of the API
+
+    Args:
+
+        app:
+            The ASGI application
+
+    Returns:
+
+        The status code of the response
+
+    """
+
+    path = f"/api/v1/{STARTUP_URL}"
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "headers": [(b"host", b"benchmark")],
+    }
+    status_code = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+
+    await app(scope, receive, send)
+
+    return status_code
+
+
+async def start_api() -> tuple[float, float, float, int]:
+    """Import and start the API and request the state
+
+    Returns:
+
+        A tuple containing the import time, the startup time, the request
+        time and the status code of the request
+
+    """
+
+    start = perf_counter()
+    # pylint: disable=import-outside-toplevel
+    from icoapi.api import app
+
+    # pylint: enable=import-outside-toplevel
+    imported = perf_counter()
+
+    lifespan_events: asyncio.Queue[dict] = asyncio.Queue()
+    started = asyncio.Event()
+
+    async def receive():
+        return await lifespan_events.get()
+
+    async def send(message):
+        if message["type"].startswith("lifespan.startup."):
+            started.set()
+
+    await lifespan_events.put({"type": "lifespan.startup"})
+    lifespan = asyncio.create_task(
+        app({"type": "lifespan", "asgi": {"version": "3.0"}}, receive, send)
+    )
+    await started.wait()
+    ready = perf_counter()
+
+    status_code = await request_state(app)
+    answered = perf_counter()
+
+    await lifespan_events.put({"type": "lifespan.shutdown"})
+    await lifespan
+
+    return imported - start, ready - imported, answered - ready, status_code
+
+
+def run_startup(results: multiprocessing.Queue) -> None:
+    """Run a single startup benchmark (in a child process)"""
+
+    import_time, startup_time, request_time, status_code = asyncio.run(
+        start_api()
+    )
+
+    # Importing the benchmark helpers before would change the import time
+    # pylint: disable=import-outside-toplevel
+    from benchmark.file_routes import get_peak_rss
+
+    # pylint: enable=import-outside-toplevel
+
+    results.put(
+        (import_time, startup_time, request_time, status_code, get_peak_rss())
+    )
+
+
+def benchmark_startup() -> StartupResult:
+    """Start the API in a fresh process and measure the startup time"""
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=run_startup, args=(results,))
+    process.start()
+    import_time, startup_time, request_time, status_code, peak = (
+        results.get()
+    )
+    process.join()
+
+    return StartupResult(
+        import_time=import_time,
+        startup_time=startup_time,
+        request_time=request_time,
+        time_to_first_request=import_time + startup_time + request_time,
+        status_code=status_code,
+        peak_rss=peak,
+    )
+
+
+def format_result(result: StartupResult) -> str:
+    """Format a startup result as table row"""
+
+    peak = (
+        "–" if result.peak_rss is None else f"{result.peak_rss / 2**20:.1f}"
+    )
+
+    return (
+        f"{result.import_time:>8.3f} {result.startup_time:>9.3f} "
+        f"{result.request_time:>9.3f} {result.time_to_first_request:>8.3f} "
+        f"{result.status_code:>4} {peak:>9}"
+    )
+
+
+def main() -> None:
+    """Run benchmark based on command line arguments"""
+
+    # pylint: disable=import-outside-toplevel
+    from benchmark.file_routes import (
+        add_output_argument,
+        append_result,
+        get_revision,
+    )
+
+    # pylint: enable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "-r",
+        "--runs",
+        type=int,
+        default=DEFAULT_RUNS,
+        help="number of benchmark runs (default: %(default)s)",
+    )
+    add_output_argument(parser)
+    arguments = parser.parse_args()
+
+    print(
+        f"{'import s':>8} {'startup s':>9} {'request s':>9} {'first s':>8} "
+        f"{'code':>4} {'peak MiB':>9}"
+    )
+    revision = get_revision()
+    timestamp = datetime.now().isoformat()
+    times = []
+    for _ in range(arguments.runs):
+        result = benchmark_startup()
+        times.append(result.time_to_first_request)
+        print(format_result(result), flush=True)
+        if arguments.output:
+            append_result(arguments.output, timestamp, revision, result)
+    print(f"Median time to first request: {statistics.median(times):.3f} s")
+
+
+if __name__ == "__main__":
+    main()
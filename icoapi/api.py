@@ -1,5 +1,6 @@
 """Main entry point for API"""
 
+import asyncio
 import os
 import logging
 import sys
@@ -10,6 +11,12 @@ from pathlib import Path
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 
+# Load the environment file first, since modules read settings on import
+from icoapi.utils.environment import (
+    get_application_dir,
+    get_config_dir,
+    is_bundled,
+)
 from icoapi.routers import (
     config_routes,
     sensor_routes,
@@ -19,23 +26,55 @@ from icoapi.routers import (
     file_routes,
     measurement_routes,
     cloud_routes,
+    diagnostics_routes,
     log_routes,
 )
 from icoapi.scripts.file_handling import (
     copy_config_files_if_not_exists,
     ensure_folder_exists,
-    get_application_dir,
-    get_config_dir,
     get_measurement_dir,
-    is_bundled,
-    load_env_file,
 )
 from icoapi.models.globals import (
+    GeneralMessenger,
     MeasurementSingleton,
     ICOsystemSingleton,
-    setup_trident, get_dataspace_config,
+    TridentHandler,
+    connect_trident,
+    get_dataspace_config,
+    set_readiness,
 )
+from icoapi.models.models import SubsystemStatus
+from icoapi.scripts.summary import SUMMARY_BACKFILL, backfill_summaries
 from icoapi.utils.logging_setup import setup_logging
+from icoapi.utils.loop_monitor import RouteContextMiddleware, loop_monitor
+
+
+async def setup_can():
+    """Initialize the CAN connection (in the background)"""
+
+    try:
+        await ICOsystemSingleton.create_instance_if_none()
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logger.error("Error when initializing CAN connection: %s", e)
+        await set_readiness("can", SubsystemStatus.FAILED)
+
+
+async def setup_cloud():
+    """Set up the cloud connection (in the background)"""
+
+    try:
+        config = get_dataspace_config()
+        if not config.enabled:
+            logger.info("Cloud disabled")
+            await set_readiness("cloud", SubsystemStatus.DISABLED)
+        elif config.connector == "trident":
+            await connect_trident()
+        else:
+            logger.warning("Connector %s not supported", config.connector)
+            await set_readiness("cloud", SubsystemStatus.FAILED)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logger.error("Error when setting up Trident: %s", e)
+        await set_readiness("cloud", SubsystemStatus.FAILED)
 
 
 @asynccontextmanager
@@ -44,27 +83,38 @@ async def lifespan(application: FastAPI):  # pylint: disable=unused-argument
     This function handles startup and shutdown of the API.
     Anything before <yield> will be run on startup; everything after on shutdown.
     See https://fastapi.tiangolo.com/advanced/events/#lifespan
+
+    The CAN connection, the cloud connection and the summary backfill start
+    in the background, so the API answers requests immediately. The
+    endpoint ``/state`` reports the readiness of each subsystem.
     """
     MeasurementSingleton.create_instance_if_none()
-    try:
-        config = get_dataspace_config()
-        if config.enabled:
-            if config.connector == "trident":
-                await setup_trident()
-            else:
-                logger.warning("Connector %s not supported", config.connector)
-        else:
-            logger.info("Cloud disabled")
-
-    except Exception as e:  # pylint: disable=broad-exception-caught
-        logger.error("Error when setting up Trident: %s", e)
-    try:
-        await ICOsystemSingleton.create_instance_if_none()
-    except Exception as e:  # pylint: disable=broad-exception-caught
-        logger.error("Error when initializing CAN connection: %s", e)
+    loop_monitor.start(
+        is_measurement_running=lambda: (
+            MeasurementSingleton.get_instance().running
+        ),
+        publish=GeneralMessenger.send_loop_report,
+    )
+    # Start with the CAN connection, since measurements depend on it
+    tasks = [
+        asyncio.create_task(setup_can(), name="setup_can"),
+        asyncio.create_task(setup_cloud(), name="setup_cloud"),
+    ]
+    if SUMMARY_BACKFILL:
+        tasks.append(
+            asyncio.create_task(
+                backfill_summaries(get_measurement_dir()),
+                name="backfill_summaries",
+            )
+        )
     yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    TridentHandler.stop_refresh()
     MeasurementSingleton.clear_clients()
     await ICOsystemSingleton.close_instance()
+    await loop_monitor.stop()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -77,6 +127,7 @@ app.include_router(prefix="/api/v1", router=measurement_routes.router)
 app.include_router(prefix="/api/v1", router=log_routes.router)
 app.include_router(prefix="/api/v1", router=sensor_routes.router)
 app.include_router(prefix="/api/v1", router=config_routes.router)
+app.include_router(prefix="/api/v1", router=diagnostics_routes.router)
 
 
 logger = logging.getLogger(__name__)
@@ -90,6 +141,7 @@ app.add_middleware(
     allow_headers=["*"],
     expose_headers=["*"],
 )
+app.add_middleware(RouteContextMiddleware)
 
 
 def setup_config():
@@ -114,7 +166,6 @@ def main():
 
     import uvicorn  # pylint: disable=import-outside-toplevel
 
-    load_env_file()
     setup_logging()
     setup_config()
 
@@ -1,7 +1,13 @@
 """Module containing logic for cloud connections"""
 
+import base64
+import json
 import logging
+import os
+import random
 import socket
+import threading
+import time
 from abc import abstractmethod
 from dataclasses import dataclass
 from enum import StrEnum
@@ -11,6 +17,83 @@ import requests
 
 logger = logging.getLogger(__name__)
 
+CLOUD_TOKEN_REFRESH_MARGIN = float(
+    os.getenv("CLOUD_TOKEN_REFRESH_MARGIN", "60")
+)
+CLOUD_SETUP_TIMEOUT = float(os.getenv("CLOUD_SETUP_TIMEOUT", "10"))
+"""Maximum time in seconds of a connection attempt (and a request)"""
+CLOUD_REQUEST_RETRIES = int(os.getenv("CLOUD_REQUEST_RETRIES", "3"))
+CLOUD_RETRY_BACKOFF = float(os.getenv("CLOUD_RETRY_BACKOFF", "0.5"))
+
+DEFAULT_TOKEN_LIFETIME = 300
+"""Assumed lifetime in seconds of access tokens without expiry information"""
+
+MAX_RETRY_BACKOFF = 8
+"""Maximum delay in seconds before retrying a request"""
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+"""HTTP methods that can be repeated without changing the result"""
+
+
+def get_token_expiry(token: str | None) -> float | None:
+    """Get the expiry time of a JSON Web Token
+
+    Args:
+
+        token:
+            The access token
+
+    Returns:
+
+        The expiry time in seconds since the epoch or ``None``, if the token
+        does not contain an expiry time
+
+    Examples:
+
+        >>> payload = base64.urlsafe_b64encode(b'{"exp": 1700000000}')
+        >>> get_token_expiry(f"header.{payload.decode().rstrip('=')}.sig")
+        1700000000.0
+        >>> get_token_expiry("opaque-token") is None
+        True
+
+    """
+
+    if not token:
+        return None
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+def get_retry_backoff(attempt: int) -> float:
+    """Get the (randomized) delay before retrying a failed request
+
+    The delay uses exponential backoff with full jitter, which prevents that
+    many clients retry at the same time.
+
+    Args:
+
+        attempt:
+            The number of the failed attempt (starting at ``0``)
+
+    Returns:
+
+        The delay in seconds
+
+    Examples:
+
+        >>> 0 <= get_retry_backoff(2) <= 4 * CLOUD_RETRY_BACKOFF
+        True
+
+    """
+
+    return random.uniform(
+        0, min(MAX_RETRY_BACKOFF, CLOUD_RETRY_BACKOFF * 2**attempt)
+    )
+
 
 class HostNotFoundError(HTTPException):
     """Error for host not found"""
@@ -116,8 +199,16 @@ class BearerAuthConnection(CloudConnection):
             "password": password
         }
         self.settings = settings
+        self.token_expiry: float | None = None
+        # Requests and the background refresh use the session concurrently
+        self.lock = threading.RLock()
 
-    def _update_tokens(self, auth_token: str, refresh_token: str):
+    def _update_tokens(
+        self,
+        auth_token: str,
+        refresh_token: str,
+        expires_in: float | None = None,
+    ):
         """Update the access and refresh tokens"""
         self.session.cookies.set(
             "refresh_token", refresh_token, domain=self.domain
@@ -125,15 +216,34 @@ class BearerAuthConnection(CloudConnection):
         self.session.headers.update(
             {"Authorization": f"Bearer {auth_token}"}
         )
+        self.token_expiry = get_token_expiry(auth_token)
+        if self.token_expiry is None:
+            self.token_expiry = time.time() + (
+                DEFAULT_TOKEN_LIFETIME if expires_in is None
+                else float(expires_in)
+            )
         logger.info("Access and refresh token updated successfully.")
 
+    def get_refresh_delay(self) -> float:
+        """Get the time in seconds until the access token should be refreshed
+
+        The token should be refreshed ``CLOUD_TOKEN_REFRESH_MARGIN`` seconds
+        before it expires.
+        """
+        if self.token_expiry is None:
+            return 0
+        return max(
+            self.token_expiry - CLOUD_TOKEN_REFRESH_MARGIN - time.time(), 0
+        )
+
     def _acquire_access_token(self):
         """Retrieve access token from the authentication endpoint."""
         try:
             self.session.cookies.clear()
             response = self.session.post(
                 f"{self.service}/{self.settings.auth.endpoint}",
-                json=self.secrets
+                json=self.secrets,
+                timeout=CLOUD_SETUP_TIMEOUT,
             )
             response.raise_for_status()
 
@@ -141,7 +251,8 @@ class BearerAuthConnection(CloudConnection):
 
             self._update_tokens(
                 token_data.get(self.settings.auth.field_name),
-                token_data.get(self.settings.refresh_auth.field_name)
+                token_data.get(self.settings.refresh_auth.field_name),
+                token_data.get("expires_in"),
             )
 
             return
@@ -192,33 +303,34 @@ class BearerAuthConnection(CloudConnection):
             response = self.session.post(
                 f"{self.service}/{self.settings.refresh_auth.endpoint}",
                 json={"refresh_token": refresh_token},
+                timeout=CLOUD_SETUP_TIMEOUT,
             )
             response.raise_for_status()
 
             token_data = response.json()
-            new_access_token = token_data.get("access_token")
-            new_refresh_token = token_data.get("refresh_token")
-
-            self.session.cookies.set(
-                "refresh_token", new_refresh_token, domain=self.domain
-            )
-            self.session.headers.update(
-                {"Authorization": f"Bearer {new_access_token}"}
+            self._update_tokens(
+                token_data.get("access_token"),
+                token_data.get("refresh_token"),
+                token_data.get("expires_in"),
             )
-            logger.info("Access and refresh token refreshed successfully.")
             return
 
         except requests.exceptions.RequestException as e:
             logger.error("Error refreshing access and refresh token: %s", e)
             self.session.close()
             self.session = requests.Session()
+            self.token_expiry = None
             logger.warning("Refresh failed. Started new session.")
             self._ensure_auth()
 
     def _ensure_auth(self):
-        """Ensure an access token is available before making a request."""
-        if not self.is_authenticated():
-            self._acquire_access_token()
+        """Ensure a valid access token is available before a request."""
+        with self.lock:
+            if not self.is_authenticated():
+                self._acquire_access_token()
+            elif self.get_refresh_delay() <= 0:
+                # The background refresh did not renew the token in time
+                self._refresh_with_refresh_token()
 
     def authenticate(self, *args, **kwargs):
         self._ensure_auth()
@@ -227,30 +339,59 @@ class BearerAuthConnection(CloudConnection):
         return self.session.headers.get("Authorization") is not None
 
     def refresh_authentication(self, *args, **kwargs):
-        self._refresh_with_refresh_token()
-
-    def request(self, method, path, **kwargs):
-        self._refresh_with_refresh_token()
-        self._ensure_auth()
-        url = self.service + path
-
-        try:
-            logger.info("%s request for %s", method, url)
+        with self.lock:
+            self._refresh_with_refresh_token()
+
+    def _send(self, method, url, **kwargs) -> requests.Response:
+        """Send a request, refreshing an expired token once
+
+        A request rejected with 401 is sent again after refreshing the
+        token (the server did not process it). Only requests with idempotent
+        methods are retried after server errors (with jittered exponential
+        backoff).
+        """
+        kwargs.setdefault("timeout", CLOUD_SETUP_TIMEOUT)
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        refreshed = False
+        attempt = 0
+        while True:
+            authorization = self.session.headers.get("Authorization")
             response = self.session.request(method, url, **kwargs)
-            if response.status_code == 401:
+            if response.status_code == 401 and not refreshed:
                 logger.warning(
                     "Authentication expired during session. Refreshing..."
                 )
-                self._refresh_with_refresh_token()
-                return self.session.request(
-                    method, url, **kwargs
-                )  # Retry with new token
+                with self.lock:
+                    # Another request might have refreshed the token already
+                    if (
+                        self.session.headers.get("Authorization")
+                        == authorization
+                    ):
+                        self._refresh_with_refresh_token()
+                refreshed = True
+                continue
 
             if response.status_code >= 500:
                 logger.error(
                     "Trident API could not be reached, raised code %s",
                     response.status_code
                 )
+                if idempotent and attempt < CLOUD_REQUEST_RETRIES:
+                    delay = get_retry_backoff(attempt)
+                    logger.info("Retry %s request in %.2f s", method, delay)
+                    time.sleep(delay)
+                    attempt += 1
+                    continue
+
+            return response
+
+    def request(self, method, path, **kwargs):
+        self._ensure_auth()
+        url = self.service + path
+
+        try:
+            logger.info("%s request for %s", method, url)
+            response = self._send(method, url, **kwargs)
             try:
                 response.raise_for_status()
             except requests.exceptions.HTTPError as e:
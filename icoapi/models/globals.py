@@ -2,23 +2,30 @@
 
 import asyncio
 import logging
+import os
 from typing import List
 from starlette.websockets import WebSocket
 
 from icostate import CANInitError, ICOsystem
 from icostate.state import State
+from icotronic.can import NoResponseError
 
 from icoapi.models.models import (
     Feature,
+    LoopReport,
     MeasurementInstructions,
     MeasurementStatus,
     Metadata,
+    Readiness,
     SocketMessage,
+    SubsystemStatus,
     SystemStateModel,
     CloudConfig,
 )
+from icoapi.models.cloud import CLOUD_SETUP_TIMEOUT
 from icoapi.models.trident import StorageClient
 from icoapi.scripts.data_handling import read_and_parse_trident_config
+from icoapi.scripts.errors import HTTP_400_INCORRECT_STATE_EXCEPTION
 from icoapi.scripts.file_handling import (
     get_dataspace_file_path,
     get_disk_space_in_gib,
@@ -26,6 +33,9 @@ from icoapi.scripts.file_handling import (
 
 logger = logging.getLogger(__name__)
 
+CLOUD_SETUP_RETRIES = int(os.getenv("CLOUD_SETUP_RETRIES", "5"))
+CLOUD_SETUP_RETRY_DELAY = float(os.getenv("CLOUD_SETUP_RETRY_DELAY", "2"))
+
 
 class ICOsystemSingleton:
     """
@@ -43,16 +53,18 @@ class ICOsystemSingleton:
     _instance: ICOsystem | None = None
     _lock = asyncio.Lock()
     _messengers: list[WebSocket] = []
+    _released = False
 
     @classmethod
     async def create_instance_if_none(cls):
         """Create singleton if it does not exist already"""
         try:
             async with cls._lock:
-                if cls._instance is None:
+                if cls._instance is None and not cls._released:
                     cls._instance = ICOsystem()
                     # STU Connection is required for any CAN communication
                     await cls._instance.connect_stu()
+                    readiness.can = SubsystemStatus.READY
                     await get_messenger().push_messenger_update()
                     logger.info(
                         "Created ICOsystem instance with ID <%s>",
@@ -60,6 +72,7 @@ class ICOsystemSingleton:
                     )
         except CANInitError as error:
             logger.error("Cannot establish CAN connection: %s", error)
+            await set_readiness("can", SubsystemStatus.FAILED)
 
     @classmethod
     async def get_instance(cls):
@@ -93,10 +106,72 @@ class ICOsystemSingleton:
 
         return cls._instance is not None
 
+    @classmethod
+    async def release_instance(cls):
+        """Close singleton and hand the CAN connection to another process
+
+        Until :meth:`restore_instance` is called, no new instance is created.
+        """
+
+        async with cls._lock:
+            cls._released = True
+            if cls._instance is not None:
+                if cls._instance.state == State.SENSOR_NODE_CONNECTED:
+                    await cls._instance.disconnect_sensor_node()
+                if cls._instance.state == State.STU_CONNECTED:
+                    await cls._instance.disconnect_stu()
+                logger.info(
+                    "Released CAN connection of ICOsystem instance with ID "
+                    "<%s>",
+                    id(cls._instance),
+                )
+                cls._instance = None
+        await get_messenger().push_messenger_update()
+
+    @classmethod
+    async def restore_instance(cls, mac_address: str | None = None):
+        """Take back the CAN connection released before
+
+        Args:
+
+            mac_address:
+                The MAC address of the sensor node the restored instance
+                should connect to
+
+        """
+
+        async with cls._lock:
+            cls._released = False
+        await cls.create_instance_if_none()
+        if (
+            cls._instance is None
+            or cls._instance.state != State.STU_CONNECTED
+            or mac_address is None
+        ):
+            return
+
+        try:
+            await cls._instance.connect_sensor_node_mac(mac_address)
+            logger.info("Reconnected to sensor node <%s>", mac_address)
+        except (NoResponseError, ValueError) as error:
+            logger.error(
+                "Cannot reconnect to sensor node <%s>: %s", mac_address, error
+            )
+        await get_messenger().push_messenger_update()
+
+    @classmethod
+    def is_released(cls) -> bool:
+        """Check if another process uses the CAN connection"""
+
+        return cls._released
+
 
 async def get_system() -> ICOsystem:
     """Get ICOsystem singleton instance"""
 
+    if ICOsystemSingleton.is_released():
+        raise HTTP_400_INCORRECT_STATE_EXCEPTION
+
     icosystem = await ICOsystemSingleton.get_instance()
     return icosystem
 
@@ -113,6 +188,7 @@ class MeasurementState:
     def __init__(self) -> None:
         self.task: asyncio.Task | None = None
         self.clients: List[WebSocket] = []
+        self.spectrum_clients: List[WebSocket] = []
         self.lock = asyncio.Lock()
         self.running = False
         self.name: str | None = None
@@ -133,6 +209,7 @@ class MeasurementState:
 
         self.task = None
         self.clients = []
+        self.spectrum_clients = []
         self.lock = asyncio.Lock()
         self.running = False
         self.name = None
@@ -190,6 +267,7 @@ class MeasurementSingleton:
 
         num_of_clients = len(cls._instance.clients)
         cls._instance.clients.clear()
+        cls._instance.spectrum_clients.clear()
         logger.info(
             "Cleared %s clients from measurement WebSocket list",
             num_of_clients,
@@ -212,9 +290,11 @@ class TridentHandler:
 
     client: StorageClient | None = None
     feature = Feature(enabled=False, healthy=False)
+    refresh_task: asyncio.Task | None = None
 
     @classmethod
     async def reset(cls):
+        cls.stop_refresh()
         cls.client = None
         cls.feature = Feature(enabled=False, healthy=False)
         await get_messenger().push_messenger_update()
@@ -263,6 +343,51 @@ class TridentHandler:
     async def get_client(cls) -> StorageClient | None:
         return cls.client
 
+    @classmethod
+    def start_refresh(cls):
+        cls.stop_refresh()
+        if cls.client is not None:
+            cls.refresh_task = asyncio.create_task(
+                refresh_trident_tokens(cls.client),
+                name="refresh_trident_tokens",
+            )
+
+    @classmethod
+    def stop_refresh(cls):
+        if cls.refresh_task is not None:
+            cls.refresh_task.cancel()
+            cls.refresh_task = None
+
+
+async def refresh_trident_tokens(client: StorageClient):
+    """Refresh the tokens of the Trident connection before they expire
+
+    This way requests do not have to wait for a refresh or a new login.
+    Failed refreshes are retried with an increasing delay.
+    """
+
+    connection = client.get_client()
+    failures = 0
+    while True:
+        if failures == 0:
+            delay = connection.get_refresh_delay()
+        else:
+            delay = min(CLOUD_SETUP_RETRY_DELAY * 2 ** (failures - 1), 300)
+        await asyncio.sleep(delay)
+        try:
+            await asyncio.to_thread(connection.refresh_authentication)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            failures += 1
+            logger.error("Cannot refresh Trident tokens: %s", e)
+            if failures == 1:
+                await TridentHandler.set_health(False)
+                await set_readiness("cloud", SubsystemStatus.FAILED)
+        else:
+            if failures > 0:
+                await TridentHandler.set_health(True)
+                await set_readiness("cloud", SubsystemStatus.READY)
+            failures = 0
+
 
 async def get_trident_client() -> StorageClient | None:
     return await TridentHandler.get_client()
@@ -278,11 +403,13 @@ def get_dataspace_config():
 
 async def setup_trident():
     ds_path = get_dataspace_file_path()
+    status = SubsystemStatus.DISABLED
     try:
         dataspace_config = read_and_parse_trident_config(ds_path)
         handler = TridentHandler
         await handler.reset()
         if dataspace_config.enabled:
+            status = SubsystemStatus.FAILED
             await handler.set_enabled()
             await TridentHandler.create_client(dataspace_config)
             client = await TridentHandler.get_client()
@@ -290,9 +417,12 @@ async def setup_trident():
                 logger.exception("Failed at creating trident connection")
                 await handler.set_health(False)
             else:
-                client.get_client().authenticate()
+                # Do not block the event loop while waiting for the server
+                await asyncio.to_thread(client.get_client().authenticate)
                 if client.is_authenticated():
                     await handler.set_health(True)
+                    handler.start_refresh()
+                    status = SubsystemStatus.READY
 
     except FileNotFoundError:
         logger.warning("Cannot find dataspace config file under %s", ds_path)
@@ -300,10 +430,43 @@ async def setup_trident():
     except KeyError as e:
         logger.exception("Cannot parse dataspace config file: %s", e)
         await TridentHandler.reset()
+        status = SubsystemStatus.FAILED
     except Exception as e:  # pylint: disable=broad-exception-caught
         logger.error("Cannot establish Trident connection: %s", e)
         await TridentHandler.reset()
         await TridentHandler.set_enabled()
+        status = SubsystemStatus.FAILED
+
+    await set_readiness("cloud", status)
+
+
+async def connect_trident():
+    """Set up the Trident connection with a timeout and retries
+
+    Every attempt stops after ``CLOUD_SETUP_TIMEOUT`` seconds. The delay
+    between two attempts starts at ``CLOUD_SETUP_RETRY_DELAY`` seconds and
+    doubles after every failed attempt.
+    """
+
+    delay = CLOUD_SETUP_RETRY_DELAY
+    for attempt in range(CLOUD_SETUP_RETRIES + 1):
+        try:
+            await asyncio.wait_for(setup_trident(), CLOUD_SETUP_TIMEOUT)
+        except TimeoutError:
+            logger.error(
+                "Trident connection timed out after %s seconds",
+                CLOUD_SETUP_TIMEOUT,
+            )
+            readiness.cloud = SubsystemStatus.FAILED
+        if readiness.cloud != SubsystemStatus.FAILED:
+            return
+        if attempt < CLOUD_SETUP_RETRIES:
+            await set_readiness("cloud", SubsystemStatus.PENDING)
+            logger.info("Retry Trident connection in %s seconds", delay)
+            await asyncio.sleep(delay)
+            delay *= 2
+
+    await set_readiness("cloud", SubsystemStatus.FAILED)
 
 
 # pylint: enable=missing-function-docstring
@@ -315,6 +478,7 @@ class GeneralMessenger:
     """
 
     _clients: List[WebSocket] = []
+    _loop_report_clients: List[WebSocket] = []
 
     @classmethod
     def add_messenger(cls, messenger: WebSocket):
@@ -327,6 +491,8 @@ class GeneralMessenger:
     def remove_messenger(cls, messenger: WebSocket):
         """Remove messenger client"""
 
+        if messenger in cls._loop_report_clients:
+            cls._loop_report_clients.remove(messenger)
         try:
             cls._clients.remove(messenger)
             logger.info(
@@ -353,6 +519,7 @@ class GeneralMessenger:
                         disk_capacity=get_disk_space_in_gib(),
                         cloud=cloud,
                         measurement_status=state.get_status(),
+                        readiness=get_readiness(),
                     ),
                 ).model_dump()
             )
@@ -360,6 +527,26 @@ class GeneralMessenger:
         if (len(cls._clients)) > 0:
             logger.info("Pushed SystemState to %s clients.", len(cls._clients))
 
+    @classmethod
+    def subscribe_loop_report(cls, messenger: WebSocket):
+        """Send event loop health reports periodically to messenger client"""
+
+        if messenger not in cls._loop_report_clients:
+            cls._loop_report_clients.append(messenger)
+            logger.info("Subscribed WebSocket instance to loop reports")
+
+    @classmethod
+    async def send_loop_report(
+        cls, report: LoopReport, client: WebSocket | None = None
+    ):
+        """Send event loop health report to subscribed messenger clients"""
+
+        clients = cls._loop_report_clients if client is None else [client]
+        for messenger in clients:
+            await messenger.send_json(
+                SocketMessage(message="loop_report", data=report).model_dump()
+            )
+
     @classmethod
     async def send_post_meta_request(cls):
         """Send post measurement metadata"""
@@ -379,6 +566,34 @@ class GeneralMessenger:
             )
 
 
+readiness = Readiness()
+"""Readiness of the subsystems initialized at startup"""
+
+
+def get_readiness() -> Readiness:
+    """Get the readiness of the subsystems initialized at startup"""
+
+    return readiness.model_copy()
+
+
+async def set_readiness(subsystem: str, status: SubsystemStatus) -> None:
+    """Update the readiness of a subsystem and notify the state clients
+
+    Args:
+
+        subsystem:
+            The name of the subsystem (``can`` or ``cloud``)
+
+        status:
+            The new status of the subsystem
+
+    """
+
+    setattr(readiness, subsystem, status)
+    await get_messenger().push_messenger_update()
+    logger.info("Set readiness of %s to <%s>", subsystem, status)
+
+
 def get_messenger():
     """Get general messenger"""
 
@@ -3,13 +3,16 @@ import datetime
 from enum import unique, StrEnum
 from dataclasses import dataclass, field
 from json import JSONEncoder
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
-import pandas
-from pydantic import BaseModel, ConfigDict, model_validator
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 from icostate import ADCConfiguration, SensorNodeInfo
 
+if TYPE_CHECKING:
+    # Importing pandas takes a long time, only load it when used
+    import pandas
+
 
 class STHDeviceResponseModel(BaseModel):
     """Wrapper for STH Device class implementing Pydantic features"""
@@ -211,6 +214,30 @@ class FileCloudDetails:
     upload_timestamp: str | None
 
 
+class ChannelStatistics(BaseModel, JSONEncoder):
+    """Statistics of the measurement data of one channel"""
+
+    name: str
+    minimum: float
+    maximum: float
+    mean: float
+    rms: float
+    peak: float
+    crest_factor: float | None
+    percentiles: dict[str, float]
+    dominant_frequency: float | None
+
+
+class MeasurementSummary(BaseModel, JSONEncoder):
+    """Summary of the measurement data of a file"""
+
+    rows: int
+    duration: float
+    sample_rate: float
+    dataloss: float
+    channels: list[ChannelStatistics]
+
+
 @dataclass
 class MeasurementFileDetails:
     """Data model for measurement files"""
@@ -219,6 +246,7 @@ class MeasurementFileDetails:
     created: str
     size: int
     cloud: FileCloudDetails
+    summary: MeasurementSummary | None = None
 
 
 @dataclass
@@ -249,12 +277,12 @@ class EmbeddedFileUploadResponse:
 
 
 @dataclass
-class EmbeddedFileContent:
-    """Embedded file payload and metadata"""
+class EmbeddedFileDetails:
+    """Metadata of an embedded file"""
 
-    content: bytes
     original_name: str
     mime: str
+    size: int
 
 
 class EmbeddedFileInfo(BaseModel, JSONEncoder):
@@ -265,6 +293,29 @@ class EmbeddedFileInfo(BaseModel, JSONEncoder):
     mime: str
     size: int
     download_path: str
+    sha256: str = ""
+
+
+class PictureInfo(BaseModel, JSONEncoder):
+    """Picture (metadata parameter) information for clients"""
+
+    parameter: str
+    index: int
+    mime: str
+    size: int
+    sha256: str
+    download_path: str
+    width: int | None = None
+    height: int | None = None
+    thumbnail_mime: str | None = None
+    thumbnail_path: str | None = None
+
+
+class MeasurementCatalog(BaseModel, JSONEncoder):
+    """Embedded files and pictures of a measurement file"""
+
+    embedded_files: list[EmbeddedFileInfo]
+    pictures: dict[str, list[PictureInfo]]
 
 
 class EmbeddedFileDeleteResponse(BaseModel, JSONEncoder):
@@ -289,6 +340,71 @@ class ParsedMeasurement(BaseModel, JSONEncoder):
     datasets: list[Dataset]
 
 
+class MeasurementSummaryDetails(MeasurementSummary):
+    """Summary of the measurement data including power spectral densities"""
+
+    frequency_resolution: float
+    psd: list[Dataset]
+
+
+class MeasurementSpectrum(BaseModel, JSONEncoder):
+    """Power spectral density of the measurement data of a time window"""
+
+    name: str
+    segments: int
+    frequencies: list[float]
+    datasets: list[Dataset]
+
+
+class SpectrogramDataset(BaseModel, JSONEncoder):
+    """Power spectral densities of consecutive parts of one channel"""
+
+    name: str
+    data: list[list[float]]
+
+
+class MeasurementSpectrogram(BaseModel, JSONEncoder):
+    """Spectrogram of the measurement data of a time window"""
+
+    name: str
+    segments_per_column: int
+    timestamp: list[float]
+    frequencies: list[float]
+    datasets: list[SpectrogramDataset]
+
+
+class LiveSpectrumFrame(BaseModel, JSONEncoder):
+    """Amplitude spectrum of the most recent values of a running measurement
+
+    The data of every dataset contains the amplitudes for the frequencies
+    ``0``, ``frequency_resolution``, ``2 * frequency_resolution``, … up to
+    half the sample rate.
+    """
+
+    type: str = "spectrum"
+    timestamp: float
+    frequency_resolution: float
+    datasets: list[Dataset]
+
+
+class OverviewDataset(BaseModel, JSONEncoder):
+    """Minimum, maximum and mean of the measurement data of one channel"""
+
+    name: str
+    minimum: list[float]
+    maximum: list[float]
+    mean: list[float]
+
+
+class MeasurementOverview(BaseModel, JSONEncoder):
+    """Downsampled measurement data for displaying a time window"""
+
+    name: str
+    rows_per_point: int
+    timestamp: list[float]
+    datasets: list[OverviewDataset]
+
+
 @dataclass
 class MeasurementStatus:
     """Measurement status information"""
@@ -317,6 +433,23 @@ class Feature:
     manage_url: str | None = None
 
 
+@unique
+class SubsystemStatus(StrEnum):
+    """Readiness of a subsystem initialized at startup"""
+
+    PENDING = "pending"
+    READY = "ready"
+    FAILED = "failed"
+    DISABLED = "disabled"
+
+
+class Readiness(BaseModel):
+    """Readiness of the subsystems initialized in the background"""
+
+    can: SubsystemStatus = SubsystemStatus.PENDING
+    cloud: SubsystemStatus = SubsystemStatus.PENDING
+
+
 class SystemStateModel(BaseModel, JSONEncoder):
     """Data model for API state"""
 
@@ -324,6 +457,51 @@ class SystemStateModel(BaseModel, JSONEncoder):
     disk_capacity: DiskCapacity
     measurement_status: MeasurementStatus
     cloud: Feature
+    readiness: Readiness = Field(default_factory=Readiness)
+
+
+@dataclass
+class LoopLagStatistics:
+    """Statistics about event loop lag samples in milliseconds"""
+
+    samples: int
+    current: float | None
+    mean: float | None
+    p50: float | None
+    p95: float | None
+    p99: float | None
+    max: float | None
+
+
+@dataclass
+class SlowCallback:
+    """Information about code that blocked the event loop"""
+
+    timestamp: str
+    duration: float
+    task: str | None
+    route: str | None
+    stack: list[str]
+
+
+@dataclass
+class LoopReport:
+    """Rolling report about the health of the event loop"""
+
+    interval: float
+    threshold: float
+    lag: LoopLagStatistics
+    slow_callbacks: list[SlowCallback]
+    measurement_running: bool
+
+
+@dataclass
+class LoggingReport:
+    """Report about the state of the logging pipeline"""
+
+    queued: int
+    capacity: int
+    dropped: dict[str, int]
 
 
 class SocketMessage(BaseModel, JSONEncoder):
@@ -403,6 +581,34 @@ class LogListResponse:
     backup_count: int
 
 
+# pylint: disable=too-many-instance-attributes
+
+
+@dataclass
+class LogEntry:
+    """Log record found by a log search"""
+
+    file: str
+    offset: int
+    timestamp: Optional[str]
+    level: Optional[str]
+    logger: Optional[str]
+    message: str
+    measurement: Optional[str] = None
+    session: Optional[str] = None
+
+
+# pylint: enable=too-many-instance-attributes
+
+
+@dataclass
+class LogSearchResponse:
+    """Response to log searches"""
+
+    entries: List[LogEntry]
+    next_cursor: Optional[str]
+
+
 class Sensor(BaseModel):
     """Sensor attributes"""
 
@@ -471,10 +677,10 @@ class HDF5NodeInfo(BaseModel, JSONEncoder):
 class ParsedHDF5FileContent(JSONEncoder):
     """HDF5 data file content"""
 
-    acceleration_df: pandas.DataFrame
-    sensor_df: pandas.DataFrame
+    acceleration_df: "pandas.DataFrame"
+    sensor_df: "pandas.DataFrame"
     acceleration_meta: HDF5NodeInfo
-    pictures: dict[str, list[str]]
+    pictures: dict[str, list[PictureInfo]]
     embedded_files: list[EmbeddedFileInfo]
 
 
@@ -482,7 +688,7 @@ class ParsedMetadata(BaseModel, JSONEncoder):
     """HDF5 metadata"""
 
     acceleration: HDF5NodeInfo
-    pictures: dict[str, list[str]]
+    pictures: dict[str, list[PictureInfo]]
     sensors: list[Sensor]
     embedded_files: list[EmbeddedFileInfo]
 
@@ -7,7 +7,13 @@ from typing import Any, Optional
 import requests
 import logging
 
-from icoapi.models.cloud import BearerAuthConnection, BearerAuthRoutes, METHODS, RouteDescription
+from icoapi.models.cloud import (
+    CLOUD_SETUP_TIMEOUT,
+    BearerAuthConnection,
+    BearerAuthRoutes,
+    METHODS,
+    RouteDescription,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -142,7 +148,10 @@ class StorageClient:
         presigned_url = validate_presign_url(presigned_url_response)
 
         with open(file_path, "rb") as f:
-            return requests.put(presigned_url, data=f)
+            # Only limit connecting, since uploads of large files take long
+            return requests.put(
+                presigned_url, data=f, timeout=(CLOUD_SETUP_TIMEOUT, None)
+            )
 
     def update_file(
             self,
@@ -156,13 +165,16 @@ class StorageClient:
         presigned_url = validate_presign_url(presigned_url_response)
 
         with open(file_path, "rb") as f:
-            return requests.put(presigned_url, data=f)
+            # Only limit connecting, since uploads of large files take long
+            return requests.put(
+                presigned_url, data=f, timeout=(CLOUD_SETUP_TIMEOUT, None)
+            )
 
     def authenticate(self, *args, **kwargs):
         self.connection.authenticate()
 
     def refresh(self, *args, **kwargs):
-        self.connection.refresh()
+        self.connection.refresh_authentication()
 
     def is_authenticated(self):
         return self.connection.is_authenticated()
@@ -1,6 +1,8 @@
 """Support for uploading data to cloud storage"""
+import asyncio
 import logging
 import os
+from pathlib import Path
 from typing import Optional
 
 from fastapi import HTTPException, APIRouter
@@ -20,6 +22,7 @@ from icoapi.scripts.errors import (
     HTTP_500_CLOUD_UPLOAD_PRESIGN_SPEC,
 )
 from icoapi.scripts.file_handling import get_measurement_dir
+from icoapi.utils.logging_setup import current_measurement
 
 router = APIRouter(prefix="/cloud", tags=["Cloud Connection"])
 
@@ -40,6 +43,8 @@ async def upload_file(
 ):
     """Upload file to cloud storage"""
 
+    current_measurement.set(Path(filename).stem)
+
     if client is None:
         logger.warning(
             "Tried to upload file to cloud, but no cloud connection is"
@@ -76,8 +81,10 @@ async def upload_file(
             upload_details.virtual_group = vg
 
         try:
-            client.upload_file(
-                os.path.join(measurement_dir, filename), upload_details
+            await asyncio.to_thread(
+                client.upload_file,
+                os.path.join(measurement_dir, filename),
+                upload_details,
             )
             logger.info("Successfully uploaded file <%s>", filename)
         except PresignError as e:
@@ -92,11 +99,17 @@ async def update_file(
     measurement_dir: Annotated[str, Depends(get_measurement_dir)],
 ) -> FileCloudDetails:
     """Update file in cloud storage"""
+
+    current_measurement.set(Path(filename).stem)
     if file_id is None:
         raise HTTPException(status_code=400, detail="File ID is required")
 
     try:
-        client.update_file(file_id, os.path.join(measurement_dir, filename))
+        await asyncio.to_thread(
+            client.update_file,
+            file_id,
+            os.path.join(measurement_dir, filename),
+        )
         logger.info("Successfully updated file <%s> with id <%i>", filename, file_id)
         return FileCloudDetails(
             id=file_id,
@@ -126,7 +139,7 @@ async def authenticate(
         storage.revoke_auth()
         await setup_trident()
         try:
-            storage.authenticate()
+            await asyncio.to_thread(storage.authenticate)
         except HTTPException as e:
             logger.error(e)
         except HostNotFoundError as e:
@@ -154,7 +167,7 @@ async def get_cloud_files(
         return []
 
     try:
-        objects = storage.get_remote_objects()
+        objects = await asyncio.to_thread(storage.get_remote_objects)
         return objects.files
     except Exception as e:
         logger.error("Error getting cloud files.")
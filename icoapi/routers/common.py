@@ -14,10 +14,12 @@ from icoapi.models.globals import (
     ICOsystemSingleton,
     get_measurement_state,
     get_messenger,
+    get_readiness,
     get_trident_feature,
 )
 from icoapi.models.models import Feature, SocketMessage, SystemStateModel
 from icoapi.scripts.file_handling import get_disk_space_in_gib
+from icoapi.utils.loop_monitor import get_loop_monitor
 
 router = APIRouter(tags=["General"])
 
@@ -38,6 +40,7 @@ def state(
         disk_capacity=get_disk_space_in_gib(),
         measurement_status=measurement_state.get_status(),
         cloud=cloud,
+        readiness=get_readiness(),
     )
 
 
@@ -67,5 +70,11 @@ async def state_websocket(
             msg = SocketMessage(**json.loads(text))
             if msg.message == "get_state":
                 await messenger.push_messenger_update()
+            elif msg.message == "get_loop_report":
+                await messenger.send_loop_report(
+                    get_loop_monitor().report(), websocket
+                )
+            elif msg.message == "subscribe_loop_report":
+                messenger.subscribe_loop_report(websocket)
     except WebSocketDisconnect:
         messenger.remove_messenger(websocket)
@@ -55,7 +55,7 @@ from icoapi.scripts.errors import (
     HTTP_500_CONFIG_WRITE_EXCEPTION,
     HTTP_500_CONFIG_WRITE_SPEC,
 )
-from icoapi.scripts.file_handling import get_config_dir
+from icoapi.utils.environment import get_config_dir
 
 router = APIRouter(prefix="/config", tags=["Configuration"])
 
@@ -0,0 +1,30 @@
+"""Routes for runtime diagnostics"""
+
+import logging
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+
+from icoapi.models.models import LoggingReport, LoopReport
+from icoapi.utils.logging_setup import get_logging_report
+from icoapi.utils.loop_monitor import LoopMonitor, get_loop_monitor
+
+router = APIRouter(prefix="/diagnostics", tags=["Diagnostics"])
+
+logger = logging.getLogger(__name__)
+
+
+@router.get("/loop")
+def loop_report(
+    monitor: Annotated[LoopMonitor, Depends(get_loop_monitor)],
+) -> LoopReport:
+    """Get rolling report about event loop lag and slow callbacks"""
+
+    return monitor.report()
+
+
+@router.get("/logging")
+def logging_report() -> LoggingReport:
+    """Get the number of queued and dropped log records"""
+
+    return get_logging_report()
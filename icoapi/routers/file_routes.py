@@ -1,14 +1,22 @@
 """Routes for measurement data"""
 
+import asyncio
 import json
 import logging
 import os
 from datetime import datetime
 from typing import Annotated, AsyncGenerator
 from urllib.parse import quote
-from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi import (
+    APIRouter,
+    File,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+)
 from fastapi.params import Depends
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from icotronic.measurement.storage import Storage
 from starlette.responses import PlainTextResponse
 from tables import HDF5ExtError, NoSuchNodeError, Node
@@ -23,6 +31,10 @@ from icoapi.models.models import (
     FileCloudDetails,
     FileListResponseModel,
     MeasurementFileDetails,
+    MeasurementOverview,
+    MeasurementSpectrogram,
+    MeasurementSpectrum,
+    MeasurementSummaryDetails,
     Metadata,
     MetadataPrefix,
     ParsedMeasurement,
@@ -30,32 +42,123 @@ from icoapi.models.models import (
     Sensor,
 )
 from icoapi.models.trident import RemoteObjectDetails, StorageClient
+from icoapi.scripts.archive import find_measurement_files
+from icoapi.scripts.catalog import load_catalog
 from icoapi.scripts.cloud_scripts import get_cloud_details
 from icoapi.scripts.data_handling import AccelerationDataNotFoundError, get_file_data
 from icoapi.scripts.errors import (
+    HTTP_400_INVALID_DATA_RANGE_EXCEPTION,
+    HTTP_400_INVALID_DATA_RANGE_SPEC,
     HTTP_404_FILE_NOT_FOUND_EXCEPTION,
     HTTP_404_FILE_NOT_FOUND_SPEC,
+    HTTP_416_RANGE_NOT_SATISFIABLE_EXCEPTION,
+    HTTP_416_RANGE_NOT_SATISFIABLE_SPEC,
     HTTP_422_INVALID_HDF5_FILE_EXCEPTION,
     HTTP_422_INVALID_HDF5_FILE_SPEC,
+    HTTP_501_EXPORT_FORMAT_UNAVAILABLE_EXCEPTION,
+    HTTP_501_EXPORT_FORMAT_UNAVAILABLE_SPEC,
+)
+from icoapi.scripts.export import (
+    EXPORT_MEDIA_TYPES,
+    ExportFormat,
+    check_export_format,
+    export_measurement,
 )
 from icoapi.scripts.file_handling import (
-    append_embedded_file_to_hdf5,
+    append_embedded_files_to_hdf5,
     delete_embedded_file_from_hdf5,
-    get_embedded_file_from_hdf5,
+    delete_sidecar_files,
+    get_embedded_file_details,
     get_disk_space_in_gib,
     get_drive_or_root_path,
     get_measurement_dir,
     get_suffixed_filename,
     is_dangerous_filename,
+    read_embedded_file_chunks,
 )
-
 from icoapi.scripts.measurement import write_metadata
+from icoapi.scripts.measurement_data import read_measurement_range
+from icoapi.scripts.overview import read_overview
+from icoapi.scripts.pictures import read_picture
+from icoapi.scripts.spectrum import (
+    WindowFunction,
+    read_spectrogram,
+    read_spectrum,
+)
+from icoapi.scripts.summary import load_summary_statistics, update_summary
+from icoapi.utils.downloads import (
+    create_etag,
+    get_validator_headers,
+    is_not_modified,
+    parse_range,
+)
+from icoapi.utils.executor import run_in_hdf5_executor
+from icoapi.utils.zip_stream import stream_zip
 
 router = APIRouter(prefix="/files", tags=["File Handling"])
 
 logger = logging.getLogger(__name__)
 
 
+def get_measurement_file_path(name: str, measurement_dir: str) -> str:
+    """Get the path of an existing measurement file
+
+    Raises:
+
+        HTTPException:
+            If the name is not allowed or the file does not exist
+
+    """
+
+    danger, cause = is_dangerous_filename(name)
+    if danger:
+        raise HTTPException(
+            status_code=405, detail=f"Method not allowed: {cause}"
+        )
+
+    file_path = os.path.join(measurement_dir, name)
+    if not os.path.isfile(file_path):
+        raise HTTP_404_FILE_NOT_FOUND_EXCEPTION
+
+    return file_path
+
+
+def get_measurement_file_details(
+    measurement_dir: str, cloud_files: list[RemoteObjectDetails], cloud: bool
+) -> list[MeasurementFileDetails]:
+    """Get the details of all files in the measurement directory"""
+
+    files_info: list[MeasurementFileDetails] = []
+    for filename in os.listdir(measurement_dir):
+        file_path = os.path.join(measurement_dir, filename)
+        if not os.path.isfile(file_path):
+            continue
+        cloud_details = FileCloudDetails(
+            status=FileCloudStatus.NOT_UPLOADED, upload_timestamp=None, id=None
+        )
+        if cloud:
+            try:
+                cloud_details = get_cloud_details(
+                    file_path, filename, cloud_files
+                )
+            except ValueError:
+                cloud_details = FileCloudDetails(
+                    status=FileCloudStatus.ERROR, upload_timestamp=None, id=None
+                )
+        files_info.append(
+            MeasurementFileDetails(
+                name=filename,
+                size=os.path.getsize(file_path),
+                created=datetime.fromtimestamp(
+                    os.path.getctime(file_path)
+                ).isoformat(),
+                cloud=cloud_details,
+                summary=load_summary_statistics(file_path),
+            )
+        )
+    return files_info
+
+
 @router.get("")
 async def list_files_and_capacity(
     measurement_dir: Annotated[str, Depends(get_measurement_dir)],
@@ -65,51 +168,26 @@ async def list_files_and_capacity(
 
     try:
         capacity = get_disk_space_in_gib(get_drive_or_root_path())
-        files_info: list[MeasurementFileDetails] = []
         cloud_files: list[RemoteObjectDetails] = []
         if storage is not None:
             try:
-                cloud_files = storage.get_remote_objects().files
+                # Retries of the cloud client must not block the event loop
+                cloud_files = (
+                    await asyncio.to_thread(storage.get_remote_objects)
+                ).files
             except HTTPException:
                 logger.error("Error listing cloud files")
             except Exception as e:  # pylint: disable=broad-exception-caught
                 logger.error(
                     "General exception when comparing files to cloud: %s", e
                 )
-        # Iterate over files in the directory
-        for filename in os.listdir(measurement_dir):
-            file_path = os.path.join(measurement_dir, filename)
-            if os.path.isfile(file_path):
-                # Get file creation time and size
-                creation_time = datetime.fromtimestamp(
-                    os.path.getctime(file_path)
-                ).isoformat()
-                file_size = os.path.getsize(file_path)
-                try:
-                    cloud_details = get_cloud_details(file_path, filename, cloud_files)
-                except ValueError:
-                    cloud_details = FileCloudDetails(
-                        status=FileCloudStatus.ERROR,
-                        upload_timestamp=None,
-                        id=None
-                    )
-                cloud_details = (
-                    cloud_details
-                    if storage is not None
-                    else FileCloudDetails(
-                        status=FileCloudStatus.NOT_UPLOADED,
-                        upload_timestamp=None,
-                        id=None
-                    )
-                )
-
-                details = MeasurementFileDetails(
-                    name=filename,
-                    size=file_size,
-                    created=creation_time,
-                    cloud=cloud_details,
-                )
-                files_info.append(details)
+        # Reading the statistics of many files must not block the event loop
+        files_info = await asyncio.to_thread(
+            get_measurement_file_details,
+            measurement_dir,
+            cloud_files,
+            storage is not None,
+        )
         return FileListResponseModel(capacity, files_info, measurement_dir)
     except FileNotFoundError as error:
         raise HTTPException(
@@ -119,11 +197,80 @@ async def list_files_and_capacity(
         raise HTTPException(status_code=500, detail=str(e)) from e
 
 
+# pylint: disable=too-many-arguments, too-many-positional-arguments
+
+
+@router.get(
+    "/archive",
+    response_class=StreamingResponse,
+    responses={404: HTTP_404_FILE_NOT_FOUND_SPEC},
+)
+async def download_archive(
+    measurement_dir: Annotated[str, Depends(get_measurement_dir)],
+    names: Annotated[
+        list[str] | None, Query(description="Names of the archived files")
+    ] = None,
+    start: Annotated[
+        datetime | None, Query(description="Files created at or after")
+    ] = None,
+    end: Annotated[
+        datetime | None, Query(description="Files created at or before")
+    ] = None,
+    tool_name: Annotated[
+        str | None, Query(description="Name of the measuring tool")
+    ] = None,
+    profile: Annotated[
+        str | None, Query(description="Metadata profile of the measurement")
+    ] = None,
+) -> StreamingResponse:
+    """Download multiple measurement files as ZIP archive
+
+    The archive is created while it is sent, which means it is never
+    stored completely in memory.
+    """
+
+    if names is not None:
+        names = list(dict.fromkeys(names))
+        for name in names:
+            get_measurement_file_path(name, measurement_dir)
+
+    matching = await run_in_hdf5_executor(
+        find_measurement_files,
+        measurement_dir,
+        names,
+        start=start,
+        end=end,
+        tool_name=tool_name,
+        profile=profile,
+    )
+    if not matching:
+        raise HTTP_404_FILE_NOT_FOUND_EXCEPTION
+
+    return StreamingResponse(
+        stream_zip(
+            [(os.path.join(measurement_dir, name), name) for name in matching]
+        ),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": "attachment; filename=measurements.zip"
+        },
+    )
+
+
+# pylint: enable=too-many-arguments, too-many-positional-arguments
+
+
 @router.get("/{name}")
 async def download_file(
-    name: str, measurement_dir: Annotated[str, Depends(get_measurement_dir)]
+    name: str,
+    request: Request,
+    measurement_dir: Annotated[str, Depends(get_measurement_dir)],
 ):
-    """Download measurement files"""
+    """Download measurement files
+
+    The endpoint supports range requests (to resume downloads) and
+    conditional requests (``If-None-Match``, ``If-Modified-Since``).
+    """
 
     # Sanitization
     danger, cause = is_dangerous_filename(name)
@@ -136,7 +283,283 @@ async def download_file(
     if not os.path.isfile(full_path):
         raise HTTPException(status_code=404, detail="File not found")
 
-    return FileResponse(path=full_path, filename=name)
+    stat_result = os.stat(full_path)
+    etag = create_etag(name, stat_result.st_mtime_ns, stat_result.st_size)
+    headers = get_validator_headers(etag, stat_result.st_mtime)
+    if is_not_modified(request.headers, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    # `FileResponse` handles range requests itself
+    return FileResponse(
+        path=full_path,
+        filename=name,
+        headers=headers,
+        stat_result=stat_result,
+    )
+
+
+# pylint: disable=too-many-arguments, too-many-positional-arguments
+
+
+@router.get(
+    "/{name}/range",
+    responses={
+        400: HTTP_400_INVALID_DATA_RANGE_SPEC,
+        404: HTTP_404_FILE_NOT_FOUND_SPEC,
+        422: HTTP_422_INVALID_HDF5_FILE_SPEC,
+    },
+)
+async def get_measurement_range(
+    name: str,
+    measurement_dir: Annotated[str, Depends(get_measurement_dir)],
+    start: Annotated[
+        float | None, Query(description="Start of time window in seconds")
+    ] = None,
+    end: Annotated[
+        float | None, Query(description="End of time window in seconds")
+    ] = None,
+    first_row: Annotated[
+        int | None, Query(description="Index of first row", ge=0)
+    ] = None,
+    stop_row: Annotated[
+        int | None, Query(description="Index after last row", ge=0)
+    ] = None,
+    channels: Annotated[
+        list[str] | None, Query(description="Returned channels")
+    ] = None,
+    step: Annotated[int, Query(description="Return every n-th row", ge=1)] = 1,
+) -> ParsedMeasurement:
+    """Get measurement data of a time or row range"""
+
+    file_path = get_measurement_file_path(name, measurement_dir)
+
+    try:
+        return await run_in_hdf5_executor(
+            read_measurement_range,
+            file_path,
+            start,
+            end,
+            first_row=first_row,
+            stop_row=stop_row,
+            channels=channels,
+            step=step,
+        )
+    except ValueError as exc:
+        raise HTTP_400_INVALID_DATA_RANGE_EXCEPTION from exc
+    except HDF5ExtError as exc:
+        raise HTTP_422_INVALID_HDF5_FILE_EXCEPTION from exc
+
+
+@router.get(
+    "/{name}/overview",
+    responses={
+        400: HTTP_400_INVALID_DATA_RANGE_SPEC,
+        404: HTTP_404_FILE_NOT_FOUND_SPEC,
+        422: HTTP_422_INVALID_HDF5_FILE_SPEC,
+    },
+)
+async def get_measurement_overview(
+    name: str,
+    measurement_dir: Annotated[str, Depends(get_measurement_dir)],
+    start: Annotated[
+        float | None, Query(description="Start of time window in seconds")
+    ] = None,
+    end: Annotated[
+        float | None, Query(description="End of time window in seconds")
+    ] = None,
+    width: Annotated[
+        int, Query(description="Maximum number of points", ge=1, le=100_000)
+    ] = 1000,
+    channels: Annotated[
+        list[str] | None, Query(description="Returned channels")
+    ] = None,
+) -> MeasurementOverview:
+    """Get minimum, maximum and mean values of a time window"""
+
+    file_path = get_measurement_file_path(name, measurement_dir)
+
+    try:
+        return await run_in_hdf5_executor(
+            read_overview,
+            file_path,
+            start,
+            end,
+            width=width,
+            channels=channels,
+        )
+    except ValueError as exc:
+        raise HTTP_400_INVALID_DATA_RANGE_EXCEPTION from exc
+    except HDF5ExtError as exc:
+        raise HTTP_422_INVALID_HDF5_FILE_EXCEPTION from exc
+
+
+@router.get(
+    "/{name}/spectrum",
+    responses={
+        400: HTTP_400_INVALID_DATA_RANGE_SPEC,
+        404: HTTP_404_FILE_NOT_FOUND_SPEC,
+        422: HTTP_422_INVALID_HDF5_FILE_SPEC,
+    },
+)
+async def get_measurement_spectrum(
+    name: str,
+    measurement_dir: Annotated[str, Depends(get_measurement_dir)],
+    start: Annotated[
+        float | None, Query(description="Start of time window in seconds")
+    ] = None,
+    end: Annotated[
+        float | None, Query(description="End of time window in seconds")
+    ] = None,
+    channels: Annotated[
+        list[str] | None, Query(description="Analyzed channels")
+    ] = None,
+    segment_length: Annotated[
+        int, Query(description="Values per segment", ge=2, le=65_536)
+    ] = 1024,
+    overlap: Annotated[
+        float, Query(description="Overlap of segments", ge=0, le=0.9)
+    ] = 0.5,
+    window: Annotated[
+        WindowFunction, Query(description="Window function")
+    ] = "hann",
+) -> MeasurementSpectrum:
+    """Get the power spectral density of a time window"""
+
+    file_path = get_measurement_file_path(name, measurement_dir)
+
+    try:
+        return await run_in_hdf5_executor(
+            read_spectrum,
+            file_path,
+            start,
+            end,
+            channels=channels,
+            segment_length=segment_length,
+            overlap=overlap,
+            window=window,
+        )
+    except ValueError as exc:
+        raise HTTP_400_INVALID_DATA_RANGE_EXCEPTION from exc
+    except HDF5ExtError as exc:
+        raise HTTP_422_INVALID_HDF5_FILE_EXCEPTION from exc
+
+
+@router.get(
+    "/{name}/spectrogram",
+    responses={
+        400: HTTP_400_INVALID_DATA_RANGE_SPEC,
+        404: HTTP_404_FILE_NOT_FOUND_SPEC,
+        422: HTTP_422_INVALID_HDF5_FILE_SPEC,
+    },
+)
+async def get_measurement_spectrogram(
+    name: str,
+    measurement_dir: Annotated[str, Depends(get_measurement_dir)],
+    start: Annotated[
+        float | None, Query(description="Start of time window in seconds")
+    ] = None,
+    end: Annotated[
+        float | None, Query(description="End of time window in seconds")
+    ] = None,
+    channels: Annotated[
+        list[str] | None, Query(description="Analyzed channels")
+    ] = None,
+    segment_length: Annotated[
+        int, Query(description="Values per segment", ge=2, le=8192)
+    ] = 256,
+    overlap: Annotated[
+        float, Query(description="Overlap of segments", ge=0, le=0.9)
+    ] = 0.5,
+    window: Annotated[
+        WindowFunction, Query(description="Window function")
+    ] = "hann",
+    columns: Annotated[
+        int, Query(description="Maximum number of spectra", ge=1, le=1024)
+    ] = 256,
+) -> MeasurementSpectrogram:
+    """Get the spectrogram of a time window"""
+
+    file_path = get_measurement_file_path(name, measurement_dir)
+
+    try:
+        return await run_in_hdf5_executor(
+            read_spectrogram,
+            file_path,
+            start,
+            end,
+            channels=channels,
+            segment_length=segment_length,
+            overlap=overlap,
+            window=window,
+            columns=columns,
+        )
+    except ValueError as exc:
+        raise HTTP_400_INVALID_DATA_RANGE_EXCEPTION from exc
+    except HDF5ExtError as exc:
+        raise HTTP_422_INVALID_HDF5_FILE_EXCEPTION from exc
+
+
+# pylint: enable=too-many-arguments, too-many-positional-arguments
+
+
+@router.get(
+    "/{name}/summary",
+    responses={
+        404: HTTP_404_FILE_NOT_FOUND_SPEC,
+        422: HTTP_422_INVALID_HDF5_FILE_SPEC,
+    },
+)
+async def get_measurement_summary(
+    name: str, measurement_dir: Annotated[str, Depends(get_measurement_dir)]
+) -> MeasurementSummaryDetails:
+    """Get statistics and power spectral densities of a measurement"""
+
+    file_path = get_measurement_file_path(name, measurement_dir)
+
+    try:
+        return await run_in_hdf5_executor(update_summary, file_path)
+    except HDF5ExtError as exc:
+        raise HTTP_422_INVALID_HDF5_FILE_EXCEPTION from exc
+
+
+@router.get(
+    "/{name}/export",
+    response_class=FileResponse,
+    responses={
+        404: HTTP_404_FILE_NOT_FOUND_SPEC,
+        422: HTTP_422_INVALID_HDF5_FILE_SPEC,
+        501: HTTP_501_EXPORT_FORMAT_UNAVAILABLE_SPEC,
+    },
+)
+async def export_file(
+    name: str,
+    measurement_dir: Annotated[str, Depends(get_measurement_dir)],
+    export_format: Annotated[
+        ExportFormat, Query(alias="format", description="Export format")
+    ] = "parquet",
+) -> FileResponse:
+    """Download measurement data converted into another file format"""
+
+    file_path = get_measurement_file_path(name, measurement_dir)
+
+    try:
+        check_export_format(export_format)
+    except ImportError as exc:
+        raise HTTP_501_EXPORT_FORMAT_UNAVAILABLE_EXCEPTION from exc
+
+    try:
+        # The export only uses the HDF5 executor for reading blocks of rows
+        export_path = await asyncio.to_thread(
+            export_measurement, file_path, export_format
+        )
+    except HDF5ExtError as exc:
+        raise HTTP_422_INVALID_HDF5_FILE_EXCEPTION from exc
+
+    return FileResponse(
+        path=export_path,
+        filename=f"{os.path.splitext(name)[0]}.{export_format}",
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+    )
 
 
 @router.delete("/{name}")
@@ -156,6 +579,7 @@ async def delete_file(
     if os.path.isfile(full_path):
         try:
             os.remove(full_path)
+            delete_sidecar_files(full_path)
             return {"detail": f"File '{name}' deleted successfully"}
         except Exception as e:
             raise HTTPException(
@@ -295,35 +719,38 @@ async def upload_embedded_file(
         raise HTTP_404_FILE_NOT_FOUND_EXCEPTION
 
     try:
-        responses: list[EmbeddedFileUploadResponse] = []
-        for file in files:
-            payload = await file.read()
-            responses.append(
-                append_embedded_file_to_hdf5(
-                    file_path,
-                    file.filename,
-                    payload,
-                    file.content_type,
-                )
-            )
-        return responses
+        return await run_in_hdf5_executor(
+            append_embedded_files_to_hdf5,
+            file_path,
+            [(file.filename, file.file, file.content_type) for file in files],
+        )
     except HDF5ExtError as exc:
         raise HTTP_422_INVALID_HDF5_FILE_EXCEPTION from exc
 
 
+# pylint: disable=too-many-locals
+
+
 @router.get(
     "/{name}/embedded/{dataset_name}",
+    response_class=StreamingResponse,
     responses={
         404: HTTP_404_FILE_NOT_FOUND_SPEC,
+        416: HTTP_416_RANGE_NOT_SATISFIABLE_SPEC,
         422: HTTP_422_INVALID_HDF5_FILE_SPEC,
     },
 )
 async def download_embedded_file(
     name: str,
     dataset_name: str,
+    request: Request,
     measurement_dir: Annotated[str, Depends(get_measurement_dir)],
-) -> StreamingResponse:
-    """Download an embedded file from an HDF5 file"""
+) -> Response:
+    """Download an embedded file from an HDF5 file
+
+    The endpoint reads the embedded file in chunks and supports (single)
+    range requests and conditional requests.
+    """
 
     danger, cause = is_dangerous_filename(name)
     if danger:
@@ -336,25 +763,57 @@ async def download_embedded_file(
         raise HTTP_404_FILE_NOT_FOUND_EXCEPTION
 
     try:
-        embedded_file = get_embedded_file_from_hdf5(file_path, dataset_name)
+        embedded_file = await run_in_hdf5_executor(
+            get_embedded_file_details, file_path, dataset_name
+        )
     except NoSuchNodeError as exc:
         raise HTTP_404_FILE_NOT_FOUND_EXCEPTION from exc
     except HDF5ExtError as exc:
         raise HTTP_422_INVALID_HDF5_FILE_EXCEPTION from exc
 
+    stat_result = os.stat(file_path)
+    etag = create_etag(
+        name, dataset_name, stat_result.st_mtime_ns, stat_result.st_size
+    )
+    headers = get_validator_headers(etag, stat_result.st_mtime)
+    if is_not_modified(request.headers, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        byte_range = parse_range(
+            request.headers, embedded_file.size, etag, stat_result.st_mtime
+        )
+    except ValueError as exc:
+        raise HTTP_416_RANGE_NOT_SATISFIABLE_EXCEPTION(
+            embedded_file.size
+        ) from exc
+
+    start, stop = (0, embedded_file.size) if byte_range is None else byte_range
     quoted_name = quote(embedded_file.original_name)
+    headers.update({
+        "accept-ranges": "bytes",
+        "content-length": str(stop - start),
+        "content-disposition": (
+            f'attachment; filename="{embedded_file.original_name}"; '
+            f"filename*=UTF-8''{quoted_name}"
+        ),
+    })
+    if byte_range is not None:
+        headers["content-range"] = (
+            f"bytes {start}-{stop - 1}/{embedded_file.size}"
+        )
+
     return StreamingResponse(
-        iter([embedded_file.content]),
+        read_embedded_file_chunks(file_path, dataset_name, start, stop),
+        status_code=200 if byte_range is None else 206,
         media_type=embedded_file.mime,
-        headers={
-            "Content-Disposition": (
-                f'attachment; filename="{embedded_file.original_name}"; '
-                f"filename*=UTF-8''{quoted_name}"
-            )
-        },
+        headers=headers,
     )
 
 
+# pylint: enable=too-many-locals
+
+
 @router.delete(
     "/{name}/embedded/{dataset_name}",
     responses={
@@ -393,6 +852,61 @@ async def delete_embedded_file(
     )
 
 
+# pylint: disable=too-many-arguments, too-many-locals, too-many-positional-arguments
+
+
+@router.get(
+    "/{name}/pictures/{parameter}/{index}",
+    response_class=Response,
+    responses={
+        404: HTTP_404_FILE_NOT_FOUND_SPEC,
+        422: HTTP_422_INVALID_HDF5_FILE_SPEC,
+    },
+)
+async def download_picture(
+    name: str,
+    parameter: str,
+    index: int,
+    request: Request,
+    measurement_dir: Annotated[str, Depends(get_measurement_dir)],
+    thumbnail: Annotated[
+        bool, Query(description="Download the downscaled picture")
+    ] = False,
+) -> Response:
+    """Download a picture stored in the metadata of a measurement"""
+
+    file_path = get_measurement_file_path(name, measurement_dir)
+
+    try:
+        catalog = await run_in_hdf5_executor(load_catalog, file_path)
+        pictures = catalog.pictures.get(parameter, [])
+        if not 0 <= index < len(pictures):
+            raise HTTP_404_FILE_NOT_FOUND_EXCEPTION
+        picture = pictures[index]
+        mime = picture.thumbnail_mime if thumbnail else picture.mime
+        if mime is None:
+            raise HTTP_404_FILE_NOT_FOUND_EXCEPTION
+
+        modified = os.stat(file_path).st_mtime
+        etag = create_etag(picture.sha256, thumbnail)
+        headers = get_validator_headers(etag, modified)
+        if is_not_modified(request.headers, etag, modified):
+            return Response(status_code=304, headers=headers)
+
+        content = await run_in_hdf5_executor(
+            read_picture, file_path, parameter, index, thumbnail
+        )
+    except NoSuchNodeError as exc:
+        raise HTTP_404_FILE_NOT_FOUND_EXCEPTION from exc
+    except HDF5ExtError as exc:
+        raise HTTP_422_INVALID_HDF5_FILE_EXCEPTION from exc
+
+    return Response(content, media_type=mime, headers=headers)
+
+
+# pylint: enable=too-many-arguments, too-many-locals, too-many-positional-arguments
+
+
 @router.get("/analyze/meta/{name}")
 async def get_file_meta(
     name: str, measurement_dir: Annotated[str, Depends(get_measurement_dir)]
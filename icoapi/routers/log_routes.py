@@ -1,11 +1,15 @@
 """Routes for logging functionality"""
 
+import asyncio
 import io
 import logging
 import os
 import re
 import zipfile
 from collections import deque
+from collections.abc import Iterator
+from datetime import datetime
+from typing import Annotated, Literal
 
 from fastapi import (
     APIRouter,
@@ -14,17 +18,27 @@ from fastapi import (
     WebSocket,
     WebSocketDisconnect,
 )
-from starlette.responses import Response, StreamingResponse
-
-from icoapi.models.models import LogFileMeta, LogListResponse, LogResponse
-from icoapi.utils.logging_setup import (
-    log_watchers,
-    LOG_PATH,
-    parse_timestamps,
-    LOG_NAME,
-    LOG_BACKUP_COUNT,
-    LOG_MAX_BYTES,
+from starlette.responses import FileResponse, StreamingResponse
+
+from icoapi.models.models import (
+    LogListResponse,
+    LogResponse,
+    LogSearchResponse,
+)
+from icoapi.utils.log_index import log_index
+from icoapi.utils.log_rotation import (
+    get_archive_name,
+    get_log_files,
+    is_compressed,
+    open_log_file,
 )
+from icoapi.utils.log_search import (
+    LogQuery,
+    find_record_range,
+    search_logs,
+)
+from icoapi.utils.logging_setup import log_broadcaster, log_settings
+from icoapi.utils.zip_stream import read_chunks, stream_zip_entries
 
 router = APIRouter(prefix="/logs", tags=["Logs"])
 
@@ -35,40 +49,14 @@ logger = logging.getLogger(__name__)
 def list_logs():
     """List log files"""
 
-    base_dir = os.path.dirname(LOG_PATH)
-    log_files = [f for f in os.listdir(base_dir) if f.startswith(LOG_NAME)]
-
-    files = []
-    for name in sorted(log_files):
-        path = os.path.join(base_dir, name)
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-            first_ts, last_ts = parse_timestamps(lines)
-        except Exception:  # pylint: disable=broad-exception-caught
-            first_ts = last_ts = None
-
-        try:
-            size = os.path.getsize(path)
-
-            files.append(
-                LogFileMeta(
-                    name=name,
-                    size=size,
-                    first_timestamp=first_ts,
-                    last_timestamp=last_ts,
-                )
-            )
-        except FileNotFoundError:
-            # This only happens when you change the files manually; and as soon
-            # as the logs fill back up it is gone
-            pass
+    base_dir = os.path.dirname(log_settings.path)
+    files = log_index.list_files(base_dir, log_settings.name)
 
     return LogListResponse(
         files=files,
         directory=base_dir,
-        max_bytes=LOG_MAX_BYTES,
-        backup_count=LOG_BACKUP_COUNT,
+        max_bytes=log_settings.max_bytes,
+        backup_count=log_settings.backup_count,
     )
 
 
@@ -76,7 +64,7 @@ def list_logs():
 def view_log_file(file: str = Query(...), limit: int = Query(0)):
     """View log file"""
 
-    base_dir = os.path.dirname(LOG_PATH)
+    base_dir = os.path.dirname(log_settings.path)
     safe_base = os.path.abspath(base_dir)
     requested_path = os.path.abspath(os.path.join(base_dir, file))
 
@@ -87,7 +75,9 @@ def view_log_file(file: str = Query(...), limit: int = Query(0)):
         raise HTTPException(status_code=404, detail="Log file not found.")
 
     try:
-        with open(requested_path, "r", encoding="utf-8", errors="ignore") as f:
+        with io.TextIOWrapper(
+            open_log_file(requested_path), encoding="utf-8", errors="ignore"
+        ) as f:
             if limit > 0:
                 # Efficient line-limiting (no storing the whole file)
                 lines = deque(f, maxlen=limit)
@@ -102,11 +92,102 @@ def view_log_file(file: str = Query(...), limit: int = Query(0)):
     return LogResponse(filename=file, content=content)
 
 
+def to_local_time(time: datetime | None) -> datetime | None:
+    """Convert a time into the (naive) local time used in the log files"""
+
+    if time is None or time.tzinfo is None:
+        return time
+    return time.astimezone().replace(tzinfo=None)
+
+
+# pylint: disable=too-many-arguments, too-many-positional-arguments
+
+
+@router.get("/search", response_model=LogSearchResponse)
+def search_log_files(
+    level: Annotated[
+        Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
+        Query(description="Minimum level of the log records"),
+    ] = "DEBUG",
+    loggers: Annotated[
+        list[str] | None,
+        Query(
+            alias="logger",
+            description="Only include records of these loggers (and children)",
+        ),
+    ] = None,
+    since: Annotated[
+        datetime | None,
+        Query(description="Only include records at or after this time"),
+    ] = None,
+    until: Annotated[
+        datetime | None,
+        Query(description="Only include records at or before this time"),
+    ] = None,
+    pattern: Annotated[
+        str | None,
+        Query(description="Regular expression searched in the messages"),
+    ] = None,
+    measurement: Annotated[
+        str | None,
+        Query(description="Only include records of this measurement"),
+    ] = None,
+    order: Annotated[
+        Literal["latest", "oldest"],
+        Query(description="Return the latest or the oldest records first"),
+    ] = "latest",
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+    cursor: Annotated[
+        str | None,
+        Query(description="Cursor of the next page of a previous search"),
+    ] = None,
+):
+    """Search the current and rotated log files
+
+    Lines without a timestamp (e.g. tracebacks) are part of the preceding
+    log record. Times without a time zone use the local time of the log
+    files. To get the next page, repeat the search with the returned
+    cursor.
+    """
+
+    try:
+        query = LogQuery(
+            level=logging.getLevelNamesMapping()[level],
+            loggers=loggers,
+            since=to_local_time(since),
+            until=to_local_time(until),
+            pattern=None if pattern is None else re.compile(pattern),
+            measurement=measurement,
+        )
+    except re.error as error:
+        raise HTTPException(
+            status_code=400, detail=f"Invalid pattern: {error}"
+        ) from error
+
+    try:
+        return search_logs(
+            os.path.dirname(log_settings.path),
+            log_settings.name,
+            query,
+            latest_first=order == "latest",
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error)) from error
+
+
+# pylint: enable=too-many-arguments, too-many-positional-arguments
+
+
 @router.get("/download/{file}")
 def download_log_file(file: str):
-    """Download log file"""
+    """Download log file
+
+    The endpoint supports range requests (e.g. to resume downloads).
+    """
 
-    base_dir = os.path.dirname(LOG_PATH)
+    base_dir = os.path.dirname(log_settings.path)
     safe_base = os.path.abspath(base_dir)
 
     logger.info("Downloading log file: %s", file)
@@ -119,57 +200,110 @@ def download_log_file(file: str):
     if not os.path.isfile(requested_path):
         raise HTTPException(status_code=404, detail="Log file not found.")
 
-    try:
-        with open(requested_path, "rb") as f:
-            content = f.read()
-    except Exception as e:
-        raise HTTPException(
-            status_code=500, detail=f"Error reading log file: {e}"
-        ) from e
-
-    return Response(
-        content=content,
-        media_type="text/plain",
-        headers={"Content-Disposition": f"attachment; filename={file}"},
+    return FileResponse(
+        requested_path,
+        media_type=(
+            "application/gzip" if is_compressed(requested_path) else "text/plain"
+        ),
+        filename=file,
     )
 
 
 @router.get("/all", response_class=StreamingResponse)
-async def download_logs_zip():
-    """Download log files as zipped file"""
-
-    base_dir = os.path.dirname(LOG_PATH)
-    log_file_pattern = re.compile(r".*\.log(\.\d+)?$")
-    log_files = [
-        f for f in os.listdir(base_dir) if log_file_pattern.fullmatch(f)
-    ]
+async def download_logs_zip(
+    since: Annotated[
+        datetime | None,
+        Query(description="Only include records at or after this time"),
+    ] = None,
+    until: Annotated[
+        datetime | None,
+        Query(description="Only include records at or before this time"),
+    ] = None,
+):
+    """Download log files as zipped file
+
+    The archive is created while it is sent and contains the uncompressed
+    log files. With a time range, it only contains the parts of the log
+    files inside the range.
+    """
+
+    base_dir = os.path.dirname(log_settings.path)
+    log_files = get_log_files(base_dir, log_settings.name)
     if not log_files:
         raise HTTPException(status_code=404, detail="No log files found.")
 
-    # In-memory ZIP creation
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-        for file_name in log_files:
-            file_path = os.path.join(base_dir, file_name)
-            zip_file.write(file_path, arcname=file_name)
+    query = LogQuery(since=to_local_time(since), until=to_local_time(until))
 
-    zip_buffer.seek(0)  # Reset pointer to start of the file
+    def get_entries() -> Iterator[tuple[zipfile.ZipInfo, Iterator[bytes]]]:
+        for file_name, file_path, stat in log_files:
+            try:
+                byte_range = find_record_range(
+                    file_path,
+                    stat,
+                    query,
+                    rotated=file_name != log_settings.name,
+                )
+            except FileNotFoundError:
+                # Removed by the log retention in the meantime
+                continue
+            if byte_range is None:
+                continue
+            info = zipfile.ZipInfo.from_file(
+                file_path, get_archive_name(file_name)
+            )
+            yield info, read_chunks(
+                file_path, *byte_range, opener=open_log_file
+            )
 
     return StreamingResponse(
-        zip_buffer,
+        stream_zip_entries(get_entries(), zipfile.ZIP_DEFLATED),
         media_type="application/zip",
         headers={"Content-Disposition": "attachment; filename=logs.zip"},
     )
 
 
 @router.websocket("/stream")
-async def websocket_logs(websocket: WebSocket):
-    """WebSocket for logging data"""
+async def websocket_logs(
+    websocket: WebSocket,
+    level: Annotated[
+        Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
+        Query(description="Minimum level of the sent log lines"),
+    ] = "DEBUG",
+    loggers: Annotated[
+        list[str] | None,
+        Query(
+            alias="logger",
+            description="Only send lines of these loggers (and children)",
+        ),
+    ] = None,
+    backfill: Annotated[
+        int | None,
+        Query(
+            ge=0,
+            description=(
+                "Number of recent lines sent first (default: all stored "
+                "lines)"
+            ),
+        ),
+    ] = None,
+):
+    """WebSocket for logging data
+
+    Every message contains one or more log lines separated by newlines.
+    """
 
     await websocket.accept()
-    log_watchers.append(websocket)
+    watcher = log_broadcaster.add_watcher(
+        logging.getLevelNamesMapping()[level], loggers, backfill
+    )
+    sender = asyncio.create_task(
+        watcher.send(websocket), name="log_stream_sender"
+    )
     try:
         while True:
             await websocket.receive_text()
     except WebSocketDisconnect:
-        log_watchers.remove(websocket)
+        pass
+    finally:
+        log_broadcaster.remove_watcher(watcher)
+        sender.cancel()
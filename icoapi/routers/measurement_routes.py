@@ -6,6 +6,7 @@ import logging
 
 import pathvalidate
 from fastapi import APIRouter, Depends
+from pydantic import ValidationError
 from icostate.error import IncorrectStateError
 from icotronic.can import NoResponseError
 from icotronic.can.error import UnsupportedFeatureException
@@ -16,6 +17,7 @@ from icoapi.models.models import (
     ControlResponse,
     MeasurementInstructions,
     Metadata,
+    SocketMessage,
 )
 from icoapi.models.globals import (
     get_messenger,
@@ -33,6 +35,10 @@ from icoapi.scripts.errors import (
     HTTP_504_MEASUREMENT_TIMEOUT_SPEC,
 )
 
+from icoapi.scripts.acquisition import (
+    MEASUREMENT_PROCESS,
+    run_measurement_in_process,
+)
 from icoapi.scripts.measurement import (
     measurement_preparations,
     run_measurement,
@@ -97,10 +103,12 @@ async def start_measurement(
         measurement_state.tool_name = "noname"
         logger.error("Tool not found!")
 
+    measure = (
+        run_measurement_in_process if MEASUREMENT_PROCESS else run_measurement
+    )
     measurement_state.task = asyncio.create_task(
-        run_measurement(
-            system, instructions, measurement_state, general_messenger
-        )
+        measure(system, instructions, measurement_state, general_messenger),
+        name="run_measurement",
     )
     logger.info(
         "Created measurement task with tool <%s> and timeout of %s",
@@ -168,7 +176,12 @@ async def websocket_endpoint(
     websocket: WebSocket,
     measurement_state: MeasurementState = Depends(get_measurement_state),
 ):
-    """Stream measurement data"""
+    """Stream measurement data
+
+    Clients can additionally receive the live spectrum of the measurement by
+    sending the message ``subscribe_spectrum`` (and stop receiving it with
+    ``unsubscribe_spectrum``).
+    """
 
     await websocket.accept()
     measurement_state.clients.append(websocket)
@@ -179,9 +192,24 @@ async def websocket_endpoint(
 
     try:
         while True:
-            await websocket.receive_text()
+            text = await websocket.receive_text()
+            try:
+                message = SocketMessage.model_validate_json(text).message
+            except ValidationError:
+                logger.debug("Ignoring invalid WebSocket message: %s", text)
+                continue
+
+            subscribed = websocket in measurement_state.spectrum_clients
+            if message == "subscribe_spectrum" and not subscribed:
+                measurement_state.spectrum_clients.append(websocket)
+                logger.info("Client subscribed to live spectrum")
+            elif message == "unsubscribe_spectrum" and subscribed:
+                measurement_state.spectrum_clients.remove(websocket)
+                logger.info("Client unsubscribed from live spectrum")
 
     except WebSocketDisconnect:
+        if websocket in measurement_state.spectrum_clients:
+            measurement_state.spectrum_clients.remove(websocket)
         try:
             measurement_state.clients.remove(websocket)
             logger.info(
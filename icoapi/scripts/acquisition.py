@@ -0,0 +1,585 @@
+"""Run measurements in a dedicated acquisition process
+
+If ``MEASUREMENT_PROCESS`` is enabled, the measurement does not run in the
+event loop of the API. Instead, a worker process
+
+- owns its own ``ICOsystem`` (the API releases its CAN connection for the
+  duration of the measurement),
+- reads the data stream, converts the values and writes the HDF5 file and
+- publishes the converted values via a shared memory ring buffer.
+
+The API process only relays the values from the ring buffer (and events like
+the current dataloss or the live spectrum) to the clients of the measurement
+WebSocket. This way, load in the API process can not cause data loss in the
+measurement.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from logging.handlers import QueueHandler, QueueListener
+from multiprocessing.queues import Queue
+from multiprocessing.synchronize import Event
+from pathlib import Path
+from queue import Empty
+from time import monotonic
+from typing import Any
+
+import numpy as np
+from icostate import ICOsystem, State
+from icotronic.can.sensor import SensorConfiguration
+from icotronic.can.streaming import StreamingConfiguration
+from icotronic.measurement.storage import Storage
+
+from icoapi.models.globals import (
+    GeneralMessenger,
+    ICOsystemSingleton,
+    MeasurementState,
+)
+from icoapi.models.models import (
+    ADCValues,
+    DataValueModel,
+    MeasurementInstructions,
+    MetadataPrefix,
+)
+from icoapi.scripts.data_handling import (
+    add_sensor_data_to_storage,
+    MeasurementSensorInfo,
+)
+from icoapi.scripts.file_handling import get_measurement_dir
+from icoapi.scripts.live_spectrum import LiveSpectrum, send_live_spectrum
+from icoapi.scripts.measurement import (
+    calculate_ift_values,
+    get_channel_values,
+    get_ift_timestamps,
+    get_measurement_slices,
+    get_sendable_data_and_apply_conversion,
+    measurement_preparations,
+    send_dataloss,
+    send_ift_objects,
+    wait_for_post_meta,
+    write_measurement_attributes,
+    write_metadata,
+)
+from icoapi.scripts.summary import schedule_summary_update
+from icoapi.utils.logging_setup import (
+    ContextFilter,
+    RateLimitFilter,
+    current_measurement,
+    dropped_records,
+    log_settings,
+)
+from icoapi.utils.shared_ring_buffer import SharedRingBuffer
+
+logger = logging.getLogger(__name__)
+
+MEASUREMENT_PROCESS = os.getenv("MEASUREMENT_PROCESS", "0") == "1"
+"""Run measurements in a dedicated acquisition process"""
+
+RING_BUFFER_SECONDS = float(os.getenv("MEASUREMENT_RING_BUFFER_SECONDS", "10"))
+"""Amount of measurement data (in seconds) the ring buffer can store"""
+
+PUBLISH_INTERVAL = 0.02
+"""Time between two writes into the ring buffer in seconds"""
+
+RELAY_INTERVAL = 0.02
+"""Time between two reads of the ring buffer in seconds"""
+
+SHUTDOWN_TIMEOUT = 10
+"""Time the API waits for the acquisition process to exit in seconds"""
+
+RECORD = np.dtype([
+    ("timestamp", np.float64),
+    ("counter", np.int32),
+    ("first", np.float64),
+    ("second", np.float64),
+    ("third", np.float64),
+])
+"""Data type of a (converted) streaming message in the ring buffer
+
+Values of disabled channels are stored as ``NaN``.
+"""
+
+# -- Acquisition Process ------------------------------------------------------
+
+
+def to_record(data: DataValueModel) -> tuple:
+    """Convert data of a streaming message into a ring buffer record"""
+
+    def value(channel: float | None) -> float:
+        return np.nan if channel is None else channel
+
+    return (
+        data.timestamp,
+        data.counter,
+        value(data.first),
+        value(data.second),
+        value(data.third),
+    )
+
+
+# pylint: disable=too-many-arguments, too-many-positional-arguments
+
+
+def run_acquisition_process(
+    instructions: MeasurementInstructions,
+    measurement_file_path: str,
+    buffer_name: str,
+    events: Queue,
+    post_meta: Queue,
+    stop: Event,
+    spectrum: Event,
+    log_records: Queue,
+) -> None:
+    """Entry point of the acquisition process
+
+    Args:
+
+        instructions:
+            Measurement instructions from client
+
+        measurement_file_path:
+            The path of the HDF5 file the measurement data is written to
+
+        buffer_name:
+            The name of the shared memory ring buffer for the measurement
+            values
+
+        events:
+            Queue for events (name and payload) sent to the API process
+
+        post_meta:
+            Queue for receiving the post-measurement metadata
+
+        stop:
+            Event set by the API process to stop the measurement
+
+        spectrum:
+            Event set by the API process while clients want to receive the
+            live spectrum
+
+        log_records:
+            Queue for forwarding log records to the API process
+
+    """
+
+    current_measurement.set(Path(measurement_file_path).stem)
+    queue_handler = QueueHandler(log_records)
+    queue_handler.addFilter(RateLimitFilter(dropped=dropped_records))
+    queue_handler.addFilter(ContextFilter())
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(log_settings.level)
+
+    buffer = SharedRingBuffer.attach(buffer_name, RECORD)
+    try:
+        asyncio.run(
+            acquire(
+                instructions,
+                Path(measurement_file_path),
+                buffer,
+                events,
+                post_meta,
+                stop,
+                spectrum,
+            )
+        )
+    except Exception as error:  # pylint: disable=broad-exception-caught
+        logger.exception("Measurement in acquisition process failed")
+        events.put(("error", (type(error).__name__, str(error))))
+    finally:
+        buffer.close()
+        dropped = dropped_records.take_unreported()
+        if dropped > 0:
+            logger.warning(
+                "Dropped %d log record(s) in acquisition process", dropped
+            )
+        events.put(("finished", None))
+
+
+async def acquire(
+    instructions: MeasurementInstructions,
+    measurement_file_path: Path,
+    buffer: SharedRingBuffer,
+    events: Queue,
+    post_meta: Queue,
+    stop: Event,
+    spectrum: Event,
+) -> None:
+    """Connect to the sensor node and record the measurement"""
+
+    system = ICOsystem()
+    await system.connect_stu()
+    try:
+        await system.connect_sensor_node_mac(instructions.mac_address)
+        await measurement_preparations(system, instructions)
+        await record_measurement(
+            system,
+            instructions,
+            measurement_file_path,
+            buffer,
+            events,
+            post_meta,
+            stop,
+            spectrum,
+        )
+    finally:
+        if system.state == State.SENSOR_NODE_CONNECTED:
+            await system.disconnect_sensor_node()
+        if system.state == State.STU_CONNECTED:
+            await system.disconnect_stu()
+
+
+# pylint: disable=too-many-branches, too-many-locals, too-many-statements
+
+
+async def record_measurement(
+    system: ICOsystem,
+    instructions: MeasurementInstructions,
+    measurement_file_path: Path,
+    buffer: SharedRingBuffer,
+    events: Queue,
+    post_meta: Queue,
+    stop: Event,
+    spectrum: Event,
+) -> None:
+    """Store the measurement data and publish it to the API process
+
+    This is the counterpart of ``run_measurement`` for the acquisition
+    process: Instead of sending values to WebSocket clients directly, it
+    writes them into the ring buffer and reports everything else as event.
+
+    The live spectrum is calculated here, since the ring buffer only contains
+    one value per channel and message (in single channel mode, messages
+    contain three values of the same channel).
+    """
+
+    sensor_configuration = SensorConfiguration(
+        instructions.first.channel_number,
+        instructions.second.channel_number,
+        instructions.third.channel_number,
+    )
+    streaming_configuration: StreamingConfiguration = (
+        sensor_configuration.streaming_configuration()
+    )
+    slices = get_measurement_slices(streaming_configuration)
+    first_slice, second_slice, third_slice = slices
+    ift_slice = {
+        "first": first_slice,
+        "second": second_slice,
+        "third": third_slice,
+    }.get(instructions.ift_channel, slice(0, 0))
+
+    timestamps: list[float] = []
+    ift_relevant_channel: list[float] = []
+    records: list[tuple] = []
+    start_time: float = 0
+    live_spectrum = LiveSpectrum()
+    spectrum_requested = False
+
+    with Storage(measurement_file_path, streaming_configuration) as storage:
+        logger.info(
+            "Opened measurement file: <%s> for writing", measurement_file_path
+        )
+        write_measurement_attributes(
+            instructions, storage, await system.sensor_node.get_name()
+        )
+
+        async with system.sensor_node.open_data_stream(
+            streaming_configuration
+        ) as stream:
+            sensor_info = MeasurementSensorInfo(instructions)
+            add_sensor_data_to_storage(
+                storage, list(sensor_info.get_values()[:3])
+            )
+
+            published_time = dataloss_sent_time = monotonic()
+            async for data, _ in stream:
+                if start_time == 0:
+                    start_time = data.timestamp
+                data.timestamp = data.timestamp - start_time
+
+                timestamps.append(data.timestamp)
+                if instructions.ift_requested:
+                    ift_relevant_channel.extend(data.values[ift_slice])
+
+                records.append(
+                    to_record(
+                        get_sendable_data_and_apply_conversion(
+                            streaming_configuration, sensor_info, data
+                        )
+                    )
+                )
+                storage.add_streaming_data(data)
+
+                if spectrum_requested:
+                    live_spectrum.add(
+                        data.timestamp, get_channel_values(data.values, slices)
+                    )
+                    if live_spectrum.due():
+                        frame = live_spectrum.calculate()
+                        if frame is not None:
+                            events.put(("spectrum", frame.model_dump()))
+
+                current_time = monotonic()
+                if current_time >= published_time + PUBLISH_INTERVAL:
+                    buffer.write(np.array(records, dtype=RECORD))
+                    records.clear()
+                    published_time = current_time
+
+                    spectrum_requested = spectrum.is_set()
+                    if not spectrum_requested and live_spectrum.values:
+                        live_spectrum.reset()
+
+                    if stop.is_set():
+                        logger.info("Stop flag set - stopping measurement")
+                        break
+
+                if current_time >= dataloss_sent_time + 1:
+                    events.put(("dataloss", stream.dataloss()))
+                    dataloss_sent_time = current_time
+                    stream.reset_stats()
+
+                if (
+                    instructions.time is not None
+                    and data.timestamp >= instructions.time
+                ):
+                    logger.info(
+                        "Timeout reached with current timestamp <%s>",
+                        data.timestamp,
+                    )
+                    break
+
+            if records:
+                buffer.write(np.array(records, dtype=RECORD))
+            events.put(("dataloss", storage.dataloss()))
+
+        events.put(("stream_finished", None))
+        if buffer.dropped > 0:
+            logger.warning(
+                "Dropped %s values for the live view, since the API did not "
+                "read them in time",
+                buffer.dropped,
+            )
+
+        if instructions.ift_requested:
+            ift = calculate_ift_values(
+                get_ift_timestamps(timestamps, streaming_configuration),
+                ift_relevant_channel,
+                instructions,
+            )
+            if ift is not None:
+                events.put(("ift", ift))
+
+        if instructions.wait_for_post_meta:
+            events.put(("post_meta_request", None))
+            metadata = await asyncio.to_thread(post_meta.get)
+            if metadata is not None:
+                write_metadata(MetadataPrefix.POST, metadata, storage)
+
+
+# pylint: enable=too-many-branches, too-many-locals, too-many-statements
+# pylint: enable=too-many-arguments, too-many-positional-arguments
+
+# -- API Process --------------------------------------------------------------
+
+
+def to_data_value(record: np.void) -> dict[str, Any]:
+    """Convert a ring buffer record into a WebSocket message value"""
+
+    def value(channel: float) -> float | None:
+        return None if np.isnan(channel) else float(channel)
+
+    return DataValueModel(
+        first=value(record["first"]),
+        second=value(record["second"]),
+        third=value(record["third"]),
+        ift=None,
+        counter=int(record["counter"]),
+        timestamp=float(record["timestamp"]),
+        dataloss=None,
+    ).model_dump()
+
+
+async def send_records(
+    records: np.ndarray, batch_size: int, measurement_state: MeasurementState
+) -> None:
+    """Send values from the ring buffer to the measurement WebSocket clients"""
+
+    for start in range(0, len(records), batch_size):
+        batch = [
+            to_data_value(record)
+            for record in records[start : start + batch_size]
+        ]
+        for client in measurement_state.clients:
+            try:
+                await client.send_json(batch)
+            except RuntimeError:
+                logger.warning(
+                    "Failed to send data to client <%s>", client.client
+                )
+
+
+async def handle_event(
+    name: str,
+    payload: Any,
+    post_meta: Queue,
+    measurement_state: MeasurementState,
+    general_messenger: GeneralMessenger,
+) -> None:
+    """Handle an event of the acquisition process"""
+
+    match name:
+        case "dataloss":
+            await send_dataloss(measurement_state, payload)
+        case "stream_finished":
+            measurement_state.running = False
+        case "ift":
+            await send_ift_objects(payload, measurement_state)
+        case "spectrum":
+            await send_live_spectrum(payload, measurement_state)
+        case "post_meta_request":
+            post_meta.put(
+                await wait_for_post_meta(measurement_state, general_messenger)
+            )
+        case "error":
+            error_type, message = payload
+            for client in measurement_state.clients:
+                await client.send_json(
+                    {"error": True, "type": error_type, "message": message}
+                )
+            measurement_state.clients.clear()
+
+
+# pylint: disable=too-many-locals, too-many-statements
+
+
+async def run_measurement_in_process(
+    system: ICOsystem,  # pylint: disable=unused-argument
+    instructions: MeasurementInstructions,
+    measurement_state: MeasurementState,
+    general_messenger: GeneralMessenger,
+) -> None:
+    """Run measurement in the acquisition process
+
+    The signature matches ``run_measurement``, so both coroutines can be used
+    interchangeably.
+    """
+
+    # The measurement task runs in its own context, which means the name
+    # is part of all log records of this measurement
+    current_measurement.set(measurement_state.name)
+
+    assert isinstance(instructions.adc, ADCValues)
+    sample_rate = instructions.adc.to_adc_configuration().sample_rate()
+    batch_size = max(
+        int(sample_rate // int(os.getenv("WEBSOCKET_UPDATE_RATE", "300"))), 1
+    )
+    measurement_file_path = Path(
+        f"{get_measurement_dir()}/{measurement_state.name}.hdf5"
+    )
+
+    buffer = SharedRingBuffer.create(
+        max(int(sample_rate * RING_BUFFER_SECONDS), 1), RECORD
+    )
+    context = multiprocessing.get_context("spawn")
+    events = context.Queue()
+    post_meta = context.Queue()
+    stop = context.Event()
+    spectrum = context.Event()
+    log_records = context.Queue()
+    listener = QueueListener(
+        log_records, *logging.getLogger().handlers, respect_handler_level=True
+    )
+    process = context.Process(
+        target=run_acquisition_process,
+        args=(
+            instructions,
+            str(measurement_file_path),
+            buffer.name,
+            events,
+            post_meta,
+            stop,
+            spectrum,
+            log_records,
+        ),
+        name="acquisition",
+        daemon=True,
+    )
+
+    await ICOsystemSingleton.release_instance()
+    try:
+        listener.start()
+        await asyncio.to_thread(process.start)
+        logger.info(
+            "Started acquisition process <%s> for measurement file <%s>",
+            process.pid,
+            measurement_file_path,
+        )
+
+        finished = False
+        while not finished:
+            if measurement_state.stop_flag and not stop.is_set():
+                stop.set()
+            if measurement_state.spectrum_clients:
+                spectrum.set()
+            else:
+                spectrum.clear()
+
+            await send_records(buffer.read(), batch_size, measurement_state)
+
+            # Check the process before reading the events, so the events
+            # it sent before exiting are still read in this iteration
+            exited = not process.is_alive()
+            while True:
+                try:
+                    name, payload = events.get_nowait()
+                except Empty:
+                    finished = finished or exited
+                    break
+                if name == "finished":
+                    finished = True
+                    break
+                await handle_event(
+                    name,
+                    payload,
+                    post_meta,
+                    measurement_state,
+                    general_messenger,
+                )
+
+            await asyncio.sleep(RELAY_INTERVAL)
+
+        await send_records(buffer.read(), batch_size, measurement_state)
+
+    except asyncio.CancelledError:
+        logger.debug("Measurement cancelled - stopping acquisition process")
+        stop.set()
+        post_meta.put(None)
+        raise
+    finally:
+        if process.pid is not None:
+            await asyncio.to_thread(process.join, SHUTDOWN_TIMEOUT)
+        if process.pid is not None and process.is_alive():
+            logger.error("Acquisition process did not exit - terminating it")
+            process.terminate()
+        listener.stop()
+        buffer.close()
+        buffer.unlink()
+
+        clients = len(measurement_state.clients)
+        for client in measurement_state.clients:
+            await client.close()
+        logger.info("Ended measurement and cleared %s clients", clients)
+
+        await ICOsystemSingleton.restore_instance(
+            None
+            if instructions.disconnect_after_measurement
+            else instructions.mac_address
+        )
+        await measurement_state.reset()
+        schedule_summary_update(str(measurement_file_path))
+
+
+# pylint: enable=too-many-locals, too-many-statements
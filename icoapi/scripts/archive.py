@@ -0,0 +1,129 @@
+"""Select measurement files for bulk downloads"""
+
+import json
+import logging
+import os
+from datetime import datetime
+
+import tables
+from tables import HDF5ExtError, NoSuchNodeError
+
+logger = logging.getLogger(__name__)
+
+
+def to_local_time(timestamp: datetime | None) -> datetime | None:
+    """Convert a timestamp into a (naive) local timestamp
+
+    Examples:
+
+        >>> from datetime import timezone
+        >>> to_local_time(datetime(2025, 1, 1, 12)) == datetime(2025, 1, 1, 12)
+        True
+        >>> utc = datetime(2025, 1, 1, 12, tzinfo=timezone.utc)
+        >>> to_local_time(utc) == datetime.fromtimestamp(utc.timestamp())
+        True
+
+    """
+
+    if timestamp is None or timestamp.tzinfo is None:
+        return timestamp
+    return timestamp.astimezone().replace(tzinfo=None)
+
+
+def read_measurement_attributes(file_path: str) -> dict[str, str]:
+    """Read the tool name and metadata profile of a measurement file
+
+    Args:
+
+        file_path:
+            The path of the measurement file
+
+    Returns:
+
+        The stored values of ``tool_name`` and ``profile`` (missing values
+        are not included)
+
+    """
+
+    attributes: dict[str, str] = {}
+    try:
+        with tables.open_file(file_path, mode="r") as file_handle:
+            node_attributes = file_handle.get_node("/acceleration").attrs
+            if "tool_name" in node_attributes:
+                attributes["tool_name"] = str(node_attributes["tool_name"])
+            if "pre_metadata" in node_attributes:
+                metadata = json.loads(node_attributes["pre_metadata"])
+                attributes["profile"] = str(metadata.get("profile", ""))
+    except (HDF5ExtError, NoSuchNodeError, OSError, ValueError) as error:
+        logger.debug("Unable to read attributes of %s: %s", file_path, error)
+
+    return attributes
+
+
+# pylint: disable=too-many-arguments
+
+
+def find_measurement_files(
+    measurement_dir: str,
+    names: list[str] | None = None,
+    *,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    tool_name: str | None = None,
+    profile: str | None = None,
+) -> list[str]:
+    """Find the measurement files matching a filter
+
+    Args:
+
+        measurement_dir:
+            The directory that contains the measurement files
+
+        names:
+            The names of the considered files (default: all files)
+
+        start:
+            Only include files created at or after this time
+
+        end:
+            Only include files created at or before this time
+
+        tool_name:
+            Only include measurements of the tool with this name
+
+        profile:
+            Only include measurements with this metadata profile
+
+    Returns:
+
+        The names of the matching files
+
+    """
+
+    start = to_local_time(start)
+    end = to_local_time(end)
+    candidates = sorted(os.listdir(measurement_dir)) if names is None else names
+
+    matching: list[str] = []
+    for name in candidates:
+        file_path = os.path.join(measurement_dir, name)
+        if not os.path.isfile(file_path):
+            continue
+        created = datetime.fromtimestamp(os.path.getctime(file_path))
+        if (start is not None and created < start) or (
+            end is not None and created > end
+        ):
+            continue
+        if tool_name is not None or profile is not None:
+            attributes = read_measurement_attributes(file_path)
+            if (
+                tool_name is not None
+                and attributes.get("tool_name") != tool_name
+            ) or (profile is not None and attributes.get("profile") != profile):
+                continue
+        matching.append(name)
+
+    return matching
+
+
+# pylint: enable=too-many-arguments
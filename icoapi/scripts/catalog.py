@@ -0,0 +1,172 @@
+"""Catalog of the embedded files and pictures of a measurement
+
+Listing the embedded files and pictures of a measurement file requires
+reading (and for older files also decoding) their content. The catalog stores
+the names, sizes, media types and content hashes of these files in the cache
+folder of the measurement directory. Its modification time matches the one
+of the measurement file, which makes sure the catalog of a changed
+measurement file is created again. Embedded files store their hash as
+attribute, only files embedded by older versions of the API are hashed once
+and the hash is then taken from the previous catalog.
+"""
+
+import hashlib
+import logging
+import os
+
+import tables
+from pydantic import ValidationError
+from tables import NoSuchNodeError
+
+from icoapi.models.models import EmbeddedFileInfo, MeasurementCatalog
+from icoapi.scripts.file_handling import (
+    EMBEDDED_FILE_CHUNK_SIZE,
+    get_sidecar_path,
+    write_sidecar_file,
+)
+from icoapi.scripts.pictures import get_picture_infos
+
+logger = logging.getLogger(__name__)
+
+CATALOG_SUFFIX = "catalog.json"
+"""Suffix of the sidecar file that stores the catalog"""
+
+
+def hash_embedded_file(node: tables.Array) -> str:
+    """Calculate the SHA-256 hash of an embedded file
+
+    Only files embedded by older versions of the API require this, newer
+    versions store the hash as attribute of the dataset.
+    """
+
+    digest = hashlib.sha256()
+    if node.shape == ():
+        raw_content = node.read()
+        digest.update(
+            raw_content
+            if isinstance(raw_content, bytes)
+            else raw_content.tobytes()
+        )
+    else:
+        rows = int(node.shape[0])
+        step = max(EMBEDDED_FILE_CHUNK_SIZE // node.dtype.itemsize, 1)
+        for start in range(0, rows, step):
+            digest.update(node.read(start, min(start + step, rows)).tobytes())
+
+    return digest.hexdigest()
+
+
+def get_embedded_file_infos(
+    file_handle: tables.File,
+    known_files: dict[str, EmbeddedFileInfo] | None = None,
+) -> list[EmbeddedFileInfo]:
+    """Get embedded file descriptors from an HDF5 file
+
+    Args:
+
+        file_handle:
+            The measurement file
+
+        known_files:
+            Embedded files of a previous catalog of the measurement (by
+            dataset name), whose hashes are reused for datasets without
+            stored hash
+
+    Returns:
+
+        The descriptors of the embedded files
+
+    """
+
+    if known_files is None:
+        known_files = {}
+
+    try:
+        embedded_group = file_handle.get_node("/embedded_files")
+    except NoSuchNodeError:
+        return []
+
+    embedded_files: list[EmbeddedFileInfo] = []
+    for node in file_handle.list_nodes(embedded_group):
+        size = getattr(node.attrs, "size", None)
+        if size is None:
+            size = (
+                node.dtype.itemsize
+                if node.shape == ()
+                else int(node.shape[0]) * node.dtype.itemsize
+            )
+        sha256 = getattr(node.attrs, "sha256", None)
+        if sha256 is None:
+            known = known_files.get(node.name)
+            sha256 = (
+                known.sha256
+                if known is not None and known.size == size and known.sha256
+                else hash_embedded_file(node)
+            )
+        embedded_files.append(
+            EmbeddedFileInfo(
+                dataset_name=node.name,
+                original_name=getattr(node.attrs, "original_name", node.name),
+                mime=getattr(
+                    node.attrs, "mime", "application/octet-stream"
+                ),
+                size=int(size),
+                download_path="",
+                sha256=str(sha256),
+            )
+        )
+
+    return embedded_files
+
+
+def load_catalog(file_path: str) -> MeasurementCatalog:
+    """Load the catalog of a measurement, creating it if necessary
+
+    Args:
+
+        file_path:
+            The path of the measurement file
+
+    Returns:
+
+        The embedded files and pictures of the measurement
+
+    """
+
+    catalog_path = get_sidecar_path(file_path, CATALOG_SUFFIX)
+    modified = os.stat(file_path).st_mtime_ns
+    previous: MeasurementCatalog | None = None
+    try:
+        with open(catalog_path, "rb") as catalog_file:
+            previous = MeasurementCatalog.model_validate_json(
+                catalog_file.read()
+            )
+        if os.stat(catalog_path).st_mtime_ns == modified:
+            return previous
+    except FileNotFoundError:
+        pass
+    except (OSError, ValidationError) as error:
+        logger.debug("Unable to load catalog %s: %s", catalog_path, error)
+
+    logger.info("Creating catalog for measurement %s", file_path)
+    known_files = (
+        {}
+        if previous is None
+        else {info.dataset_name: info for info in previous.embedded_files}
+    )
+    with tables.open_file(file_path, mode="r") as file_handle:
+        catalog = MeasurementCatalog(
+            embedded_files=get_embedded_file_infos(file_handle, known_files),
+            pictures=get_picture_infos(
+                file_handle, os.path.basename(file_path)
+            ),
+        )
+
+    write_sidecar_file(
+        catalog_path,
+        lambda catalog_file: catalog_file.write(
+            catalog.model_dump_json().encode()
+        ),
+        modified=modified,
+    )
+    return catalog
@@ -3,8 +3,7 @@ import json
 import logging
 import os
 from os import PathLike, path
-from typing import List, Optional
-import pandas as pd
+from typing import TYPE_CHECKING, List, Optional
 import tables
 import yaml
 from fastapi import HTTPException
@@ -13,7 +12,6 @@ from tables import Float32Col, IsDescription, NoSuchNodeError, StringCol
 from icotronic.measurement.storage import StorageData
 
 from icoapi.models.models import (
-    EmbeddedFileInfo,
     HDF5NodeInfo, MeasurementInstructionChannel,
     MeasurementInstructions,
     MetadataPrefix, ParsedHDF5FileContent, Sensor,
@@ -21,12 +19,16 @@ from icoapi.models.models import (
     CloudConfig,
 )
 from icoapi.models.models import ADCValues
+from icoapi.scripts.catalog import load_catalog
 from icoapi.scripts.config_helper import validate_dataspace_payload
 from icoapi.scripts.file_handling import (
     ensure_folder_exists,
     get_sensors_file_path,
 )
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 logger = logging.getLogger(__name__)
 
 
@@ -508,22 +510,6 @@ class MeasurementSensorInfo:
 # pylint: enable=too-few-public-methods
 
 
-def get_node_names(hdf5_file_handle: tables.File) -> list[str]:
-    """Get name of HDF5 nodes"""
-
-    nodes = hdf5_file_handle.list_nodes("/")
-    return [
-        node._v_pathname for node in nodes  # pylint: disable=protected-access
-    ]
-
-
-def get_picture_node_names(hdf5_file_handle: tables.File) -> list[str]:
-    """Get name of nodes that contain picture data"""
-
-    names = get_node_names(hdf5_file_handle)
-    return [name for name in names if "pictures" in name]
-
-
 def parse_json_if_possible(val):
     """
     If val is a str or bytes containing JSON, return the deserialized object.
@@ -578,37 +564,6 @@ def node_to_dict(node):
 # pylint: enable=protected-access
 
 
-def get_embedded_file_infos(
-    file_handle: tables.File,
-) -> list[EmbeddedFileInfo]:
-    """Get embedded file descriptors from an HDF5 file"""
-
-    try:
-        embedded_group = file_handle.get_node("/embedded_files")
-    except NoSuchNodeError:
-        return []
-
-    embedded_files: list[EmbeddedFileInfo] = []
-    for node in file_handle.list_nodes(embedded_group):
-        size = getattr(node.attrs, "size", None)
-        if size is None:
-            raw = node.read()
-            size = len(raw if isinstance(raw, bytes) else raw.tobytes())
-        embedded_files.append(
-            EmbeddedFileInfo(
-                dataset_name=node.name,
-                original_name=getattr(node.attrs, "original_name", node.name),
-                mime=getattr(
-                    node.attrs, "mime", "application/octet-stream"
-                ),
-                size=size,
-                download_path="",
-            )
-        )
-
-    return embedded_files
-
-
 # pylint: disable=too-many-locals
 
 
@@ -617,19 +572,12 @@ def get_file_data(
 ) -> ParsedHDF5FileContent:
     """Get HDF5 measurement data"""
 
-    with tables.open_file(file_path, mode="r") as file_handle:
+    import pandas as pd  # pylint: disable=import-outside-toplevel
 
-        picture_node_names = get_picture_node_names(file_handle)
-        pictures: dict[str, list[str]] = {}
-        embedded_files: list[EmbeddedFileInfo] = []
-        for node_name in picture_node_names:
-            node = file_handle.get_node(node_name)
-            assert isinstance(node, tables.Array)
-            pictures[node_name.removeprefix("/")] = [
-                img.decode("utf-8") for img in node.read().tolist()
-            ]
+    catalog = load_catalog(file_path)
+    pictures = catalog.pictures
 
-        embedded_files = get_embedded_file_infos(file_handle)
+    with tables.open_file(file_path, mode="r") as file_handle:
 
         try:
             acceleration_data = file_handle.get_node("/acceleration")
@@ -649,9 +597,10 @@ def get_file_data(
         try:
             for pics_key in pictures.keys():
 
-                obj: dict[int, str] = {}
-                for index, pic in enumerate(pictures[pics_key]):
-                    obj[index] = pic
+                obj: dict[int, str] = {
+                    picture.index: picture.download_path
+                    for picture in pictures[pics_key]
+                }
                 if MetadataPrefix.PRE in pics_key:
                     stripped_key = pics_key.split(f"{MetadataPrefix.PRE}__")[1]
                     acceleration_meta.attributes["pre_metadata"]["parameters"][
@@ -694,14 +643,14 @@ def get_file_data(
         sensor_df=sensor_df,
         acceleration_meta=acceleration_meta,
         pictures=pictures,
-        embedded_files=embedded_files,
+        embedded_files=catalog.embedded_files,
     )
 
 
 # pylint: enable=too-many-locals
 
 
-def ensure_dataframe_with_columns(df, required_columns) -> pd.DataFrame:
+def ensure_dataframe_with_columns(df, required_columns) -> "pd.DataFrame":
     """
     Ensures the object is a DataFrame and contains the required columns.
 
@@ -716,6 +665,8 @@ def ensure_dataframe_with_columns(df, required_columns) -> pd.DataFrame:
         TypeError: If the object is not a DataFrame.
         ValueError: If required columns are missing.
     """
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+
     # Ensure the object is a DataFrame
     if not isinstance(df, pd.DataFrame):
         raise TypeError(
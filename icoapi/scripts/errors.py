@@ -506,3 +506,84 @@ HTTP_500_SUPPLY_VOLTAGE_SPEC = {
         }
     }
 }
+
+HTTP_400_INVALID_DATA_RANGE_EXCEPTION = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="Invalid data range or channel selection.",
+)
+HTTP_400_INVALID_DATA_RANGE_SPEC = {
+    "description": "Invalid data range or channel selection.",
+    "content": {
+        "application/json": {
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "detail": {"type": "string"},
+                    "status_code": {"type": "integer"},
+                },
+                "required": ["detail", "status_code"],
+            },
+            "example": {
+                "detail": "Invalid data range or channel selection.",
+                "status_code": 400,
+            },
+        }
+    },
+}
+
+HTTP_501_EXPORT_FORMAT_UNAVAILABLE_EXCEPTION = HTTPException(
+    status_code=status.HTTP_501_NOT_IMPLEMENTED,
+    detail="Export format requires an optional dependency (pyarrow).",
+)
+HTTP_501_EXPORT_FORMAT_UNAVAILABLE_SPEC = {
+    "description": "Export format requires an optional dependency (pyarrow).",
+    "content": {
+        "application/json": {
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "detail": {"type": "string"},
+                    "status_code": {"type": "integer"},
+                },
+                "required": ["detail", "status_code"],
+            },
+            "example": {
+                "detail": (
+                    "Export format requires an optional dependency (pyarrow)."
+                ),
+                "status_code": 501,
+            },
+        }
+    },
+}
+
+
+class HTTP_416_RANGE_NOT_SATISFIABLE_EXCEPTION(HTTPException):  # pylint: disable=invalid-name
+    """Requested range is outside of the file (of ``size`` bytes)."""
+    def __init__(self, size: int):
+        super().__init__(
+            status_code=status.HTTP_416_RANGE_NOT_SATISFIABLE,
+            detail="Requested range is outside of the file.",
+            headers={"content-range": f"bytes */{size}"},
+        )
+
+
+HTTP_416_RANGE_NOT_SATISFIABLE_SPEC = {
+    "description": "Requested range is outside of the file.",
+    "content": {
+        "application/json": {
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "detail": {"type": "string"},
+                    "status_code": {"type": "integer"},
+                },
+                "required": ["detail", "status_code"],
+            },
+            "example": {
+                "detail": "Requested range is outside of the file.",
+                "status_code": 416,
+            },
+        }
+    },
+}
@@ -0,0 +1,332 @@
+"""Export measurement data into other file formats
+
+The export converts the acceleration table block by block, which means the
+memory usage does not depend on the size of the measurement. Every export
+also contains the metadata of the measurement (e.g. the pre- and
+post-measurement metadata and the sensor information used for scaling the
+values).
+
+The conversion runs in a worker thread. Only reading a block of rows is a
+task of the HDF5 executor, which means other requests for measurement data
+do not have to wait for the whole export.
+
+Exported files are stored in the cache folder of the measurement directory.
+Their modification time matches the one of the measurement file, which
+makes sure a changed measurement file is exported again.
+"""
+
+import io
+import json
+import logging
+import os
+import threading
+import zipfile
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Iterator, Literal
+
+import numpy as np
+import tables
+from tables import NoSuchNodeError
+
+from icoapi.scripts.data_handling import parse_json_if_possible
+from icoapi.scripts.file_handling import get_sidecar_path, write_sidecar_file
+from icoapi.scripts.measurement_data import get_acceleration_table
+from icoapi.utils.executor import call_in_hdf5_executor
+
+logger = logging.getLogger(__name__)
+
+ExportFormat = Literal["parquet", "arrow", "csv", "npz"]
+"""Names of the supported export formats"""
+
+EXPORT_MEDIA_TYPES: dict[str, str] = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+    "csv": "text/csv",
+    "npz": "application/octet-stream",
+}
+"""Media types of the export formats"""
+
+EXPORT_BLOCK = 262_144
+"""Number of rows converted at once"""
+
+METADATA_KEY = "icoapi"
+"""Key of the measurement metadata in Parquet and Arrow files"""
+
+export_lock = threading.Lock()
+"""Lock that makes sure only one export is written at a time"""
+
+
+@dataclass
+class ExportSource:
+    """Measurement data that should be exported"""
+
+    file_path: str
+    dtype: np.dtype
+    rows: int
+    metadata: dict[str, Any]
+
+    @property
+    def colnames(self) -> list[str]:
+        """The names of the columns of the acceleration table"""
+
+        return list(self.dtype.names or ())
+
+
+def get_export_metadata(
+    file_handle: tables.File, table: tables.Table
+) -> dict[str, Any]:
+    """Get the metadata of a measurement file
+
+    Args:
+
+        file_handle:
+            The measurement file
+
+        table:
+            The acceleration table of the measurement file
+
+    Returns:
+
+        The (user) attributes of the acceleration table and the information
+        about the sensors of the measurement
+
+    """
+
+    attributes: dict[str, Any] = {}
+    for key in table.attrs._f_list("user"):  # pylint: disable=protected-access
+        value = table.attrs[key]
+        attributes[key] = parse_json_if_possible(
+            value.tolist() if hasattr(value, "tolist") else value
+        )
+
+    sensors: list[dict[str, Any]] = []
+    try:
+        sensor_table = file_handle.get_node("/sensors")
+        if isinstance(sensor_table, tables.Table):
+            sensors = [
+                {
+                    name: (
+                        value.decode() if isinstance(value, bytes) else value
+                    )
+                    for name, value in zip(sensor_table.colnames, row.tolist())
+                }
+                for row in sensor_table.read()
+            ]
+    except NoSuchNodeError:
+        pass
+
+    return {"attributes": attributes, "sensors": sensors}
+
+
+def read_export_source(file_path: str) -> ExportSource:
+    """Read the structure and metadata of a measurement
+
+    Args:
+
+        file_path:
+            The path of the measurement file
+
+    Returns:
+
+        The row type, number of rows and metadata of the measurement
+
+    """
+
+    with tables.open_file(file_path, mode="r") as file_handle:
+        table = get_acceleration_table(file_handle)
+        return ExportSource(
+            file_path=file_path,
+            dtype=table.dtype,
+            rows=table.nrows,
+            metadata=get_export_metadata(file_handle, table),
+        )
+
+
+def read_export_block(file_path: str, start: int, stop: int) -> np.ndarray:
+    """Read rows of the acceleration table of a measurement
+
+    The function opens the file for every block, which means writers (e.g.
+    an upload of an embedded file) are not blocked between two blocks.
+    """
+
+    with tables.open_file(file_path, mode="r") as file_handle:
+        return get_acceleration_table(file_handle).read(start, stop)
+
+
+def read_blocks(source: ExportSource) -> Iterator[np.ndarray]:
+    """Read the rows of a measurement block by block
+
+    Every block is read in a separate task of the HDF5 executor.
+    """
+
+    for start in range(0, source.rows, EXPORT_BLOCK):
+        yield call_in_hdf5_executor(
+            read_export_block,
+            source.file_path,
+            start,
+            min(start + EXPORT_BLOCK, source.rows),
+        )
+
+
+def write_csv(output: BinaryIO, source: ExportSource) -> None:
+    """Write the acceleration table as CSV
+
+    The first line contains the metadata as JSON (starting with ``#``).
+    """
+
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+
+    text = io.TextIOWrapper(output, encoding="utf-8", newline="")
+    text.write(f"# {json.dumps(source.metadata)}\n")
+    text.write(",".join(source.colnames) + "\n")
+    for rows in read_blocks(source):
+        pd.DataFrame.from_records(rows, columns=source.colnames).to_csv(
+            text, header=False, index=False
+        )
+    text.flush()
+    text.detach()
+
+
+def write_npz(output: BinaryIO, source: ExportSource) -> None:
+    """Write the acceleration table as NumPy archive
+
+    The archive contains the structured array ``acceleration`` and the
+    metadata as JSON string ``metadata``. Unlike ``numpy.savez``, the array
+    is written block by block.
+    """
+
+    with zipfile.ZipFile(output, mode="w", allowZip64=True) as archive:
+        with archive.open(
+            "acceleration.npy", mode="w", force_zip64=True
+        ) as entry:
+            np.lib.format.write_array_header_1_0(
+                entry,
+                {
+                    "descr": np.lib.format.dtype_to_descr(source.dtype),
+                    "fortran_order": False,
+                    "shape": (int(source.rows),),
+                },
+            )
+            for rows in read_blocks(source):
+                entry.write(rows.tobytes())
+
+        with archive.open("metadata.npy", mode="w") as entry:
+            np.save(entry, np.array(json.dumps(source.metadata)))
+
+
+def write_arrow(
+    output: BinaryIO, source: ExportSource, export_format: str
+) -> None:
+    """Write the acceleration table as Parquet or Arrow file
+
+    Raises:
+
+        ImportError:
+            If the optional dependency ``pyarrow`` is not installed
+
+    """
+
+    # pylint: disable=import-outside-toplevel, import-error
+    import pyarrow as pa  # type: ignore[import-not-found]
+    import pyarrow.parquet as pq  # type: ignore[import-not-found]
+
+    # pylint: enable=import-outside-toplevel, import-error
+
+    schema = pa.schema(
+        [
+            pa.field(name, pa.from_numpy_dtype(source.dtype[name]))
+            for name in source.colnames
+        ],
+        metadata={METADATA_KEY: json.dumps(source.metadata)},
+    )
+    writer = (
+        pq.ParquetWriter(output, schema)
+        if export_format == "parquet"
+        else pa.ipc.new_file(output, schema)
+    )
+    with writer:
+        for rows in read_blocks(source):
+            writer.write_table(
+                pa.table(
+                    {name: rows[name] for name in source.colnames},
+                    schema=schema,
+                )
+            )
+
+
+def check_export_format(export_format: str) -> None:
+    """Check that an export format is available
+
+    Raises:
+
+        ValueError:
+            If the format is unknown
+
+        ImportError:
+            If the format requires an optional dependency that is not
+            installed
+
+    """
+
+    if export_format not in EXPORT_MEDIA_TYPES:
+        raise ValueError(f"Unknown export format: {export_format}")
+    if export_format in ("parquet", "arrow"):
+        # pylint: disable-next=import-outside-toplevel, import-error, unused-import
+        import pyarrow  # type: ignore[import-not-found] # noqa: F401
+
+
+def export_measurement(file_path: str, export_format: str) -> str:
+    """Export a measurement, if there is no up to date export
+
+    The function blocks until the export is finished. It must not run in
+    the HDF5 executor, since it reads the data in tasks of this executor.
+
+    Args:
+
+        file_path:
+            The path of the measurement file
+
+        export_format:
+            The name of the export format
+
+    Returns:
+
+        The path of the exported file
+
+    Raises:
+
+        ValueError:
+            If the format is unknown
+
+        ImportError:
+            If the format requires an optional dependency that is not
+            installed
+
+    """
+
+    check_export_format(export_format)
+    export_path = get_sidecar_path(file_path, f"export.{export_format}")
+    with export_lock:
+        modified = os.stat(file_path).st_mtime_ns
+        try:
+            if os.stat(export_path).st_mtime_ns == modified:
+                return export_path
+        except FileNotFoundError:
+            pass
+
+        logger.info(
+            "Exporting measurement %s as %s", file_path, export_format
+        )
+        source = call_in_hdf5_executor(read_export_source, file_path)
+
+        def write(output: BinaryIO) -> None:
+            if export_format == "csv":
+                write_csv(output, source)
+            elif export_format == "npz":
+                write_npz(output, source)
+            else:
+                write_arrow(output, source, export_format)
+
+        write_sidecar_file(export_path, write, modified=modified)
+
+    return export_path
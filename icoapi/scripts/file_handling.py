@@ -1,10 +1,18 @@
 """File handling code"""
 
+import glob
+import hashlib
 import logging
 import os
 import platform
-import sys
-from typing import Iterable, Tuple
+from typing import (
+    AsyncGenerator,
+    BinaryIO,
+    Callable,
+    Iterable,
+    Sequence,
+    Tuple,
+)
 import shutil
 import re
 
@@ -12,67 +20,28 @@ import numpy as np
 import pathvalidate
 import tables
 
-from dotenv import load_dotenv
-from platformdirs import user_data_dir
-
 from icoapi.models.models import (
     DiskCapacity,
-    EmbeddedFileContent,
+    EmbeddedFileDetails,
     EmbeddedFileUploadResponse,
 )
 from icoapi.scripts.config_helper import CONFIG_FILE_DEFINITIONS
+from icoapi.utils.environment import get_application_dir, get_config_dir
+from icoapi.utils.executor import run_in_hdf5_executor
 
 logger = logging.getLogger(__name__)
 
+CACHE_FOLDER = ".cache"
+"""Folder (inside the measurement directory) for data derived from files"""
 
-def load_env_file():
-    """Load environment configuration"""
-
-    # First try: local development
-    env_loaded = load_dotenv(
-        os.path.join(
-            os.path.abspath(os.path.join(os.getcwd())),
-            ".env",
-        ),
-        verbose=True,
-        override=True,
-    )
-    if not env_loaded:
-        # Second try: configs directory
-        logger.warning(
-            "Environment variables not found in local directory. Trying to"
-            " load from app data: %s",
-            get_config_dir(),
-        )
-        env_loaded = load_dotenv(
-            os.path.join(get_config_dir(), ".env"), verbose=True
-        )
-    if not env_loaded and is_bundled():
-        # Third try: we should be in the bundled state
-        bundle_dir = sys._MEIPASS  # pylint: disable=protected-access
-        logger.warning(
-            "Environment variables not found in local directory. Trying to"
-            " load from app data: %s",
-            bundle_dir,
-        )
-        env_loaded = load_dotenv(
-            os.path.join(bundle_dir, "config", ".env"), verbose=True
-        )
-    if not env_loaded:
-        logger.info("Environment variables not found - using builtins.")
-
-
-def is_bundled():
-    """Check if in bundled state"""
-
-    return getattr(sys, "frozen", False)
-
+EMBEDDED_FILE_CHUNK_SIZE = 1024 * 1024
+"""Number of bytes read from or written to an embedded file at once"""
 
-def get_application_dir() -> str:
-    """Get application directory"""
+EMBEDDED_FILE_CHUNK_SHAPE = (64 * 1024,)
+"""Shape of the HDF5 chunks of embedded files"""
 
-    name = os.getenv("VITE_APPLICATION_FOLDER", "ICOdaq")
-    return user_data_dir(name, appauthor=False)
+EMBEDDED_FILE_COMPRESSION = int(os.getenv("EMBEDDED_FILE_COMPRESSION", "0"))
+"""Compression level (``0`` – ``9``) of embedded files"""
 
 
 def get_measurement_dir() -> str:
@@ -83,14 +52,6 @@ def get_measurement_dir() -> str:
     return measurement_dir
 
 
-def get_config_dir() -> str:
-    """Get configuration directory"""
-
-    config_dir = os.path.join(get_application_dir(), "config")
-    logger.info("Config directory: %s", config_dir)
-    return config_dir
-
-
 def get_dataspace_file_path() -> str:
     """Get dataspace configuration path"""
 
@@ -218,70 +179,218 @@ def get_suffixed_name(base_name: str, existing_names: Iterable[str]) -> str:
     return possible_name
 
 
-def append_embedded_file_to_hdf5(
-    hdf5_path: str,
-    file_name: str | None,
-    content: bytes,
-    mime_type: str | None,
-) -> EmbeddedFileUploadResponse:
-    """Store an uploaded file as uint8 dataset below /embedded_files"""
+def get_embedded_dataset_name(file_name: str) -> str:
+    """Convert a filename into a valid name for an HDF5 dataset
+
+    Examples:
+
+        >>> get_embedded_dataset_name("hello world.txt")
+        'hello_world_txt'
+        >>> get_embedded_dataset_name("1.png")
+        'file__1_png'
+        >>> get_embedded_dataset_name("...")
+        'file'
+
+    """
 
-    original_name = file_name or "file"
     sanitized_name = pathvalidate.sanitize_filename(
-        original_name, replacement_text="_"
+        file_name, replacement_text="_"
     )
     sanitized_name = re.sub(r"\W+", "_", sanitized_name).strip("_") or "file"
     if sanitized_name[0].isdigit():
         sanitized_name = f"file__{sanitized_name}"
-    stored_mime_type = mime_type or "application/octet-stream"
-    byte_array = np.frombuffer(content, dtype=np.uint8)
+    return sanitized_name
 
-    with tables.open_file(hdf5_path, mode="a") as hdf5_file:
-        try:
-            group = hdf5_file.get_node("/embedded_files")
-        except tables.NoSuchNodeError:
-            group = hdf5_file.create_group("/", "embedded_files")
 
-        existing_names = [node.name for node in hdf5_file.list_nodes(group)]
-        dataset_name = get_suffixed_name(sanitized_name, existing_names)
-        dataset = hdf5_file.create_array(group, dataset_name, byte_array)
-        dataset.attrs["size"] = len(content)
-        dataset.attrs["mime"] = stored_mime_type
-        dataset.attrs["original_name"] = original_name
+def write_embedded_file(
+    hdf5_file: tables.File,
+    dataset_name: str,
+    content: BinaryIO,
+    original_name: str,
+    mime_type: str | None,
+) -> EmbeddedFileUploadResponse:
+    """Copy a file into a new dataset below /embedded_files
+
+    The file is copied in blocks of ``EMBEDDED_FILE_CHUNK_SIZE`` bytes into
+    an extendable (and optionally compressed) array, which means the memory
+    usage does not depend on the size of the file. The SHA-256 hash of the
+    content is stored as attribute, so the catalog does not have to read
+    the file again.
+    """
+
+    dataset = hdf5_file.create_earray(
+        "/embedded_files",
+        dataset_name,
+        atom=tables.UInt8Atom(),
+        shape=(0,),
+        filters=tables.Filters(
+            complevel=EMBEDDED_FILE_COMPRESSION, complib="zlib"
+        ),
+        chunkshape=EMBEDDED_FILE_CHUNK_SHAPE,
+    )
+    digest = hashlib.sha256()
+    while block := content.read(EMBEDDED_FILE_CHUNK_SIZE):
+        dataset.append(np.frombuffer(block, dtype=np.uint8))
+        digest.update(block)
+
+    stored_mime_type = mime_type or "application/octet-stream"
+    size = int(dataset.nrows)
+    dataset.attrs["size"] = size
+    dataset.attrs["mime"] = stored_mime_type
+    dataset.attrs["original_name"] = original_name
+    dataset.attrs["sha256"] = digest.hexdigest()
 
     return EmbeddedFileUploadResponse(
         dataset_name=dataset_name,
         original_name=original_name,
         mime=stored_mime_type,
-        size=len(content),
+        size=size,
     )
 
 
-def get_embedded_file_from_hdf5(
+def append_embedded_files_to_hdf5(
+    hdf5_path: str,
+    files: Sequence[tuple[str | None, BinaryIO, str | None]],
+) -> list[EmbeddedFileUploadResponse]:
+    """Store multiple uploaded files as uint8 datasets below /embedded_files
+
+    All files are written while the HDF5 file is open. If one of the files
+    can not be stored, then none of the files is kept.
+
+    Args:
+
+        hdf5_path:
+            The path of the measurement file
+
+        files:
+            The original name, the (binary) file object and the media type
+            of every file that should be embedded
+
+    Returns:
+
+        The name and metadata of the created dataset for every file
+
+    """
+
+    responses: list[EmbeddedFileUploadResponse] = []
+
+    with tables.open_file(hdf5_path, mode="a") as hdf5_file:
+        try:
+            group = hdf5_file.get_node("/embedded_files")
+            created_group = False
+        except tables.NoSuchNodeError:
+            group = hdf5_file.create_group("/", "embedded_files")
+            created_group = True
+
+        existing_names = {node.name for node in hdf5_file.list_nodes(group)}
+        created_names: list[str] = []
+        try:
+            for file_name, content, mime_type in files:
+                original_name = file_name or "file"
+                dataset_name = get_suffixed_name(
+                    get_embedded_dataset_name(original_name), existing_names
+                )
+                existing_names.add(dataset_name)
+                created_names.append(dataset_name)
+                responses.append(
+                    write_embedded_file(
+                        hdf5_file,
+                        dataset_name,
+                        content,
+                        original_name,
+                        mime_type,
+                    )
+                )
+        except BaseException:
+            # Do not keep (partially) embedded files of a failed upload
+            if created_group:
+                hdf5_file.remove_node(group, recursive=True)
+            else:
+                for dataset_name in created_names:
+                    if dataset_name in group:
+                        hdf5_file.remove_node(group, dataset_name)
+            raise
+
+        hdf5_file.flush()
+
+    return responses
+
+
+def get_embedded_file_details(
     hdf5_path: str, dataset_name: str
-) -> EmbeddedFileContent:
-    """Retrieve an embedded file from an HDF5 dataset"""
+) -> EmbeddedFileDetails:
+    """Retrieve the metadata of an embedded file from an HDF5 dataset"""
 
     with tables.open_file(hdf5_path, mode="r") as hdf5_file:
         dataset = hdf5_file.get_node(f"/embedded_files/{dataset_name}")
+        attributes = dataset.attrs
+        if "size" in attributes:
+            size = int(attributes["size"])
+        elif dataset.shape == ():
+            size = len(dataset.read())
+        else:
+            size = int(dataset.shape[0]) * dataset.dtype.itemsize
+        original_name = getattr(attributes, "original_name", dataset_name)
+        mime = getattr(attributes, "mime", "application/octet-stream")
+
+    return EmbeddedFileDetails(
+        original_name=original_name,
+        mime=mime,
+        size=size,
+    )
+
+
+def read_embedded_file_part(
+    dataset: tables.Node, start: int, stop: int
+) -> bytes:
+    """Read the bytes ``start`` up to (excluding) ``stop`` of an embedded file
+
+    Only the requested part of (uint8) datasets is read from disk.
+    """
+
+    if dataset.shape == ():
+        # Scalar datasets (e.g. a single byte string) can not be sliced
         raw_content = dataset.read()
         content = (
             raw_content
             if isinstance(raw_content, bytes)
             else raw_content.tobytes()
         )
-        original_name = getattr(
-            dataset.attrs, "original_name", dataset_name
-        )
-        mime = getattr(
-            dataset.attrs, "mime", "application/octet-stream"
+        return content[start:stop]
+
+    return dataset.read(start, stop).tobytes()
+
+
+def read_embedded_file_from_hdf5(
+    hdf5_path: str, dataset_name: str, start: int, stop: int
+) -> bytes:
+    """Read a part of an embedded file, opening the HDF5 file only for it"""
+
+    with tables.open_file(hdf5_path, mode="r") as hdf5_file:
+        return read_embedded_file_part(
+            hdf5_file.get_node(f"/embedded_files/{dataset_name}"), start, stop
         )
 
-    return EmbeddedFileContent(
-        content=content,
-        original_name=original_name,
-        mime=mime,
-    )
+
+async def read_embedded_file_chunks(
+    hdf5_path: str, dataset_name: str, start: int, stop: int
+) -> AsyncGenerator[bytes, None]:
+    """Read the bytes ``start`` up to (excluding) ``stop`` of an embedded file
+
+    Every chunk (of at most ``EMBEDDED_FILE_CHUNK_SIZE`` bytes) is read
+    separately in the HDF5 executor. The HDF5 file is only open while a
+    chunk is read, which means a slow download does not prevent changes to
+    the file in the meantime.
+    """
+
+    for offset in range(start, stop, EMBEDDED_FILE_CHUNK_SIZE):
+        yield await run_in_hdf5_executor(
+            read_embedded_file_from_hdf5,
+            hdf5_path,
+            dataset_name,
+            offset,
+            min(offset + EMBEDDED_FILE_CHUNK_SIZE, stop),
+        )
 
 
 def delete_embedded_file_from_hdf5(
@@ -293,6 +402,71 @@ def delete_embedded_file_from_hdf5(
         hdf5_file.remove_node("/embedded_files", dataset_name)
 
 
+def get_sidecar_path(file_path: str, suffix: str) -> str:
+    """Get the path of a file that stores data derived from a measurement
+
+    Examples:
+
+        >>> get_sidecar_path(os.path.join("data", "test.hdf5"), "overview.npz"
+        ...                 ) == os.path.join(
+        ...     "data", ".cache", "test.hdf5.overview.npz")
+        True
+
+    """
+
+    directory, name = os.path.split(file_path)
+    return os.path.join(directory, CACHE_FOLDER, f"{name}.{suffix}")
+
+
+def delete_sidecar_files(file_path: str) -> None:
+    """Delete all files that store data derived from a measurement"""
+
+    for sidecar_path in glob.glob(
+        get_sidecar_path(glob.escape(file_path), "*")
+    ):
+        os.remove(sidecar_path)
+        logger.debug("Deleted sidecar file %s", sidecar_path)
+
+
+def write_sidecar_file(
+    sidecar_path: str,
+    write: Callable[[BinaryIO], object],
+    *,
+    modified: int | None = None,
+) -> None:
+    """Store data derived from a measurement
+
+    The function writes the data to a temporary file first and then
+    replaces the sidecar file, which means readers never see partial data.
+
+    Args:
+
+        sidecar_path:
+            The path of the sidecar file
+
+        write:
+            A function that writes the data into the given file
+
+        modified:
+            The modification time (in nanoseconds) of the sidecar file
+            (default: the current time)
+
+    """
+
+    ensure_folder_exists(os.path.dirname(sidecar_path))
+    temporary_path = f"{sidecar_path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary_path, "wb") as sidecar_file:
+            write(sidecar_file)
+        if modified is not None:
+            os.utime(temporary_path, ns=(modified, modified))
+        os.replace(temporary_path, sidecar_path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+
 def ensure_folder_exists(path):
     """Create folder if it does not exist already"""
 
@@ -0,0 +1,204 @@
+"""Live spectrum of a running measurement
+
+Clients of the measurement WebSocket can subscribe to the spectrum of the
+most recent measurement values by sending the message
+``subscribe_spectrum``. The spectrum is only calculated while there are
+subscribers and never more often than the CPU budget allows: If a
+calculation takes longer than expected, the time until the next calculation
+increases accordingly.
+"""
+
+import logging
+import os
+from collections import deque
+from collections.abc import Mapping, Sequence
+from time import monotonic, perf_counter
+
+import numpy as np
+
+from icoapi.models.globals import MeasurementState
+from icoapi.models.models import Dataset, LiveSpectrumFrame
+
+logger = logging.getLogger(__name__)
+
+LIVE_SPECTRUM_WINDOW = int(os.getenv("LIVE_SPECTRUM_WINDOW", "1024"))
+LIVE_SPECTRUM_INTERVAL = int(os.getenv("LIVE_SPECTRUM_INTERVAL", "250"))
+LIVE_SPECTRUM_CPU_BUDGET = float(os.getenv("LIVE_SPECTRUM_CPU_BUDGET", "0.05"))
+
+
+# pylint: disable=too-many-instance-attributes
+
+
+class LiveSpectrum:
+    """Rolling amplitude spectrum of the most recent values of each channel
+
+    Args:
+
+        window:
+            The number of values used for the spectrum
+
+        interval:
+            The minimum time between two spectra in milliseconds
+
+        budget:
+            The maximum part of the time (between 0 and 1) spent on
+            calculating spectra
+
+    Examples:
+
+        >>> spectrum = LiveSpectrum(window=64, interval=0, budget=1)
+        >>> for message in range(64):
+        ...     timestamp = message / 100
+        ...     value = np.sin(2 * np.pi * 25 * timestamp)
+        ...     spectrum.add(timestamp, {"first": [value], "second": []})
+        >>> frame = spectrum.calculate()
+        >>> [dataset.name for dataset in frame.datasets]
+        ['first']
+        >>> spectrum_values = frame.datasets[0].data
+        >>> index = spectrum_values.index(max(spectrum_values))
+        >>> round(index * frame.frequency_resolution)
+        25
+
+    """
+
+    def __init__(
+        self,
+        window: int = LIVE_SPECTRUM_WINDOW,
+        interval: float = LIVE_SPECTRUM_INTERVAL,
+        budget: float = LIVE_SPECTRUM_CPU_BUDGET,
+    ) -> None:
+        self.window = window
+        self.interval = interval / 1000
+        self.budget = budget
+        self.values: dict[str, deque[float]] = {}
+        self.first_timestamp: float | None = None
+        self.timestamp = 0.0
+        self.received = 0
+        self.next_update = 0.0
+
+    def add(
+        self, timestamp: float, values: Mapping[str, Sequence[float]]
+    ) -> None:
+        """Add the values of a streaming message
+
+        Args:
+
+            timestamp:
+                The time of the message in seconds since the start of the
+                measurement
+
+            values:
+                The (converted) values of the message for each channel;
+                disabled channels contain no values
+
+        """
+
+        count = 0
+        for channel, channel_values in values.items():
+            if len(channel_values) == 0:
+                continue
+            self.values.setdefault(
+                channel, deque(maxlen=self.window)
+            ).extend(channel_values)
+            count = max(count, len(channel_values))
+
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamp
+        else:
+            # Values of the first message only mark the start of the time
+            # used for calculating the sample rate
+            self.received += count
+        self.timestamp = timestamp
+
+    def reset(self) -> None:
+        """Remove all values (e.g. after the last client unsubscribed)"""
+
+        self.values.clear()
+        self.first_timestamp = None
+        self.received = 0
+
+    def sample_rate(self) -> float:
+        """Get the number of values per second and channel"""
+
+        if self.first_timestamp is None:
+            return 0.0
+        duration = self.timestamp - self.first_timestamp
+        return self.received / duration if duration > 0 else 0.0
+
+    def due(self) -> bool:
+        """Check if the next spectrum should be calculated"""
+
+        return monotonic() >= self.next_update
+
+    def calculate(self) -> LiveSpectrumFrame | None:
+        """Calculate the amplitude spectrum of the most recent values
+
+        Returns:
+
+            The spectrum of every channel that contains enough values or
+            ``None``, if there are no such channels yet
+
+        """
+
+        started = perf_counter()
+        sample_rate = self.sample_rate()
+        channels = {
+            channel: np.fromiter(values, dtype=np.float64, count=len(values))
+            for channel, values in self.values.items()
+            if len(values) == self.window
+        }
+        if sample_rate <= 0 or not channels:
+            return None
+
+        window = np.hanning(self.window)
+        frame = LiveSpectrumFrame(
+            timestamp=self.timestamp,
+            frequency_resolution=sample_rate / self.window,
+            datasets=[
+                Dataset(
+                    name=channel,
+                    data=(
+                        2
+                        * np.abs(np.fft.rfft((values - values.mean()) * window))
+                        / window.sum()
+                    ).tolist(),
+                )
+                for channel, values in channels.items()
+            ],
+        )
+
+        elapsed = perf_counter() - started
+        self.next_update = monotonic() + max(
+            self.interval, elapsed / self.budget
+        )
+        return frame
+
+
+# pylint: enable=too-many-instance-attributes
+
+
+async def send_live_spectrum(
+    frame: dict, measurement_state: MeasurementState
+) -> None:
+    """Send a live spectrum to the subscribed measurement WebSocket clients"""
+
+    for client in measurement_state.spectrum_clients:
+        try:
+            await client.send_json(frame)
+        except RuntimeError:
+            logger.warning(
+                "Failed to send spectrum to client <%s>", client.client
+            )
+
+
+async def publish_live_spectrum(
+    live_spectrum: LiveSpectrum, measurement_state: MeasurementState
+) -> None:
+    """Calculate and send the live spectrum, if a client needs it"""
+
+    if not measurement_state.spectrum_clients or not live_spectrum.due():
+        return
+
+    frame = live_spectrum.calculate()
+    if frame is not None:
+        await send_live_spectrum(frame.model_dump(), measurement_state)
@@ -8,7 +8,6 @@ from itertools import repeat
 from pathlib import Path
 from time import monotonic
 
-from icolyzer import iftlibrary
 from icostate import ICOsystem, State
 from icotronic.can.error import UnsupportedFeatureException
 from icotronic.can.sensor import SensorConfiguration
@@ -18,7 +17,6 @@ from icotronic.can.streaming import (
     StreamingTimeoutError,
 )
 from icotronic.measurement.storage import Storage, StorageData
-import numpy as np
 from starlette.websockets import WebSocketDisconnect
 import tables.exceptions
 
@@ -28,6 +26,8 @@ from icoapi.scripts.data_handling import (
     MeasurementSensorInfo,
 )
 from icoapi.scripts.file_handling import get_measurement_dir
+from icoapi.scripts.live_spectrum import LiveSpectrum, publish_live_spectrum
+from icoapi.scripts.pictures import write_pictures
 from icoapi.models.globals import GeneralMessenger, MeasurementState
 from icoapi.models.models import (
     DataValueModel,
@@ -35,7 +35,9 @@ from icoapi.models.models import (
     Metadata,
     MetadataPrefix,
 )
+from icoapi.scripts.summary import schedule_summary_update
 from icoapi.scripts.sth_scripts import disconnect_sth_devices
+from icoapi.utils.logging_setup import current_measurement
 
 logger = logging.getLogger(__name__)
 
@@ -114,6 +116,22 @@ def get_measurement_slices(
     return [first_slice, second_slice, third_slice]
 
 
+def get_channel_values(
+    values: list[float], slices: list[slice]
+) -> dict[str, list[float]]:
+    """
+    Split the values of a streaming message into the values of each channel
+    :param values: Values of the streaming message
+    :param slices: Slices as returned by ``get_measurement_slices``
+    :return: Dictionary containing the values of the first, second and third
+             channel
+    """
+    return {
+        channel: values[channel_slice]
+        for channel, channel_slice in zip(("first", "second", "third"), slices)
+    }
+
+
 def create_objects(
     timestamps: list[float], ift_vals: list[float]
 ) -> list[dict[str, float]]:
@@ -148,16 +166,26 @@ def maybe_get_ift_value(
         or (window_length > 1)
     ):
         return None
+
+    # Only load the analysis library when a measurement needs it
+    from icolyzer import iftlibrary  # pylint: disable=import-outside-toplevel
+
     return iftlibrary.ift_value(samples, sample_frequency, window_length)
 
 
-async def send_ift_values(
+def calculate_ift_values(
     timestamps: list[float],
     values: list[float],
     instructions: MeasurementInstructions,
-    measurement_state: MeasurementState,
-) -> None:
-    """Calculate and send IFT values"""
+) -> list[dict[str, float]] | None:
+    """Calculate IFT values
+
+    :param timestamps: Timestamps of the values
+    :param values: Values of the channel selected for the IFT calculation
+    :param instructions: Measurement instructions from client
+    :return: List of objects containing timestamps and IFT values or None if
+             the IFT value could not be calculated
+    """
 
     logger.debug(
         "IFT value computation requested for channel: <%s>",
@@ -182,13 +210,42 @@ async def send_ift_values(
             len(timestamps),
             len(values),
         )
-        return
+        return None
+
+    return create_objects(timestamps, ift_values)
+
+
+def get_ift_timestamps(
+    timestamps: list[float], streaming_configuration: StreamingConfiguration
+) -> list[float]:
+    """Get one timestamp for every value of the IFT channel"""
+
+    # If only one channel is enabled then each streaming message contains 3
+    # values for this channel. These values share the same timestamp. This
+    # means we have to replicate each timestamp 3 times to get a timestamp for
+    # every value.
+    # Note: In all other cases every message contains at most one value for a
+    #       specific channel, which means the number of timestamps and number
+    #       of values for the specific channel should be the same.
+    if streaming_configuration.enabled_channels() == 1:
+        trippeled_timestamps: list[float] = []
+        for timestamp in timestamps:
+            trippeled_timestamps.extend(repeat(timestamp, 3))
+        return trippeled_timestamps
+
+    return timestamps
+
+
+async def send_ift_objects(
+    ift: list[dict[str, float]], measurement_state: MeasurementState
+) -> None:
+    """Send IFT values to clients of the measurement WebSocket"""
 
     ift_wrapped: DataValueModel = DataValueModel(
         first=None,
         second=None,
         third=None,
-        ift=create_objects(timestamps, ift_values),
+        ift=ift,
         counter=1,
         timestamp=1,
         dataloss=None,
@@ -201,6 +258,19 @@ async def send_ift_values(
             logger.warning("Client must be disconnected, passing")
 
 
+async def send_ift_values(
+    timestamps: list[float],
+    values: list[float],
+    instructions: MeasurementInstructions,
+    measurement_state: MeasurementState,
+) -> None:
+    """Calculate and send IFT values"""
+
+    ift = calculate_ift_values(timestamps, values, instructions)
+    if ift is not None:
+        await send_ift_objects(ift, measurement_state)
+
+
 def write_metadata(
     prefix: MetadataPrefix, metadata: Metadata, storage: StorageData
 ) -> None:
@@ -217,6 +287,24 @@ def write_metadata(
     logger.info("Added %s-measurement metadata", prefix)
 
 
+def write_measurement_attributes(
+    instructions: MeasurementInstructions,
+    storage: StorageData,
+    tool_name: str | None = None,
+) -> None:
+    """Write attributes known before the measurement starts to storage"""
+
+    storage["conversion"] = "true"
+    if tool_name:
+        storage["tool_name"] = tool_name
+    assert isinstance(instructions.adc, ADCValues)
+    assert isinstance(instructions.adc.reference_voltage, float)
+
+    storage["adc_reference_voltage"] = f"{instructions.adc.reference_voltage}"
+    if instructions.meta:
+        write_metadata(MetadataPrefix.PRE, instructions.meta, storage)
+
+
 def find_picture_parameters(meta: Metadata) -> list[str]:
     """Find picture parameters in metadata"""
 
@@ -237,52 +325,21 @@ def write_and_remove_picture_metadata(
     """Write picture metadata to storage and remove it from metadata"""
 
     for param in picture_parameters:
-        encoded_images: list[str] = []
-        for encoded_image in meta.parameters[param].values():  # type: ignore[union-attr]
-            encoded_images.append(encoded_image.encode("utf-8"))
-
-        max_string_length = max(len(s) for s in encoded_images)
-        nd_array = np.array(encoded_images, dtype=f"S{max_string_length}")
-
+        encoded_images = list(
+            meta.parameters[param].values()  # type: ignore[union-attr]
+        )
         try:
-            write_image_array(storage, f"{prefix}__{param}", nd_array, True)
+            write_pictures(storage.hdf, f"{prefix}__{param}", encoded_images)
             logger.info(
                 "Added %s picture(s) for parameter %s to storage",
-                len(nd_array),
+                len(encoded_images),
                 param,
             )
             del meta.parameters[param]
-        except ValueError:
+        except (ValueError, tables.exceptions.HDF5ExtError):
             logger.warning(
                 "Could not add pictures for parameter %s to storage", param
             )
-        except tables.exceptions.NodeError:
-            storage.hdf.remove_node("/", f"{prefix}__{param}", recursive=True)
-            logger.info(
-                "Removed %s image array from storage root node as it is being"
-                " overwritten.",
-                param,
-            )
-            write_image_array(storage, f"{prefix}__{param}", nd_array, True)
-            logger.info(
-                "Added %s picture(s) for parameter %s to storage",
-                len(nd_array),
-                param,
-            )
-            del meta.parameters[param]
-
-
-def write_image_array(
-    storage: StorageData, name: str, array: np.ndarray, overwrite: bool
-):
-    """Add image array to storage data"""
-
-    try:
-        storage.hdf.create_array(storage.hdf.root, name, array)
-    except tables.exceptions.NodeError:
-        if overwrite:
-            storage.hdf.remove_node("/acceleration", name, recursive=True)
-            storage.hdf.create_array(storage.hdf.root, name, array)
 
 
 def get_sendable_data_and_apply_conversion(
@@ -445,6 +502,20 @@ async def send_dataloss(
             )
 
 
+async def wait_for_post_meta(
+    measurement_state: MeasurementState, general_messenger: GeneralMessenger
+) -> Metadata:
+    """Request post-measurement metadata and wait until it is available"""
+
+    logger.info("Waiting for post-measurement metadata")
+    await general_messenger.send_post_meta_request()
+    while measurement_state.post_meta is None:
+        await asyncio.sleep(1)
+    logger.info("Received post-measurement metadata")
+    await general_messenger.send_post_meta_completed()
+    return measurement_state.post_meta
+
+
 async def run_measurement(
     system: ICOsystem,
     instructions: MeasurementInstructions,
@@ -453,6 +524,10 @@ async def run_measurement(
 ) -> None:
     """Run measurement"""
 
+    # The measurement task runs in its own context, which means the name
+    # is part of all log records of this measurement
+    current_measurement.set(measurement_state.name)
+
     adc = await system.get_adc_configuration()
     sample_rate = adc.sample_rate()
 
@@ -466,14 +541,14 @@ async def run_measurement(
     # NOTE: The array data.values only contains the activated channels. This
     # means we need to compute the slice at which each channel is located.
     # This may not be pretty, but it works.
-    [first_slice, second_slice, third_slice] = get_measurement_slices(
-        streaming_configuration
-    )
+    slices = get_measurement_slices(streaming_configuration)
+    [first_slice, second_slice, third_slice] = slices
 
     timestamps: list[float] = []
     ift_relevant_channel: list[float] = []
     ift_sent: bool = False
     start_time: float = 0
+    live_spectrum = LiveSpectrum()
     measurement_file_path = Path(
         f"{get_measurement_dir()}/{measurement_state.name}.hdf5"
     )
@@ -487,15 +562,9 @@ async def run_measurement(
                 measurement_file_path,
             )
 
-            storage["conversion"] = "true"
-            assert isinstance(instructions.adc, ADCValues)
-            assert isinstance(instructions.adc.reference_voltage, float)
-
-            storage["adc_reference_voltage"] = (
-                f"{instructions.adc.reference_voltage}"
+            write_measurement_attributes(
+                instructions, storage, measurement_state.tool_name
             )
-            if instructions.meta:
-                write_metadata(MetadataPrefix.PRE, instructions.meta, storage)
 
             async with system.sensor_node.open_data_stream(
                 streaming_configuration
@@ -576,6 +645,17 @@ async def run_measurement(
                     )
                     storage.add_streaming_data(data)
 
+                    if measurement_state.spectrum_clients:
+                        live_spectrum.add(
+                            data.timestamp,
+                            get_channel_values(data.values, slices),
+                        )
+                        await publish_live_spectrum(
+                            live_spectrum, measurement_state
+                        )
+                    elif live_spectrum.values:
+                        live_spectrum.reset()
+
                     # Send current dataloss once per second
                     current_time = monotonic()
                     if current_time >= dataloss_sent_time + 1:
@@ -634,20 +714,9 @@ async def run_measurement(
 
             # Send IFT value values at once after the measurement is finished.
             if instructions.ift_requested:
-                # If only one channel is enabled then each streaming message
-                # contains 3 values for this channel. These values share the
-                # same timestamp. This means we have to replicate each
-                # timestamp 3 times to get a timestamp for every value.
-                # Note: In all other cases every message contains at most one
-                #       value for a specific channel, which means the number of
-                #       timestamps and number of values for the specific
-                #       channel should be the same.
-                if streaming_configuration.enabled_channels() == 1:
-                    trippeled_timestamps: list[float] = []
-                    for timestamp in timestamps:
-                        trippeled_timestamps.extend(repeat(timestamp, 3))
-                    timestamps = trippeled_timestamps
-
+                timestamps = get_ift_timestamps(
+                    timestamps, streaming_configuration
+                )
                 await send_ift_values(
                     timestamps,
                     ift_relevant_channel,
@@ -657,14 +726,12 @@ async def run_measurement(
                 ift_sent = True
 
             if measurement_state.wait_for_post_meta:
-                logger.info("Waiting for post-measurement metadata")
-                await general_messenger.send_post_meta_request()
-                while measurement_state.post_meta is None:
-                    await asyncio.sleep(1)
-                logger.info("Received post-measurement metadata")
-                await general_messenger.send_post_meta_completed()
                 write_metadata(
-                    MetadataPrefix.POST, measurement_state.post_meta, storage
+                    MetadataPrefix.POST,
+                    await wait_for_post_meta(
+                        measurement_state, general_messenger
+                    ),
+                    storage,
                 )
 
     except StreamingTimeoutError as e:
@@ -696,6 +763,7 @@ async def run_measurement(
             await client.close()
         logger.info("Ended measurement and cleared %s clients", clients)
         await measurement_state.reset()
+        schedule_summary_update(str(measurement_file_path))
 
 
 # pylint: enable=too-many-branches, too-many-locals, too-many-statements
@@ -0,0 +1,345 @@
+"""Read parts of stored measurement data
+
+The acceleration table of a measurement file stores the timestamp of every
+value in microseconds since the start of the measurement. Since these
+timestamps never decrease, a (guided) binary search finds the rows of a time
+window by reading only a few single rows. Reading the data afterwards only
+touches the HDF5 chunks that contain the requested rows.
+"""
+
+import os
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+
+import tables
+from tables import NoSuchNodeError
+
+from icoapi.models.models import Dataset, ParsedMeasurement
+from icoapi.scripts.data_handling import AccelerationDataNotFoundError
+
+TIMESTAMP_RESOLUTION = 1_000_000
+"""Number of timestamp units (microseconds) per second"""
+
+NON_CHANNEL_COLUMNS = ("counter", "timestamp")
+"""Columns of the acceleration table that do not contain measurement data"""
+
+SEARCH_WINDOW = 1000
+"""Number of rows searched around the estimated position of a timestamp"""
+
+
+class TableColumn(Sequence):
+    """Lazy read-only view of a single column of a table
+
+    Only the accessed rows are read from disk, which allows using the
+    functions of the ``bisect`` module on (huge) columns.
+
+    Args:
+
+        table:
+            The table that contains the column
+
+        name:
+            The name of the column
+
+    """
+
+    def __init__(self, table: tables.Table, name: str) -> None:
+        self.table = table
+        self.name = name
+
+    def __len__(self) -> int:
+        return self.table.nrows
+
+    def __getitem__(self, index):
+        # Reading complete rows is much faster than using the `field`
+        # argument of `Table.read`, which reads the column in small pieces.
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            return self.table.read(start, stop, step)[self.name]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"Row index {index} out of range")
+        return self.table.read(index, index + 1)[0][self.name]
+
+
+def get_acceleration_table(file_handle: tables.File) -> tables.Table:
+    """Get the table containing the measurement data of a file
+
+    Raises:
+
+        AccelerationDataNotFoundError:
+            If the file does not contain an acceleration table
+
+    """
+
+    try:
+        table = file_handle.get_node("/acceleration")
+    except NoSuchNodeError as error:
+        raise AccelerationDataNotFoundError from error
+    if not isinstance(table, tables.Table):
+        raise AccelerationDataNotFoundError
+
+    return table
+
+
+def get_channel_names(table: tables.Table) -> list[str]:
+    """Get the names of the columns containing measurement data"""
+
+    return [name for name in table.colnames if name not in NON_CHANNEL_COLUMNS]
+
+
+def get_row_rate(table: tables.Table) -> float:
+    """Get the number of stored rows per second
+
+    Since the table does not contain rows for lost messages, the row rate
+    is lower than the sample rate of the sensor node, if data was lost.
+
+    Args:
+
+        table:
+            The acceleration table
+
+    Returns:
+
+        The average number of rows per second or ``0``, if the table does
+        not contain enough data
+
+    """
+
+    if table.nrows < 2:
+        return 0.0
+
+    duration = (
+        float(table[-1]["timestamp"]) - float(table[0]["timestamp"])
+    ) / TIMESTAMP_RESOLUTION
+    return (table.nrows - 1) / duration if duration > 0 else 0.0
+
+
+def select_channels(
+    table: tables.Table, channels: list[str] | None
+) -> list[str]:
+    """Check the requested channels of a table
+
+    Args:
+
+        table:
+            The acceleration table
+
+        channels:
+            The names of the requested channels (``None`` means all channels)
+
+    Returns:
+
+        The names of the selected channels
+
+    Raises:
+
+        ValueError:
+            If the table does not contain one of the requested channels
+
+    """
+
+    available = get_channel_names(table)
+    selected = available if channels is None else channels
+    unknown = set(selected) - set(available)
+    if unknown:
+        raise ValueError(f"Unknown channels: {', '.join(sorted(unknown))}")
+
+    return selected
+
+
+def find_row(
+    timestamps: Sequence,
+    value: float,
+    *,
+    right: bool = False,
+    window: int = SEARCH_WINDOW,
+) -> int:
+    """Find the insertion point of a timestamp
+
+    Since the sensor node sends values with a constant rate, the timestamps
+    grow (almost) linearly. The function therefore first guesses the
+    position of the timestamp and then searches only a small window around
+    this guess. Only if the value is not inside the window (e.g. because of
+    data loss), it falls back to a binary search on the remaining part.
+
+    Args:
+
+        timestamps:
+            The sorted timestamps
+
+        value:
+            The searched timestamp
+
+        right:
+            Return the position after (instead of before) existing entries
+            equal to ``value``
+
+        window:
+            The number of rows searched on each side of the guess
+
+    Returns:
+
+        The insertion point like ``bisect_left`` (or ``bisect_right``)
+
+    Examples:
+
+        >>> timestamps = [0, 10, 10, 10, 20, 30, 100, 110]
+        >>> find_row(timestamps, 10, window=1)
+        1
+        >>> find_row(timestamps, 10, right=True, window=1)
+        4
+        >>> find_row(timestamps, 95, window=1), find_row(timestamps, 5, window=1)
+        (6, 1)
+        >>> find_row(timestamps, -1, window=1), find_row(timestamps, 200, window=1)
+        (0, 8)
+
+    """
+
+    search = bisect_right if right else bisect_left
+    number_of_rows = len(timestamps)
+    if number_of_rows < 2:
+        return search(timestamps, value)
+
+    first, last = timestamps[0], timestamps[number_of_rows - 1]
+    if value <= first or value >= last or last == first:
+        return search(timestamps, value)
+
+    guess = int((value - first) / (last - first) * (number_of_rows - 1))
+    low = max(guess - window, 1)
+    high = min(guess + window, number_of_rows - 1)
+
+    def before(index: int) -> bool:
+        """Check if the insertion point is after the given row"""
+        return (
+            timestamps[index] <= value if right else timestamps[index] < value
+        )
+
+    if not before(low - 1):
+        low, high = 0, low
+    elif before(high):
+        low, high = high + 1, number_of_rows
+
+    return search(timestamps, value, low, high)
+
+
+def find_rows(
+    table: tables.Table, start: float | None, end: float | None
+) -> tuple[int, int]:
+    """Find the rows of a time window
+
+    Args:
+
+        table:
+            The acceleration table
+
+        start:
+            The start of the time window in seconds (inclusive)
+
+        end:
+            The end of the time window in seconds (inclusive)
+
+    Returns:
+
+        The index of the first row and the index after the last row of the
+        time window
+
+    """
+
+    timestamps = TableColumn(table, "timestamp")
+    first = (
+        0
+        if start is None
+        else find_row(timestamps, start * TIMESTAMP_RESOLUTION)
+    )
+    stop = (
+        len(timestamps)
+        if end is None
+        else find_row(timestamps, end * TIMESTAMP_RESOLUTION, right=True)
+    )
+    return first, stop
+
+
+# pylint: disable=too-many-arguments, too-many-locals
+
+
+def read_measurement_range(
+    file_path: str,
+    start: float | None = None,
+    end: float | None = None,
+    *,
+    first_row: int | None = None,
+    stop_row: int | None = None,
+    channels: list[str] | None = None,
+    step: int = 1,
+) -> ParsedMeasurement:
+    """Read the measurement data of a time or row range
+
+    Args:
+
+        file_path:
+            The path of the measurement file
+
+        start:
+            The start of the time window in seconds
+
+        end:
+            The end of the time window in seconds
+
+        first_row:
+            The index of the first row (instead of a time window)
+
+        stop_row:
+            The index after the last row (instead of a time window)
+
+        channels:
+            The names of the returned channels (default: all channels)
+
+        step:
+            Only return every ``step``-th row
+
+    Returns:
+
+        The measurement data of the requested range
+
+    Raises:
+
+        ValueError:
+            If the range or channel selection is invalid
+
+    """
+
+    if step < 1:
+        raise ValueError(f"Invalid step size: {step}")
+    if start is not None and end is not None and start > end:
+        raise ValueError(f"Start ({start}) is after end ({end})")
+    use_rows = first_row is not None or stop_row is not None
+    if use_rows and (start is not None or end is not None):
+        raise ValueError("Use either a time range or a row range")
+
+    with tables.open_file(file_path, mode="r") as file_handle:
+        table = get_acceleration_table(file_handle)
+
+        selected = select_channels(table, channels)
+
+        if use_rows:
+            first, stop, _ = slice(first_row, stop_row).indices(table.nrows)
+        else:
+            first, stop = find_rows(table, start, end)
+
+        rows = table.read(first, max(first, stop), step)
+
+    return ParsedMeasurement(
+        name=os.path.basename(file_path),
+        counter=rows["counter"].tolist(),
+        timestamp=rows["timestamp"].tolist(),
+        datasets=[
+            Dataset(name=channel, data=rows[channel].tolist())
+            for channel in selected
+        ],
+    )
+
+
+# pylint: enable=too-many-arguments, too-many-locals
@@ -0,0 +1,501 @@
+"""Multi-resolution overview of stored measurement data
+
+Displaying a measurement never needs more than one point per pixel. The
+overview stores the minimum, maximum and mean of consecutive rows on
+multiple levels, where every level combines ``OVERVIEW_FACTOR`` points of the
+level below. A request for a time window then only reads the level that
+contains about as many points as the window is wide, which means the amount
+of work depends on the screen width and not on the length of the
+measurement.
+
+The overview is stored in the cache folder of the measurement directory, so
+the measurement files themselves never change.
+"""
+
+import logging
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from math import ceil
+from typing import Any
+
+import numpy as np
+import tables
+
+from icoapi.models.models import MeasurementOverview, OverviewDataset
+from icoapi.scripts.file_handling import get_sidecar_path, write_sidecar_file
+from icoapi.scripts.measurement_data import (
+    TIMESTAMP_RESOLUTION,
+    find_rows,
+    get_acceleration_table,
+    get_channel_names,
+    select_channels,
+)
+
+logger = logging.getLogger(__name__)
+
+OVERVIEW_BASE = 256
+"""Number of rows combined into one point of the finest level"""
+
+OVERVIEW_FACTOR = 4
+"""Number of points of a level combined into one point of the next level"""
+
+OVERVIEW_MINIMUM_POINTS = 1024
+"""Number of points above which another (coarser) level is added"""
+
+OVERVIEW_SUFFIX = "overview.npz"
+"""Suffix of the file that stores the overview of a measurement"""
+
+READ_BLOCK = OVERVIEW_BASE * 4096
+"""Number of rows read at once while creating the overview"""
+
+
+@dataclass
+class OverviewLevel:
+    """Minimum, maximum and mean values of consecutive rows
+
+    Args:
+
+        timestamp:
+            The timestamp of the first row of every point
+
+        count:
+            The number of rows combined into every point
+
+        minimum:
+            The minimum of every point for each channel
+
+        maximum:
+            The maximum of every point for each channel
+
+        mean:
+            The mean of every point for each channel
+
+    """
+
+    timestamp: np.ndarray
+    count: np.ndarray
+    minimum: dict[str, np.ndarray]
+    maximum: dict[str, np.ndarray]
+    mean: dict[str, np.ndarray]
+
+    @classmethod
+    def from_rows(cls, rows: np.ndarray, channels: list[str]):
+        """Create a level where every point contains a single row
+
+        Args:
+
+            rows:
+                Rows of the acceleration table
+
+            channels:
+                The names of the included channels
+
+        Returns:
+
+            A level containing the values of the rows
+
+        """
+
+        values = {
+            channel: rows[channel].astype(np.float32) for channel in channels
+        }
+        return cls(
+            timestamp=rows["timestamp"].astype(np.float64),
+            count=np.ones(len(rows), dtype=np.uint32),
+            minimum=values,
+            maximum=values,
+            mean=values,
+        )
+
+    @classmethod
+    def concatenate(cls, levels: list["OverviewLevel"], channels: list[str]):
+        """Combine consecutive parts of a level"""
+
+        return cls(
+            timestamp=np.concatenate(
+                [np.empty(0)] + [level.timestamp for level in levels]
+            ),
+            count=np.concatenate(
+                [np.empty(0, dtype=np.uint32)]
+                + [level.count for level in levels]
+            ),
+            **{
+                statistic: {
+                    channel: np.concatenate(
+                        [np.empty(0, dtype=np.float32)]
+                        + [
+                            getattr(level, statistic)[channel]
+                            for level in levels
+                        ]
+                    )
+                    for channel in channels
+                }
+                for statistic in ("minimum", "maximum", "mean")
+            },
+        )
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def reduce(self, factor: int) -> "OverviewLevel":
+        """Combine a fixed number of consecutive points
+
+        Args:
+
+            factor:
+                The number of points combined into a single point
+
+        Returns:
+
+            A level containing ``factor`` times fewer points
+
+        Examples:
+
+            >>> rows = np.zeros(5, dtype=[("timestamp", "u8"), ("x", "f4")])
+            >>> rows["timestamp"] = [0, 10, 20, 30, 40]
+            >>> rows["x"] = [1, 5, 3, 2, 8]
+            >>> level = OverviewLevel.from_rows(rows, ["x"]).reduce(2)
+            >>> level.timestamp.tolist(), level.count.tolist()
+            ([0.0, 20.0, 40.0], [2, 2, 1])
+            >>> level.minimum["x"].tolist(), level.maximum["x"].tolist()
+            ([1.0, 2.0, 8.0], [5.0, 3.0, 8.0])
+            >>> level.reduce(2).mean["x"].tolist()
+            [2.75, 8.0]
+
+        """
+
+        if factor <= 1 or len(self) == 0:
+            return self
+
+        starts = np.arange(0, len(self), factor)
+        count = np.add.reduceat(self.count, starts)
+        return OverviewLevel(
+            timestamp=self.timestamp[starts],
+            count=count,
+            minimum={
+                channel: np.minimum.reduceat(values, starts)
+                for channel, values in self.minimum.items()
+            },
+            maximum={
+                channel: np.maximum.reduceat(values, starts)
+                for channel, values in self.maximum.items()
+            },
+            mean={
+                channel: (
+                    np.add.reduceat(values * self.count, starts) / count
+                ).astype(np.float32)
+                for channel, values in self.mean.items()
+            },
+        )
+
+    def select(self, first: int, stop: int) -> "OverviewLevel":
+        """Get the points of an index range"""
+
+        return OverviewLevel(
+            timestamp=self.timestamp[first:stop],
+            count=self.count[first:stop],
+            minimum={
+                channel: values[first:stop]
+                for channel, values in self.minimum.items()
+            },
+            maximum={
+                channel: values[first:stop]
+                for channel, values in self.maximum.items()
+            },
+            mean={
+                channel: values[first:stop]
+                for channel, values in self.mean.items()
+            },
+        )
+
+    def find_points(
+        self, start: float | None, end: float | None
+    ) -> tuple[int, int]:
+        """Find the points that contain the rows of a time window
+
+        Args:
+
+            start:
+                The start of the time window in seconds
+
+            end:
+                The end of the time window in seconds
+
+        Returns:
+
+            The index of the first point and the index after the last point
+
+        """
+
+        first = (
+            0
+            if start is None
+            else max(
+                int(
+                    np.searchsorted(
+                        self.timestamp,
+                        start * TIMESTAMP_RESOLUTION,
+                        side="right",
+                    )
+                )
+                - 1,
+                0,
+            )
+        )
+        stop = (
+            len(self)
+            if end is None
+            else int(
+                np.searchsorted(
+                    self.timestamp, end * TIMESTAMP_RESOLUTION, side="right"
+                )
+            )
+        )
+        return first, max(first, stop)
+
+
+def create_overview(table: tables.Table) -> list[OverviewLevel]:
+    """Create all levels of the overview of an acceleration table
+
+    Args:
+
+        table:
+            The acceleration table
+
+    Returns:
+
+        The levels of the overview starting with the finest level
+
+    """
+
+    channels = get_channel_names(table)
+    # The size of a block is a multiple of the number of rows per point,
+    # which means points never span multiple blocks.
+    levels = [
+        OverviewLevel.concatenate(
+            [
+                OverviewLevel.from_rows(
+                    table.read(start, start + READ_BLOCK), channels
+                ).reduce(OVERVIEW_BASE)
+                for start in range(0, table.nrows, READ_BLOCK)
+            ],
+            channels,
+        )
+    ]
+    while len(levels[-1]) > OVERVIEW_MINIMUM_POINTS:
+        levels.append(levels[-1].reduce(OVERVIEW_FACTOR))
+
+    return levels
+
+
+def save_overview(
+    overview_path: str, levels: list[OverviewLevel], rows: int
+) -> None:
+    """Store the overview of a measurement
+
+    Args:
+
+        overview_path:
+            The path of the overview file
+
+        levels:
+            The levels of the overview
+
+        rows:
+            The number of rows of the acceleration table
+
+    """
+
+    channels = list(levels[0].mean)
+    arrays: dict[str, Any] = {
+        "rows": np.array(rows),
+        "levels": np.array(len(levels)),
+        "channels": np.array(channels, dtype=np.str_),
+    }
+    for index, level in enumerate(levels):
+        arrays[f"level{index}_timestamp"] = level.timestamp
+        arrays[f"level{index}_count"] = level.count
+        for channel in channels:
+            arrays[f"level{index}_{channel}_minimum"] = level.minimum[channel]
+            arrays[f"level{index}_{channel}_maximum"] = level.maximum[channel]
+            arrays[f"level{index}_{channel}_mean"] = level.mean[channel]
+
+    write_sidecar_file(
+        overview_path, lambda overview_file: np.savez(overview_file, **arrays)
+    )
+
+
+@lru_cache(maxsize=4)
+def load_overview(
+    overview_path: str, modified: int  # pylint: disable=unused-argument
+) -> tuple[int, list[OverviewLevel]]:
+    """Load the overview of a measurement
+
+    Args:
+
+        overview_path:
+            The path of the overview file
+
+        modified:
+            The modification time of the overview file, which makes sure
+            the cache never returns outdated data
+
+    Returns:
+
+        The number of rows of the acceleration table at the time the
+        overview was created and the levels of the overview
+
+    """
+
+    with np.load(overview_path) as data:
+        channels = data["channels"].tolist()  # pylint: disable=no-member
+        levels = [
+            OverviewLevel(
+                timestamp=data[f"level{index}_timestamp"],
+                count=data[f"level{index}_count"],
+                minimum={
+                    channel: data[f"level{index}_{channel}_minimum"]
+                    for channel in channels
+                },
+                maximum={
+                    channel: data[f"level{index}_{channel}_maximum"]
+                    for channel in channels
+                },
+                mean={
+                    channel: data[f"level{index}_{channel}_mean"]
+                    for channel in channels
+                },
+            )
+            for index in range(int(data["levels"]))
+        ]
+        return int(data["rows"]), levels
+
+
+def get_overview(file_path: str, table: tables.Table) -> list[OverviewLevel]:
+    """Get the overview of a measurement
+
+    The overview is created, if it does not exist yet or if the measurement
+    data changed since its creation.
+
+    Args:
+
+        file_path:
+            The path of the measurement file
+
+        table:
+            The acceleration table of the measurement file
+
+    Returns:
+
+        The levels of the overview
+
+    """
+
+    overview_path = get_sidecar_path(file_path, OVERVIEW_SUFFIX)
+    try:
+        rows, levels = load_overview(
+            overview_path, os.stat(overview_path).st_mtime_ns
+        )
+        if rows == table.nrows:
+            return levels
+    except (OSError, KeyError, ValueError) as error:
+        logger.debug("Unable to load overview %s: %s", overview_path, error)
+
+    logger.info("Creating overview for measurement %s", file_path)
+    levels = create_overview(table)
+    save_overview(overview_path, levels, table.nrows)
+    return levels
+
+
+# pylint: disable=too-many-arguments, too-many-locals
+
+
+def read_overview(
+    file_path: str,
+    start: float | None = None,
+    end: float | None = None,
+    *,
+    width: int = 1000,
+    channels: list[str] | None = None,
+) -> MeasurementOverview:
+    """Read the overview of a time window
+
+    Args:
+
+        file_path:
+            The path of the measurement file
+
+        start:
+            The start of the time window in seconds
+
+        end:
+            The end of the time window in seconds
+
+        width:
+            The maximum number of returned points (e.g. the width of the
+            plot in pixels)
+
+        channels:
+            The names of the returned channels (default: all channels)
+
+    Returns:
+
+        At most ``width`` points of the time window
+
+    Raises:
+
+        ValueError:
+            If the time window, width or channel selection is invalid
+
+    """
+
+    if width < 1:
+        raise ValueError(f"Invalid width: {width}")
+    if start is not None and end is not None and start > end:
+        raise ValueError(f"Start ({start}) is after end ({end})")
+
+    with tables.open_file(file_path, mode="r") as file_handle:
+        table = get_acceleration_table(file_handle)
+
+        selected = select_channels(table, channels)
+        levels = get_overview(file_path, table)
+        first, stop = levels[0].find_points(start, end)
+
+        if stop - first <= width:
+            # The finest level would contain fewer points than requested
+            first, stop = find_rows(table, start, end)
+            level = OverviewLevel.from_rows(
+                table.read(first, max(first, stop)), selected
+            )
+            rows_per_point = 1
+        else:
+            index = 0
+            while stop - first > width and index < len(levels) - 1:
+                index += 1
+                first, stop = levels[index].find_points(start, end)
+            level = levels[index].select(first, stop)
+            rows_per_point = OVERVIEW_BASE * OVERVIEW_FACTOR**index
+
+    factor = ceil(len(level) / width)
+    if factor > 1:
+        level = level.reduce(factor)
+        rows_per_point *= factor
+
+    return MeasurementOverview(
+        name=os.path.basename(file_path),
+        rows_per_point=rows_per_point,
+        timestamp=level.timestamp.tolist(),
+        datasets=[
+            OverviewDataset(
+                name=channel,
+                minimum=level.minimum[channel].tolist(),
+                maximum=level.maximum[channel].tolist(),
+                mean=level.mean[channel].tolist(),
+            )
+            for channel in selected
+        ],
+    )
+
+
+# pylint: enable=too-many-arguments, too-many-locals
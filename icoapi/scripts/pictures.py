@@ -0,0 +1,312 @@
+"""Store and read the pictures of measurement metadata
+
+Clients send pictures as base64 strings (or data URLs) inside the metadata.
+The API stores the decoded pictures as variable length binary rows below a
+node ``/<prefix>__<parameter>`` together with a downscaled thumbnail of
+every picture below ``/thumbnails``. The media type, dimensions, size and
+content hash of the pictures are stored as JSON in the attribute
+``pictures`` of the node.
+
+Older measurement files store the base64 strings in a fixed width string
+array. Reading pictures supports both formats.
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+import logging
+from io import BytesIO
+from typing import Any
+
+import numpy as np
+import tables
+from tables import NoSuchNodeError
+
+from icoapi.models.models import PictureInfo
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_GROUP = "thumbnails"
+"""Group that stores the thumbnails of the pictures"""
+
+THUMBNAIL_SIZE = (256, 256)
+"""Maximum width and height of thumbnails"""
+
+PICTURE_SIGNATURES: dict[bytes, str] = {
+    b"\x89PNG\r\n\x1a\n": "image/png",
+    b"\xff\xd8\xff": "image/jpeg",
+    b"GIF87a": "image/gif",
+    b"GIF89a": "image/gif",
+    b"BM": "image/bmp",
+}
+"""Media types of pictures with a certain file signature"""
+
+
+def get_node_names(hdf5_file_handle: tables.File) -> list[str]:
+    """Get name of HDF5 nodes"""
+
+    nodes = hdf5_file_handle.list_nodes("/")
+    return [
+        node._v_pathname for node in nodes  # pylint: disable=protected-access
+    ]
+
+
+def get_picture_node_names(hdf5_file_handle: tables.File) -> list[str]:
+    """Get name of nodes that contain picture data"""
+
+    names = get_node_names(hdf5_file_handle)
+    return [name for name in names if "pictures" in name]
+
+
+def decode_picture(encoded: bytes) -> tuple[bytes, str]:
+    """Decode a (base64 encoded) picture
+
+    Args:
+
+        encoded:
+            The picture as base64 string or data URL
+
+    Returns:
+
+        The content and the media type of the picture
+
+    Examples:
+
+        >>> decode_picture(b"data:image/png;base64,SGVsbG8=")
+        (b'Hello', 'image/png')
+        >>> content, mime = decode_picture(
+        ...     base64.b64encode(b"\\xff\\xd8\\xff\\xe0"))
+        >>> mime
+        'image/jpeg'
+        >>> decode_picture(b"not base64!")
+        (b'not base64!', 'application/octet-stream')
+
+    """
+
+    mime = ""
+    payload = encoded
+    if encoded.startswith(b"data:"):
+        header, _, payload = encoded.partition(b",")
+        mime = header.removeprefix(b"data:").split(b";")[0].decode()
+
+    try:
+        content = base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError):
+        return encoded, "application/octet-stream"
+
+    if not mime:
+        mime = next(
+            (
+                signature_mime
+                for signature, signature_mime in PICTURE_SIGNATURES.items()
+                if content.startswith(signature)
+            ),
+            "application/octet-stream",
+        )
+
+    return content, mime
+
+
+def create_thumbnail(
+    content: bytes,
+) -> tuple[tuple[int, int] | None, bytes, str | None]:
+    """Create a downscaled version of a picture
+
+    Args:
+
+        content:
+            The content of the picture
+
+    Returns:
+
+        The dimensions (width, height) of the picture, the content of the
+        thumbnail and its media type (``None`` for unsupported pictures)
+
+    Examples:
+
+        >>> from PIL import Image
+        >>> picture = BytesIO()
+        >>> Image.new("RGB", (1024, 512)).save(picture, format="PNG")
+        >>> size, thumbnail, mime = create_thumbnail(picture.getvalue())
+        >>> size, mime
+        ((1024, 512), 'image/jpeg')
+        >>> Image.open(BytesIO(thumbnail)).size
+        (256, 128)
+        >>> create_thumbnail(b"no picture")
+        (None, b'', None)
+
+    """
+
+    # pylint: disable-next=import-outside-toplevel
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        with Image.open(BytesIO(content)) as image:
+            size = image.size
+            image.thumbnail(THUMBNAIL_SIZE)
+            transparent = image.mode in ("RGBA", "LA", "P")
+            output = BytesIO()
+            if transparent:
+                image.save(output, format="PNG", optimize=True)
+            else:
+                image.convert("RGB").save(output, format="JPEG", quality=85)
+    except (UnidentifiedImageError, OSError, ValueError) as error:
+        logger.warning("Unable to create thumbnail: %s", error)
+        return None, b"", None
+
+    return size, output.getvalue(), "image/png" if transparent else "image/jpeg"
+
+
+def write_pictures(
+    file_handle: tables.File, name: str, encoded_pictures: list[str]
+) -> None:
+    """Store pictures and their thumbnails in a measurement file
+
+    Existing pictures with the same name are replaced.
+
+    Args:
+
+        file_handle:
+            The measurement file
+
+        name:
+            The name of the picture node (``<prefix>__<parameter>``)
+
+        encoded_pictures:
+            The base64 encoded pictures (or data URLs)
+
+    """
+
+    for where in ("/", f"/{THUMBNAIL_GROUP}"):
+        if f"{where.rstrip('/')}/{name}" in file_handle:
+            file_handle.remove_node(where, name, recursive=True)
+    if f"/{THUMBNAIL_GROUP}" not in file_handle:
+        file_handle.create_group("/", THUMBNAIL_GROUP)
+
+    pictures = file_handle.create_vlarray(
+        "/", name, atom=tables.UInt8Atom()
+    )
+    thumbnails = file_handle.create_vlarray(
+        f"/{THUMBNAIL_GROUP}", name, atom=tables.UInt8Atom()
+    )
+    details: list[dict[str, Any]] = []
+    for encoded in encoded_pictures:
+        content, mime = decode_picture(encoded.encode("utf-8"))
+        size, thumbnail, thumbnail_mime = create_thumbnail(content)
+        pictures.append(np.frombuffer(content, dtype=np.uint8))
+        thumbnails.append(np.frombuffer(thumbnail, dtype=np.uint8))
+        details.append({
+            "mime": mime,
+            "width": None if size is None else size[0],
+            "height": None if size is None else size[1],
+            "size": len(content),
+            "sha256": hashlib.sha256(content).hexdigest(),
+            "thumbnail_mime": thumbnail_mime,
+        })
+    pictures.attrs["pictures"] = json.dumps(details)
+
+
+def get_picture_infos(
+    file_handle: tables.File, name: str
+) -> dict[str, list[PictureInfo]]:
+    """Get the descriptors of the pictures stored in an HDF5 file
+
+    Args:
+
+        file_handle:
+            The measurement file
+
+        name:
+            The name of the measurement file (used for the download path)
+
+    Returns:
+
+        The descriptors of the pictures of every picture parameter
+
+    """
+
+    pictures: dict[str, list[PictureInfo]] = {}
+    for node_name in get_picture_node_names(file_handle):
+        node = file_handle.get_node(node_name)
+        parameter = node_name.removeprefix("/")
+        path = f"/api/v1/files/{name}/pictures/{parameter}"
+        if isinstance(node, tables.VLArray):
+            details = json.loads(node.attrs["pictures"])
+        elif isinstance(node, tables.Array):
+            details = []
+            for encoded in node.iterrows():
+                content, mime = decode_picture(bytes(encoded))
+                details.append({
+                    "mime": mime,
+                    "size": len(content),
+                    "sha256": hashlib.sha256(content).hexdigest(),
+                })
+        else:
+            continue
+        pictures[parameter] = [
+            PictureInfo(
+                parameter=parameter,
+                index=index,
+                download_path=f"{path}/{index}",
+                thumbnail_path=(
+                    f"{path}/{index}?thumbnail=true"
+                    if detail.get("thumbnail_mime")
+                    else None
+                ),
+                **detail,
+            )
+            for index, detail in enumerate(details)
+        ]
+
+    return pictures
+
+
+def read_picture(
+    file_path: str, parameter: str, index: int, thumbnail: bool = False
+) -> bytes:
+    """Read a picture stored in a measurement file
+
+    Args:
+
+        file_path:
+            The path of the measurement file
+
+        parameter:
+            The name of the node that stores the pictures of a parameter
+
+        index:
+            The position of the picture in the node
+
+        thumbnail:
+            Read the thumbnail instead of the full resolution picture
+
+    Returns:
+
+        The content of the picture
+
+    Raises:
+
+        NoSuchNodeError:
+            If there is no picture with the given parameter and index
+
+    """
+
+    with tables.open_file(file_path, mode="r") as file_handle:
+        if f"/{parameter}" not in get_picture_node_names(file_handle):
+            raise NoSuchNodeError(f"No pictures for parameter {parameter}")
+        node = file_handle.get_node(f"/{parameter}")
+        if not 0 <= index < node.nrows:
+            raise NoSuchNodeError(f"No picture {index} for {parameter}")
+        if not isinstance(node, tables.VLArray):
+            if thumbnail:
+                raise NoSuchNodeError(f"No thumbnail for {parameter}")
+            return decode_picture(bytes(node.read(index, index + 1)[0]))[0]
+
+        if thumbnail:
+            node = file_handle.get_node(f"/{THUMBNAIL_GROUP}/{parameter}")
+        content = node[index].tobytes()
+
+    if thumbnail and not content:
+        raise NoSuchNodeError(f"No thumbnail for picture {index}")
+    return content
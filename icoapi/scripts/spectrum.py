@@ -0,0 +1,463 @@
+"""Spectral analysis of stored measurement data
+
+The functions in this module read the acceleration table block by block and
+compute the spectra of (overlapping) windowed segments. This way the memory
+usage only depends on the block and segment size and not on the length of
+the analyzed time range.
+"""
+
+import os
+from collections.abc import Iterator
+from math import ceil
+from typing import Callable, Literal
+
+import numpy as np
+import tables
+from numpy.lib.stride_tricks import sliding_window_view
+
+from icoapi.models.models import (
+    Dataset,
+    MeasurementSpectrogram,
+    MeasurementSpectrum,
+    SpectrogramDataset,
+)
+from icoapi.scripts.measurement_data import (
+    find_rows,
+    get_acceleration_table,
+    get_row_rate,
+    select_channels,
+)
+
+SPECTRUM_BLOCK = 262_144
+"""Number of rows read at once for spectral analysis"""
+
+SPECTRUM_BATCH_VALUES = 4_194_304
+"""Maximum number of values (of all segments) transformed at once"""
+
+SPECTROGRAM_MAX_VALUES = 1_048_576
+"""Maximum number of values (columns × frequencies) of a spectrogram channel"""
+
+WindowFunction = Literal["hann", "hamming", "blackman", "rectangular"]
+"""Names of the supported window functions"""
+
+WINDOWS: dict[str, Callable[[int], np.ndarray]] = {
+    "hann": np.hanning,
+    "hamming": np.hamming,
+    "blackman": np.blackman,
+    "rectangular": np.ones,
+}
+"""Window functions by name"""
+
+
+class SegmentSpectra:
+    """Calculate the spectra of overlapping segments of consecutive values
+
+    Values that do not fill a complete segment are kept until the next call
+    of ``add``, which means segments may span multiple blocks. The mean of
+    every segment is removed before windowing.
+
+    Args:
+
+        segment_length:
+            The number of values per segment
+
+        overlap:
+            The overlapping part of consecutive segments (between 0 and 1)
+
+        window:
+            The name of the window function
+
+    Raises:
+
+        ValueError:
+            If one of the arguments is invalid
+
+    Examples:
+
+        >>> spectra = SegmentSpectra(4, overlap=0.5, window="rectangular")
+        >>> spectra.add(np.array([1, -1, 1])).shape
+        (0, 3)
+        >>> spectra.add(np.array([-1, 1, -1, 1])).tolist()
+        [[0.0, 0.0, 16.0], [0.0, 0.0, 16.0]]
+        >>> spectra.remainder.tolist()
+        [1.0, -1.0, 1.0]
+
+    """
+
+    def __init__(
+        self, segment_length: int, overlap: float = 0.5, window: str = "hann"
+    ) -> None:
+        if segment_length < 2:
+            raise ValueError(f"Invalid segment length: {segment_length}")
+        if not 0 <= overlap < 1:
+            raise ValueError(f"Invalid overlap: {overlap}")
+        if window not in WINDOWS:
+            raise ValueError(f"Unknown window function: {window}")
+
+        self.segment_length = segment_length
+        self.step = max(round(segment_length * (1 - overlap)), 1)
+        self.window = WINDOWS[window](segment_length)
+        self.remainder = np.empty(0)
+
+    def add(self, values: np.ndarray) -> np.ndarray:
+        """Add consecutive values
+
+        Args:
+
+            values:
+                The values that follow the values of the last call
+
+        Returns:
+
+            The squared magnitudes of the spectra of all segments completed
+            by the values (one row per segment)
+
+        """
+
+        return np.concatenate(
+            [np.empty((0, self.segment_length // 2 + 1))]
+            + list(self.add_batches(values))
+        )
+
+    def add_batches(self, values: np.ndarray) -> Iterator[np.ndarray]:
+        """Add consecutive values and transform the segments in batches
+
+        Every batch contains at most ``SPECTRUM_BATCH_VALUES`` values, which
+        limits the memory usage for long segments with a large overlap.
+
+        Args:
+
+            values:
+                The values that follow the values of the last call
+
+        Returns:
+
+            An iterator over the squared magnitudes of the spectra of
+            consecutive segments completed by the values (one row per
+            segment)
+
+        Examples:
+
+            >>> spectra = SegmentSpectra(4, overlap=0.75)
+            >>> [len(power) for power in spectra.add_batches(np.ones(10))]
+            [7]
+
+        """
+
+        data = np.concatenate((self.remainder, values.astype(np.float64)))
+        if len(data) < self.segment_length:
+            self.remainder = data
+            return
+
+        segments = sliding_window_view(data, self.segment_length)[
+            :: self.step
+        ]
+        self.remainder = data[len(segments) * self.step :]
+        batch = max(SPECTRUM_BATCH_VALUES // self.segment_length, 1)
+        for start in range(0, len(segments), batch):
+            part = segments[start : start + batch]
+            part = part - part.mean(axis=1, keepdims=True)
+            yield np.abs(np.fft.rfft(part * self.window, axis=1)) ** 2
+
+    def density(self, power: np.ndarray, sample_rate: float) -> np.ndarray:
+        """Convert squared magnitudes into a one-sided power spectral density
+
+        Args:
+
+            power:
+                The (averaged) squared magnitudes of one or more segments
+
+            sample_rate:
+                The number of values per second
+
+        Returns:
+
+            The power spectral density
+
+        """
+
+        density = power / (sample_rate * np.sum(self.window**2))
+        # The DC component and (for even lengths) the Nyquist frequency
+        # only occur once in the two-sided spectrum
+        last = -1 if self.segment_length % 2 == 0 else None
+        density[..., 1:last] *= 2
+        return density
+
+    def frequencies(self, sample_rate: float) -> np.ndarray:
+        """Get the frequencies of the spectra"""
+
+        return np.fft.rfftfreq(self.segment_length, 1 / sample_rate)
+
+
+def count_segments(
+    first: int, stop: int, spectra: SegmentSpectra, sample_rate: float
+) -> int:
+    """Get the number of segments of a row range
+
+    Args:
+
+        first:
+            The index of the first row
+
+        stop:
+            The index after the last row
+
+        spectra:
+            The (empty) spectra calculation for the row range
+
+        sample_rate:
+            The number of rows per second
+
+    Returns:
+
+        The number of complete segments
+
+    Raises:
+
+        ValueError:
+            If the range contains fewer rows than a single segment or the
+            sample rate is unknown
+
+    """
+
+    if sample_rate <= 0:
+        raise ValueError("Unable to determine the sample rate")
+    rows = max(stop - first, 0)
+    if rows < spectra.segment_length:
+        raise ValueError(
+            f"Range contains {rows} rows, which is less than the segment "
+            f"length {spectra.segment_length}"
+        )
+
+    return (rows - spectra.segment_length) // spectra.step + 1
+
+
+# pylint: disable=too-many-arguments, too-many-locals
+
+
+def read_spectrum(
+    file_path: str,
+    start: float | None = None,
+    end: float | None = None,
+    *,
+    channels: list[str] | None = None,
+    segment_length: int = 1024,
+    overlap: float = 0.5,
+    window: str = "hann",
+) -> MeasurementSpectrum:
+    """Calculate the power spectral density of a time window
+
+    The power spectral density is the average over the spectra of all
+    segments (Welch's method).
+
+    Args:
+
+        file_path:
+            The path of the measurement file
+
+        start:
+            The start of the time window in seconds
+
+        end:
+            The end of the time window in seconds
+
+        channels:
+            The names of the analyzed channels (default: all channels)
+
+        segment_length:
+            The number of values per segment
+
+        overlap:
+            The overlapping part of consecutive segments
+
+        window:
+            The name of the window function
+
+    Returns:
+
+        The power spectral density of every channel
+
+    Raises:
+
+        ValueError:
+            If an argument is invalid or the time window contains fewer
+            rows than one segment
+
+    """
+
+    if start is not None and end is not None and start > end:
+        raise ValueError(f"Start ({start}) is after end ({end})")
+    analysis = SegmentSpectra(segment_length, overlap, window)
+
+    with tables.open_file(file_path, mode="r") as file_handle:
+        table = get_acceleration_table(file_handle)
+        selected = select_channels(table, channels)
+        first, stop = find_rows(table, start, end)
+        sample_rate = get_row_rate(table)
+        segments = count_segments(first, stop, analysis, sample_rate)
+
+        spectra = {
+            channel: SegmentSpectra(segment_length, overlap, window)
+            for channel in selected
+        }
+        power = {
+            channel: np.zeros(segment_length // 2 + 1) for channel in selected
+        }
+        for block_start in range(first, stop, SPECTRUM_BLOCK):
+            rows = table.read(
+                block_start, min(block_start + SPECTRUM_BLOCK, stop)
+            )
+            for channel in selected:
+                for batch in spectra[channel].add_batches(rows[channel]):
+                    power[channel] += batch.sum(axis=0)
+
+    return MeasurementSpectrum(
+        name=os.path.basename(file_path),
+        segments=segments,
+        frequencies=analysis.frequencies(sample_rate).tolist(),
+        datasets=[
+            Dataset(
+                name=channel,
+                data=analysis.density(
+                    power[channel] / segments, sample_rate
+                ).tolist(),
+            )
+            for channel in selected
+        ],
+    )
+
+
+def read_spectrogram(
+    file_path: str,
+    start: float | None = None,
+    end: float | None = None,
+    *,
+    channels: list[str] | None = None,
+    segment_length: int = 256,
+    overlap: float = 0.5,
+    window: str = "hann",
+    columns: int = 256,
+) -> MeasurementSpectrogram:
+    """Calculate the spectrogram of a time window
+
+    If the time window contains more segments than ``columns``, every
+    column contains the average of consecutive segments. The number of
+    columns is reduced, if the spectrogram of a channel would contain more
+    than ``SPECTROGRAM_MAX_VALUES`` values.
+
+    Args:
+
+        file_path:
+            The path of the measurement file
+
+        start:
+            The start of the time window in seconds
+
+        end:
+            The end of the time window in seconds
+
+        channels:
+            The names of the analyzed channels (default: all channels)
+
+        segment_length:
+            The number of values per segment
+
+        overlap:
+            The overlapping part of consecutive segments
+
+        window:
+            The name of the window function
+
+        columns:
+            The maximum number of spectra (columns) of the spectrogram
+
+    Returns:
+
+        The power spectral densities of the columns for every channel
+
+    Raises:
+
+        ValueError:
+            If an argument is invalid or the time window contains fewer
+            rows than one segment
+
+    """
+
+    if columns < 1:
+        raise ValueError(f"Invalid number of columns: {columns}")
+    if start is not None and end is not None and start > end:
+        raise ValueError(f"Start ({start}) is after end ({end})")
+    analysis = SegmentSpectra(segment_length, overlap, window)
+    columns = min(
+        columns, max(SPECTROGRAM_MAX_VALUES // (segment_length // 2 + 1), 1)
+    )
+
+    with tables.open_file(file_path, mode="r") as file_handle:
+        table = get_acceleration_table(file_handle)
+        selected = select_channels(table, channels)
+        first, stop = find_rows(table, start, end)
+        sample_rate = get_row_rate(table)
+        segments = count_segments(first, stop, analysis, sample_rate)
+
+        segments_per_column = ceil(segments / columns)
+        column_of_segment = np.arange(segments) // segments_per_column
+        number_of_columns = int(column_of_segment[-1]) + 1
+        # Rows that contain the first value of every column
+        column_rows = (
+            first
+            + np.arange(number_of_columns) * segments_per_column * analysis.step
+        )
+        timestamps = np.zeros(number_of_columns)
+
+        spectra = {
+            channel: SegmentSpectra(segment_length, overlap, window)
+            for channel in selected
+        }
+        power = {
+            channel: np.zeros((number_of_columns, segment_length // 2 + 1))
+            for channel in selected
+        }
+        # Number of segments calculated before the current block
+        calculated = 0
+        for block_start in range(first, stop, SPECTRUM_BLOCK):
+            rows = table.read(
+                block_start, min(block_start + SPECTRUM_BLOCK, stop)
+            )
+            inside = (column_rows >= block_start) & (
+                column_rows < block_start + len(rows)
+            )
+            timestamps[inside] = rows["timestamp"][
+                column_rows[inside] - block_start
+            ]
+            added = 0
+            for channel in selected:
+                added = 0
+                for batch in spectra[channel].add_batches(rows[channel]):
+                    index = calculated + added
+                    np.add.at(
+                        power[channel],
+                        column_of_segment[index : index + len(batch)],
+                        batch,
+                    )
+                    added += len(batch)
+            calculated += added
+
+    counts = np.bincount(column_of_segment)[:, np.newaxis]
+    return MeasurementSpectrogram(
+        name=os.path.basename(file_path),
+        segments_per_column=segments_per_column,
+        timestamp=timestamps.tolist(),
+        frequencies=analysis.frequencies(sample_rate).tolist(),
+        datasets=[
+            SpectrogramDataset(
+                name=channel,
+                data=analysis.density(
+                    power[channel] / counts, sample_rate
+                ).tolist(),
+            )
+            for channel in selected
+        ],
+    )
+
+
+# pylint: enable=too-many-arguments, too-many-locals
@@ -0,0 +1,478 @@
+"""Summary statistics of stored measurement data
+
+Comparing many measurements should not require reading their data. The
+summary of a measurement contains statistics (e.g. RMS, peak value and
+percentiles) and a power spectral density (Welch's method) of every
+channel. A single pass over the acceleration table creates the summary,
+which is stored in the cache folder of the measurement directory.
+"""
+
+import logging
+import os
+from concurrent.futures import Future
+
+import numpy as np
+import tables
+from icotronic.can.dataloss import MessageStats
+from pydantic import ValidationError
+
+from icoapi.models.models import (
+    ChannelStatistics,
+    Dataset,
+    MeasurementSummary,
+    MeasurementSummaryDetails,
+)
+from icoapi.scripts.file_handling import get_sidecar_path, write_sidecar_file
+from icoapi.scripts.measurement_data import (
+    TIMESTAMP_RESOLUTION,
+    get_acceleration_table,
+    get_channel_names,
+    get_row_rate,
+)
+from icoapi.scripts.overview import READ_BLOCK, get_overview
+from icoapi.scripts.spectrum import SegmentSpectra
+from icoapi.utils.executor import hdf5_executor, run_in_hdf5_executor
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_BACKFILL = os.getenv("SUMMARY_BACKFILL", "0") == "1"
+
+SUMMARY_SUFFIX = "summary.json"
+"""Suffix of the file that stores the summary of a measurement"""
+
+STATISTICS_SUFFIX = "statistics.json"
+"""Suffix of the file that stores the summary without the spectra"""
+
+PERCENTILES = (1, 5, 50, 95, 99)
+"""Percentiles stored for every channel"""
+
+HISTOGRAM_BINS = 4096
+"""Number of histogram bins used to approximate the percentiles"""
+
+SEGMENT_LENGTH = 1024
+"""Number of values per segment of the power spectral density"""
+
+
+# pylint: disable=too-many-instance-attributes
+
+
+class ChannelAccumulator:
+    """Collect the statistics of a channel block by block
+
+    Percentiles are approximated using a histogram between the (known)
+    minimum and maximum of the channel. The power spectral density averages
+    the spectra of overlapping Hann windowed segments (Welch's method).
+    Gaps caused by data loss are ignored.
+
+    Args:
+
+        minimum:
+            The minimum value of the channel
+
+        maximum:
+            The maximum value of the channel
+
+    Examples:
+
+        >>> accumulator = ChannelAccumulator(0, 99)
+        >>> accumulator.add(np.arange(50))
+        >>> accumulator.add(np.arange(50, 100))
+        >>> accumulator.count, accumulator.mean()
+        (100, 49.5)
+        >>> abs(accumulator.percentile(50) - 49.5) < 1
+        True
+
+    """
+
+    def __init__(self, minimum: float, maximum: float) -> None:
+        self.edges = np.linspace(minimum, maximum, HISTOGRAM_BINS + 1)
+        self.histogram = np.zeros(HISTOGRAM_BINS, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.squares = 0.0
+        self.spectra = SegmentSpectra(SEGMENT_LENGTH)
+        self.power = np.zeros(SEGMENT_LENGTH // 2 + 1)
+        self.segments = 0
+
+    def add(self, values: np.ndarray) -> None:
+        """Add consecutive values of the channel"""
+
+        values = values.astype(np.float64)
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.squares += float(np.dot(values, values))
+        if self.edges[0] == self.edges[-1]:
+            self.histogram[0] += len(values)
+        else:
+            self.histogram += np.histogram(
+                values,
+                bins=HISTOGRAM_BINS,
+                range=(self.edges[0], self.edges[-1]),
+            )[0]
+
+        for power in self.spectra.add_batches(values):
+            self.power += power.sum(axis=0)
+            self.segments += len(power)
+
+    def mean(self) -> float:
+        """Get the mean of the values"""
+
+        return self.total / self.count if self.count else 0.0
+
+    def rms(self) -> float:
+        """Get the root mean square of the values"""
+
+        return float(np.sqrt(self.squares / self.count)) if self.count else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """Get an approximation of a percentile of the values"""
+
+        target = percent / 100 * self.count
+        cumulative = np.cumsum(self.histogram)
+        index = min(
+            int(np.searchsorted(cumulative, target)), HISTOGRAM_BINS - 1
+        )
+        before = cumulative[index] - self.histogram[index]
+        fraction = (
+            (target - before) / self.histogram[index]
+            if self.histogram[index]
+            else 0
+        )
+        return float(
+            self.edges[index]
+            + fraction * (self.edges[index + 1] - self.edges[index])
+        )
+
+    def psd(self, sample_rate: float) -> np.ndarray:
+        """Get the one-sided power spectral density of the values
+
+        Args:
+
+            sample_rate:
+                The number of values per second
+
+        Returns:
+
+            The power spectral density for frequencies from 0 up to half
+            the sample rate
+
+        """
+
+        if self.segments == 0 or sample_rate <= 0:
+            return np.empty(0)
+
+        return self.spectra.density(self.power / self.segments, sample_rate)
+
+
+# pylint: enable=too-many-instance-attributes
+
+
+def count_messages(
+    counters: np.ndarray, stats: MessageStats, last: int | None
+) -> int | None:
+    """Update the number of retrieved and lost messages
+
+    Args:
+
+        counters:
+            Consecutive message counters of the acceleration table
+
+        stats:
+            The message statistics that should be updated
+
+        last:
+            The last counter of the previous block
+
+    Returns:
+
+        The last counter of this block
+
+    Examples:
+
+        >>> stats = MessageStats()
+        >>> last = count_messages(np.array([1, 1, 1, 9, 9]), stats, None)
+        >>> count_messages(np.array([9, 10, 10]), stats, last)
+        10
+        >>> stats
+        Retrieved: 3, Lost: 7, Dataloss: 0.7
+
+    """
+
+    if len(counters) == 0:
+        return last
+
+    counters = counters.astype(np.int64)
+    if last is None:
+        stats.retrieved += 1
+    else:
+        counters = np.concatenate(([last], counters))
+    changes = np.diff(counters)
+    changes = changes[changes != 0]
+    stats.retrieved += len(changes)
+    stats.lost += int(np.sum(changes % 256 - 1))
+    return int(counters[-1])
+
+
+# pylint: disable=too-many-locals
+
+
+def create_summary(
+    file_path: str, table: tables.Table
+) -> MeasurementSummaryDetails:
+    """Calculate the summary of an acceleration table
+
+    Args:
+
+        file_path:
+            The path of the measurement file
+
+        table:
+            The acceleration table of the measurement file
+
+    Returns:
+
+        The summary of the measurement data
+
+    """
+
+    channels = get_channel_names(table) if table.nrows else []
+    # The overview already contains the minimum and maximum of each channel
+    coarsest = get_overview(file_path, table)[-1]
+    accumulators = {
+        channel: ChannelAccumulator(
+            float(coarsest.minimum[channel].min()),
+            float(coarsest.maximum[channel].max()),
+        )
+        for channel in channels
+    }
+
+    stats = MessageStats()
+    last = None
+    for start in range(0, table.nrows, READ_BLOCK):
+        rows = table.read(start, start + READ_BLOCK)
+        last = count_messages(rows["counter"], stats, last)
+        for channel, accumulator in accumulators.items():
+            accumulator.add(rows[channel])
+
+    duration = (
+        float(table[-1]["timestamp"] - table[0]["timestamp"])
+        / TIMESTAMP_RESOLUTION
+        if table.nrows
+        else 0.0
+    )
+    # The spectra treat the stored rows as equidistant, which means they
+    # have to use the rate of the stored rows. The sample rate of the sensor
+    # also includes the rows of lost messages.
+    row_rate = get_row_rate(table)
+    sample_rate = row_rate * (1 + stats.lost / max(stats.retrieved, 1))
+    frequency_resolution = row_rate / SEGMENT_LENGTH
+
+    statistics: list[ChannelStatistics] = []
+    densities: list[Dataset] = []
+    for channel, accumulator in accumulators.items():
+        minimum = float(accumulator.edges[0])
+        maximum = float(accumulator.edges[-1])
+        rms = accumulator.rms()
+        peak = max(abs(minimum), abs(maximum))
+        density = accumulator.psd(row_rate)
+        statistics.append(
+            ChannelStatistics(
+                name=channel,
+                minimum=minimum,
+                maximum=maximum,
+                mean=accumulator.mean(),
+                rms=rms,
+                peak=peak,
+                crest_factor=peak / rms if rms > 0 else None,
+                percentiles={
+                    str(percent): accumulator.percentile(percent)
+                    for percent in PERCENTILES
+                },
+                dominant_frequency=(
+                    float(np.argmax(density[1:]) + 1) * frequency_resolution
+                    if np.any(density[1:] > 0)
+                    else None
+                ),
+            )
+        )
+        densities.append(Dataset(name=channel, data=density.tolist()))
+
+    return MeasurementSummaryDetails(
+        rows=table.nrows,
+        duration=duration,
+        sample_rate=sample_rate,
+        dataloss=stats.dataloss(),
+        channels=statistics,
+        frequency_resolution=frequency_resolution,
+        psd=densities,
+    )
+
+
+# pylint: enable=too-many-locals
+
+
+def load_summary(file_path: str) -> MeasurementSummaryDetails | None:
+    """Load the stored summary of a measurement
+
+    Args:
+
+        file_path:
+            The path of the measurement file
+
+    Returns:
+
+        The summary of the measurement or ``None``, if there is no (valid)
+        stored summary
+
+    """
+
+    summary_path = get_sidecar_path(file_path, SUMMARY_SUFFIX)
+    try:
+        with open(summary_path, "rb") as summary_file:
+            return MeasurementSummaryDetails.model_validate_json(
+                summary_file.read()
+            )
+    except FileNotFoundError:
+        return None
+    except (OSError, ValidationError) as error:
+        logger.debug("Unable to load summary %s: %s", summary_path, error)
+        return None
+
+
+def load_summary_statistics(file_path: str) -> MeasurementSummary | None:
+    """Load the stored summary of a measurement without the spectra
+
+    The statistics are stored in a separate small file, which has the same
+    modification time as the measurement file. This way loading them does
+    neither require reading the spectra nor opening the measurement file.
+
+    Args:
+
+        file_path:
+            The path of the measurement file
+
+    Returns:
+
+        The statistics of the measurement or ``None``, if there are no
+        (valid) stored statistics for the current measurement data
+
+    """
+
+    statistics_path = get_sidecar_path(file_path, STATISTICS_SUFFIX)
+    try:
+        if (
+            os.stat(statistics_path).st_mtime_ns
+            != os.stat(file_path).st_mtime_ns
+        ):
+            return None
+        with open(statistics_path, "rb") as statistics_file:
+            return MeasurementSummary.model_validate_json(
+                statistics_file.read()
+            )
+    except FileNotFoundError:
+        return None
+    except (OSError, ValidationError) as error:
+        logger.debug(
+            "Unable to load statistics %s: %s", statistics_path, error
+        )
+        return None
+
+
+def update_summary(file_path: str) -> MeasurementSummaryDetails:
+    """Create the summary of a measurement, if it is missing or outdated
+
+    Args:
+
+        file_path:
+            The path of the measurement file
+
+    Returns:
+
+        The summary of the measurement
+
+    """
+
+    modified = os.stat(file_path).st_mtime_ns
+    created = False
+    with tables.open_file(file_path, mode="r") as file_handle:
+        table = get_acceleration_table(file_handle)
+        summary = load_summary(file_path)
+        if summary is None or summary.rows != table.nrows:
+            logger.info("Creating summary for measurement %s", file_path)
+            summary = create_summary(file_path, table)
+            created = True
+
+    if created:
+        write_sidecar_file(
+            get_sidecar_path(file_path, SUMMARY_SUFFIX),
+            lambda summary_file: summary_file.write(
+                summary.model_dump_json().encode()
+            ),
+        )
+    if created or load_summary_statistics(file_path) is None:
+        statistics = MeasurementSummary.model_validate(
+            summary.model_dump(exclude={"frequency_resolution", "psd"})
+        )
+        write_sidecar_file(
+            get_sidecar_path(file_path, STATISTICS_SUFFIX),
+            lambda statistics_file: statistics_file.write(
+                statistics.model_dump_json().encode()
+            ),
+            modified=modified,
+        )
+    return summary
+
+
+def schedule_summary_update(file_path: str) -> None:
+    """Create the overview and summary of a measurement in the background
+
+    Args:
+
+        file_path:
+            The path of the measurement file
+
+    """
+
+    def log_error(future: Future) -> None:
+        error = future.exception()
+        if error is not None:
+            logger.warning(
+                "Unable to create summary for %s: %s", file_path, error
+            )
+
+    if os.path.isfile(file_path):
+        hdf5_executor.submit(update_summary, file_path).add_done_callback(
+            log_error
+        )
+
+
+async def backfill_summaries(measurement_dir: str) -> None:
+    """Create the missing summaries of existing measurements
+
+    The files are processed one after another, each in a single task of
+    the HDF5 executor, so requests only wait for the current file.
+
+    Args:
+
+        measurement_dir:
+            The directory that contains the measurement files
+
+    """
+
+    try:
+        names = sorted(os.listdir(measurement_dir))
+    except FileNotFoundError:
+        return
+
+    for name in names:
+        file_path = os.path.join(measurement_dir, name)
+        if (
+            not os.path.isfile(file_path)
+            or not tables.is_hdf5_file(file_path)
+            or load_summary_statistics(file_path) is not None
+        ):
+            continue
+        try:
+            await run_in_hdf5_executor(update_summary, file_path)
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            logger.info("Unable to create summary for %s: %s", name, error)
@@ -0,0 +1,194 @@
+"""Support resumable and cacheable downloads
+
+Clients can skip unchanged files using the entity tag (``If-None-Match``)
+or the modification time (``If-Modified-Since``) of a previous download and
+resume interrupted downloads with a ``Range`` request.
+"""
+
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+
+from starlette.datastructures import Headers
+
+
+def create_etag(*parts: object) -> str:
+    """Create a (strong) entity tag from values identifying a file version
+
+    Examples:
+
+        >>> create_etag("file.hdf5", 1700000000.5, 1024) == create_etag(
+        ...     "file.hdf5", 1700000000.5, 1024)
+        True
+        >>> create_etag("file.hdf5", 1) == create_etag("file.hdf5", 2)
+        False
+
+    """
+
+    base = "-".join(str(part) for part in parts)
+    digest = hashlib.md5(base.encode(), usedforsecurity=False).hexdigest()
+    return f'"{digest}"'
+
+
+def get_validator_headers(etag: str, modified: float) -> dict[str, str]:
+    """Get the headers that allow clients to validate a stored download
+
+    Args:
+
+        etag:
+            The entity tag of the file
+
+        modified:
+            The modification time of the file (seconds since the epoch)
+
+    Returns:
+
+        The headers ``ETag`` and ``Last-Modified``
+
+    """
+
+    return {
+        "etag": etag,
+        "last-modified": formatdate(modified, usegmt=True),
+    }
+
+
+def is_not_modified(headers: Headers, etag: str, modified: float) -> bool:
+    """Check if the client already has the current version of a file
+
+    Args:
+
+        headers:
+            The headers of the request
+
+        etag:
+            The entity tag of the current version of the file
+
+        modified:
+            The modification time of the file (seconds since the epoch)
+
+    Returns:
+
+        ``True``, if the response can be ``304 Not Modified``
+
+    Examples:
+
+        >>> etag = create_etag("test")
+        >>> is_not_modified(Headers({"if-none-match": etag}), etag, 0)
+        True
+        >>> is_not_modified(Headers({"if-none-match": f'W/{etag}, "a"'}),
+        ...                 etag, 0)
+        True
+        >>> is_not_modified(Headers({"if-none-match": '"a"'}), etag, 0)
+        False
+        >>> since = {"if-modified-since": "Tue, 14 Nov 2023 22:13:20 GMT"}
+        >>> is_not_modified(Headers(since), etag, 1700000000.5)
+        True
+        >>> is_not_modified(Headers(since), etag, 1700000001)
+        False
+        >>> is_not_modified(Headers(), etag, 0)
+        False
+
+    """
+
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        # `If-None-Match` uses the weak comparison
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag.removeprefix("W/") in tags
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    # HTTP dates only have a resolution of one second
+    return int(modified) <= since
+
+
+def parse_range(
+    headers: Headers, size: int, etag: str, modified: float
+) -> tuple[int, int] | None:
+    """Get the requested byte range of a file
+
+    Only single ranges are supported. For other, invalid (e.g. last byte
+    before first byte) or outdated range requests the complete file should
+    be sent.
+
+    Args:
+
+        headers:
+            The headers of the request
+
+        size:
+            The size of the file in bytes
+
+        etag:
+            The entity tag of the current version of the file
+
+        modified:
+            The modification time of the file (seconds since the epoch)
+
+    Returns:
+
+        The first byte and the byte after the last byte of the range or
+        ``None``, if the complete file should be sent
+
+    Raises:
+
+        ValueError:
+            If the range is not satisfiable (starts after the end of the
+            file)
+
+    Examples:
+
+        >>> etag = create_etag("test")
+        >>> parse_range(Headers({"range": "bytes=0-9"}), 100, etag, 0)
+        (0, 10)
+        >>> parse_range(Headers({"range": "bytes=90-"}), 100, etag, 0)
+        (90, 100)
+        >>> parse_range(Headers({"range": "bytes=-5"}), 100, etag, 0)
+        (95, 100)
+        >>> parse_range(Headers({"range": "bytes=0-1,5-6"}), 100, etag, 0)
+        >>> parse_range(Headers({"range": "bytes=0-9", "if-range": '"a"'}),
+        ...             100, etag, 0)
+        >>> parse_range(Headers({"range": "bytes=5-3"}), 100, etag, 0)
+        >>> parse_range(Headers({"range": "bytes=100-"}), 100, etag, 0)
+        Traceback (most recent call last):
+           ...
+        ValueError: Range bytes=100- not satisfiable for 100 bytes
+
+    """
+
+    http_range = headers.get("range")
+    if http_range is None:
+        return None
+
+    if_range = headers.get("if-range")
+    if if_range is not None and if_range not in (
+        etag,
+        formatdate(modified, usegmt=True),
+    ):
+        return None
+
+    unit, _, ranges = http_range.partition("=")
+    first, separator, last = ranges.strip().partition("-")
+    if unit.strip().lower() != "bytes" or "," in ranges or not separator:
+        return None
+    try:
+        if first == "":
+            start, stop = max(size - int(last), 0), size
+        else:
+            start = int(first)
+            if last != "" and int(last) < start:
+                # Syntactically invalid ranges are ignored
+                return None
+            stop = size if last == "" else min(int(last) + 1, size)
+    except ValueError:
+        return None
+
+    if start >= stop:
+        raise ValueError(f"Range {http_range} not satisfiable for {size} bytes")
+
+    return start, stop
@@ -0,0 +1,76 @@
+"""Load the environment configuration of the API
+
+Many modules read their settings (environment variables) when they are
+imported. Importing this module loads the environment file, which is why
+``icoapi.api`` imports it before any other module of the API.
+"""
+
+import logging
+import os
+import sys
+
+from dotenv import load_dotenv
+from platformdirs import user_data_dir
+
+logger = logging.getLogger(__name__)
+
+
+def is_bundled():
+    """Check if in bundled state"""
+
+    return getattr(sys, "frozen", False)
+
+
+def get_application_dir() -> str:
+    """Get application directory"""
+
+    name = os.getenv("VITE_APPLICATION_FOLDER", "ICOdaq")
+    return user_data_dir(name, appauthor=False)
+
+
+def get_config_dir() -> str:
+    """Get configuration directory"""
+
+    config_dir = os.path.join(get_application_dir(), "config")
+    logger.info("Config directory: %s", config_dir)
+    return config_dir
+
+
+def load_env_file():
+    """Load environment configuration"""
+
+    # First try: local development
+    env_loaded = load_dotenv(
+        os.path.join(
+            os.path.abspath(os.path.join(os.getcwd())),
+            ".env",
+        ),
+        verbose=True,
+        override=True,
+    )
+    if not env_loaded:
+        # Second try: configs directory
+        logger.warning(
+            "Environment variables not found in local directory. Trying to"
+            " load from app data: %s",
+            get_config_dir(),
+        )
+        env_loaded = load_dotenv(
+            os.path.join(get_config_dir(), ".env"), verbose=True
+        )
+    if not env_loaded and is_bundled():
+        # Third try: we should be in the bundled state
+        bundle_dir = sys._MEIPASS  # pylint: disable=protected-access
+        logger.warning(
+            "Environment variables not found in local directory. Trying to"
+            " load from app data: %s",
+            bundle_dir,
+        )
+        env_loaded = load_dotenv(
+            os.path.join(bundle_dir, "config", ".env"), verbose=True
+        )
+    if not env_loaded:
+        logger.info("Environment variables not found - using builtins.")
+
+
+load_env_file()
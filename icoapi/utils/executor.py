@@ -0,0 +1,98 @@
+"""Run blocking HDF5 operations outside of the event loop
+
+Reading or writing (large) measurement files blocks for a considerable
+amount of time. Running this code directly in a route handler stalls the
+event loop and with it every other request and a running measurement.
+PyTables is not thread-safe, which is why all HDF5 operations share a
+dedicated executor with a single worker by default.
+"""
+
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, TypeVar
+
+HDF5_EXECUTOR_WORKERS = int(os.getenv("HDF5_EXECUTOR_WORKERS", "1"))
+
+T = TypeVar("T")
+
+hdf5_executor = ThreadPoolExecutor(
+    max_workers=HDF5_EXECUTOR_WORKERS, thread_name_prefix="hdf5"
+)
+
+
+async def run_in_hdf5_executor(
+    function: Callable[..., T], *arguments, **keyword_arguments
+) -> T:
+    """Run a blocking function in the HDF5 executor
+
+    Args:
+
+        function:
+            The function that should be executed
+
+        arguments:
+            Positional arguments of the function
+
+        keyword_arguments:
+            Keyword arguments of the function
+
+    Returns:
+
+        The return value of the function
+
+    Examples:
+
+        >>> asyncio.run(run_in_hdf5_executor(sum, [1, 2, 3]))
+        6
+
+    """
+
+    loop = asyncio.get_running_loop()
+    # Run the function in a copy of the current context, which makes sure
+    # log records still contain the measurement, session and route
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        hdf5_executor,
+        partial(context.run, function, *arguments, **keyword_arguments),
+    )
+
+
+def call_in_hdf5_executor(
+    function: Callable[..., T], *arguments, **keyword_arguments
+) -> T:
+    """Run a blocking function in the HDF5 executor and wait for the result
+
+    Long running code outside of the event loop (e.g. a conversion in a
+    worker thread) uses this function to split its HDF5 access into short
+    tasks, which means other HDF5 operations can run in between. The
+    function must not be called from the HDF5 executor itself.
+
+    Args:
+
+        function:
+            The function that should be executed
+
+        arguments:
+            Positional arguments of the function
+
+        keyword_arguments:
+            Keyword arguments of the function
+
+    Returns:
+
+        The return value of the function
+
+    Examples:
+
+        >>> call_in_hdf5_executor(sum, [1, 2, 3])
+        6
+
+    """
+
+    context = contextvars.copy_context()
+    return hdf5_executor.submit(
+        context.run, function, *arguments, **keyword_arguments
+    ).result()
@@ -0,0 +1,449 @@
+"""Index of the log files
+
+Listing the log files shows the time span of every file. Instead of reading
+complete files, the index only reads blocks at the start and (seeking
+backwards) at the end of a file until it finds a timestamp. Log searches
+with a time range use a sparse index of timestamps and file offsets to skip
+the parts of a file outside the range.
+
+The results are cached for every version of a file. The cache identifies a
+file version by its device, inode, size and modification time. Since
+rotating the current log file only renames it, the result is only read again
+after the segment was compressed. The time span of a compressed segment is
+read from the file stored at rotation. Only compressed segments of older
+versions of the API are decompressed once, afterwards their time span is
+stored as well.
+"""
+
+import os
+import re
+import threading
+from collections.abc import Iterator
+from datetime import datetime
+from typing import BinaryIO, Optional
+
+from icoapi.models.models import LogFileMeta
+from icoapi.utils.log_rotation import (
+    Timestamps,
+    get_content_size,
+    get_log_files,
+    is_compressed,
+    open_log_file,
+    read_segment_timestamps,
+    write_segment_timestamps,
+)
+
+LOG_INDEX_BLOCK_SIZE = 64 * 1024
+"""Number of bytes read at once from the start or end of a log file"""
+
+LOG_INDEX_OFFSET_INTERVAL = 64 * 1024
+"""Minimum distance in bytes between the offsets in the timestamp index"""
+
+FileVersion = tuple[int, int, int, int]
+
+
+def get_file_version(stat: os.stat_result) -> FileVersion:
+    """Get the values that identify the version of a log file"""
+
+    return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def read_lines(
+    log_file: BinaryIO,
+    start: int,
+    end: int,
+    block_size: int = LOG_INDEX_BLOCK_SIZE,
+) -> Iterator[tuple[int, bytes]]:
+    """Read the lines of a log file in blocks
+
+    Args:
+
+        log_file:
+            The log file opened in binary mode
+
+        start:
+            The offset of the first line
+
+        end:
+            The offset after the last read byte
+
+        block_size:
+            The number of bytes read at once
+
+    Returns:
+
+        An iterator over the offset and content of every line
+
+    Examples:
+
+        >>> from io import BytesIO
+        >>> list(read_lines(BytesIO(b"First\\nSecond\\nThird"), 6, 19, 4))
+        [(6, b'Second'), (13, b'Third')]
+
+    """
+
+    log_file.seek(start)
+    offset = position = start
+    remainder = b""
+    while position < end:
+        block = log_file.read(min(block_size, end - position))
+        if not block:
+            break
+        position += len(block)
+        lines = (remainder + block).split(b"\n")
+        # The last line might continue in the next block
+        remainder = lines.pop()
+        for line in lines:
+            yield offset, line
+            offset += len(line) + 1
+
+    if remainder:
+        yield offset, remainder
+
+
+def read_lines_reversed(
+    log_file: BinaryIO, end: int, block_size: int = LOG_INDEX_BLOCK_SIZE
+) -> Iterator[tuple[int, bytes]]:
+    """Read the lines of a log file in blocks starting at the end
+
+    Args:
+
+        log_file:
+            The log file opened in binary mode
+
+        end:
+            The offset after the last read byte
+
+        block_size:
+            The number of bytes read at once
+
+    Returns:
+
+        An iterator over the offset and content of every line (last line
+        first)
+
+    Examples:
+
+        >>> from io import BytesIO
+        >>> list(read_lines_reversed(BytesIO(b"First\\nSecond\\nThird\\n"),
+        ...                          13, 4))
+        [(6, b'Second'), (0, b'First')]
+
+    """
+
+    remainder = b""
+    while end > 0:
+        start = max(end - block_size, 0)
+        log_file.seek(start)
+        lines = (log_file.read(end - start) + remainder).split(b"\n")
+        offset = start
+        if start > 0:
+            # The first line might start in the previous block
+            remainder = lines.pop(0)
+            offset += len(remainder) + 1
+        offsets = []
+        for line in lines:
+            offsets.append(offset)
+            offset += len(line) + 1
+        for offset, line in zip(reversed(offsets), reversed(lines)):
+            if line:
+                yield offset, line
+        end = start
+
+
+def parse_timestamps(lines: list[str]) -> tuple[Optional[str], Optional[str]]:
+    """Parse logger timestamps"""
+
+    ts_pattern = re.compile(
+        r"(?P<ts>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3})"
+    )
+    timestamps = []
+    for line in lines:
+        match = ts_pattern.search(line)  # ← use .search instead of .match
+        if match:
+            try:
+                ts = datetime.strptime(
+                    match.group("ts"), "%Y-%m-%d %H:%M:%S,%f"
+                )
+                timestamps.append(ts.isoformat())
+            except ValueError:
+                continue
+    if not timestamps:
+        return None, None
+    return timestamps[0], timestamps[-1]
+
+
+def parse_timestamp(line: bytes) -> Optional[str]:
+    """Get the timestamp of a log line in ISO format"""
+
+    first, _ = parse_timestamps([line.decode("utf-8", errors="replace")])
+    return first
+
+
+def find_first_timestamp(
+    log_file: BinaryIO, size: int, block_size: int = LOG_INDEX_BLOCK_SIZE
+) -> Optional[str]:
+    """Find the first timestamp of a log file reading blocks from the start
+
+    Args:
+
+        log_file:
+            The log file opened in binary mode
+
+        size:
+            The size of the log file in bytes
+
+        block_size:
+            The number of bytes read at once
+
+    Returns:
+
+        The first timestamp in ISO format or ``None``, if the file does not
+        contain a timestamp
+
+    Examples:
+
+        >>> from io import BytesIO
+        >>> content = (b"Traceback\\n2024-01-02 03:04:05,678 INFO First\\n"
+        ...            b"2024-01-02 03:04:06,000 INFO Second\\n")
+        >>> find_first_timestamp(BytesIO(content), len(content), 8)
+        '2024-01-02T03:04:05.678000'
+        >>> find_first_timestamp(BytesIO(b"No timestamp"), 12) is None
+        True
+
+    """
+
+    for _, line in read_lines(log_file, 0, size, block_size):
+        timestamp = parse_timestamp(line)
+        if timestamp is not None:
+            return timestamp
+
+    return None
+
+
+def find_last_timestamp(
+    log_file: BinaryIO, size: int, block_size: int = LOG_INDEX_BLOCK_SIZE
+) -> Optional[str]:
+    """Find the last timestamp of a log file reading blocks from the end
+
+    Args:
+
+        log_file:
+            The log file opened in binary mode
+
+        size:
+            The size of the log file in bytes
+
+        block_size:
+            The number of bytes read at once
+
+    Returns:
+
+        The last timestamp in ISO format or ``None``, if the file does not
+        contain a timestamp
+
+    Examples:
+
+        >>> from io import BytesIO
+        >>> content = (b"2024-01-02 03:04:05,678 INFO First\\n"
+        ...            b"2024-01-02 03:04:06,000 ERROR Second\\nTraceback\\n")
+        >>> find_last_timestamp(BytesIO(content), len(content), 8)
+        '2024-01-02T03:04:06'
+
+    """
+
+    for _, line in read_lines_reversed(log_file, size, block_size):
+        timestamp = parse_timestamp(line)
+        if timestamp is not None:
+            return timestamp
+
+    return None
+
+
+class LogIndex:
+    """Cache the timestamps of log files
+
+    Args:
+
+        block_size:
+            The number of bytes read at once from a log file
+
+        offset_interval:
+            The minimum distance in bytes between the offsets in the
+            timestamp index of a log file
+
+    """
+
+    def __init__(
+        self,
+        block_size: int = LOG_INDEX_BLOCK_SIZE,
+        offset_interval: int = LOG_INDEX_OFFSET_INTERVAL,
+    ) -> None:
+        self.block_size = block_size
+        self.offset_interval = offset_interval
+        self.lock = threading.Lock()
+        self.timestamps: dict[FileVersion, Timestamps] = {}
+        self.offsets: dict[FileVersion, list[tuple[str, int]]] = {}
+
+    def find_timestamps(self, path: str) -> Timestamps:
+        """Find the first and last timestamp of an uncompressed log file"""
+
+        with open(path, "rb") as log_file:
+            size = os.fstat(log_file.fileno()).st_size
+            return (
+                find_first_timestamp(log_file, size, self.block_size),
+                find_last_timestamp(log_file, size, self.block_size),
+            )
+
+    def read_timestamps(self, path: str, size: int) -> Timestamps:
+        """Read the first and last timestamp of a log file"""
+
+        if is_compressed(path):
+            stored = read_segment_timestamps(path)
+            if stored is not None:
+                return stored
+
+        with open_log_file(path, seekable=True) as log_file:
+            timestamps = (
+                find_first_timestamp(log_file, size, self.block_size),
+                find_last_timestamp(log_file, size, self.block_size),
+            )
+        if is_compressed(path):
+            # Segment of an older version of the API
+            try:
+                write_segment_timestamps(path, timestamps)
+            except OSError:
+                pass
+
+        return timestamps
+
+    def get_timestamps(self, path: str, stat: os.stat_result) -> Timestamps:
+        """Get the first and last timestamp of a log file
+
+        Args:
+
+            path:
+                The path of the log file
+
+            stat:
+                The status of the log file
+
+        Returns:
+
+            The first and last timestamp in ISO format (``None``, if the
+            file does not contain a timestamp)
+
+        """
+
+        version = get_file_version(stat)
+        with self.lock:
+            timestamps = self.timestamps.get(version)
+        if timestamps is None:
+            try:
+                timestamps = self.read_timestamps(
+                    path, get_content_size(path, stat)
+                )
+            except (OSError, EOFError):
+                timestamps = (None, None)
+            with self.lock:
+                self.timestamps[version] = timestamps
+
+        return timestamps
+
+    def get_offsets(
+        self, path: str, stat: os.stat_result
+    ) -> list[tuple[str, int]]:
+        """Get a sparse index of the timestamps of a log file
+
+        Args:
+
+            path:
+                The path of the log file
+
+            stat:
+                The status of the log file
+
+        Returns:
+
+            Timestamps (in ISO format) and offsets of lines that start a log
+            record, at most one for every ``offset_interval`` bytes
+
+        """
+
+        version = get_file_version(stat)
+        with self.lock:
+            offsets = self.offsets.get(version)
+        if offsets is not None:
+            return offsets
+
+        offsets = []
+        next_offset = 0
+        with open_log_file(path) as log_file:
+            for offset, line in read_lines(
+                log_file, 0, get_content_size(path, stat), self.block_size
+            ):
+                if offset < next_offset:
+                    continue
+                timestamp = parse_timestamp(line)
+                if timestamp is not None:
+                    offsets.append((timestamp, offset))
+                    next_offset = offset + self.offset_interval
+        with self.lock:
+            self.offsets[version] = offsets
+
+        return offsets
+
+    def list_files(self, directory: str, prefix: str) -> list[LogFileMeta]:
+        """List the log files in a directory
+
+        Args:
+
+            directory:
+                The directory that contains the log files
+
+            prefix:
+                The name of the current log file
+
+        Returns:
+
+            The size (on disk), first and last timestamp of every log file
+            (latest first)
+
+        """
+
+        files: list[LogFileMeta] = []
+        versions: set[FileVersion] = set()
+        for name, path, stat in get_log_files(directory, prefix):
+            versions.add(get_file_version(stat))
+            first_timestamp, last_timestamp = self.get_timestamps(path, stat)
+            files.append(
+                LogFileMeta(
+                    name=name,
+                    size=stat.st_size,
+                    first_timestamp=first_timestamp,
+                    last_timestamp=last_timestamp,
+                )
+            )
+
+        self.prune(versions)
+
+        return files
+
+    def prune(self, versions: set[FileVersion]) -> None:
+        """Forget versions of files that were changed or deleted
+
+        Args:
+
+            versions:
+                The current versions of all log files
+
+        """
+
+        with self.lock:
+            for cache in (self.timestamps, self.offsets):
+                for version in set(cache) - versions:
+                    del cache[version]
+
+
+log_index = LogIndex()
+"""Timestamps of the log files of the API"""
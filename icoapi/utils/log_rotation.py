@@ -0,0 +1,489 @@
+"""Rotate, compress and clean up log files
+
+When the current log file reaches its maximum size, the rotation handler
+renames it into a segment named after the time of the rotation (e.g.
+``icodaq.log.20240102-030405-123456``). A background thread compresses the
+segment with gzip (``….gz``) and then removes the oldest segments, until the
+remaining segments satisfy the retention limits (number, total size and
+age). This way neither writing logs nor the event loop waits for the
+compression. Before compressing a segment, the thread stores its first and
+last timestamp in a small file next to it (``….timestamps``), which means
+listing the log files does not have to decompress the segment.
+
+The functions in this module read compressed and uncompressed segments
+transparently. Log files of older versions of the API (``icodaq.log.1``,
+``icodaq.log.2``, …) are still supported.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import queue
+import re
+import shutil
+import sys
+import threading
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from time import time
+from typing import BinaryIO, Callable, Optional
+
+COMPRESSED_SUFFIX = ".gz"
+"""Suffix of compressed log segments"""
+
+SEGMENT_PATTERN = re.compile(
+    r"\.(?:(?P<time>\d{8}-\d{6}-\d{6})(?P<compressed>\.gz)?|(?P<number>\d+))"
+)
+"""Suffix of rotated log segments (after the name of the current log file)"""
+
+SEGMENT_ID_SIZE = 256
+"""Number of bytes at the start of a log file that identify the file"""
+
+LOG_CHUNK_SIZE = 1024 * 1024
+"""Number of bytes compressed at once"""
+
+TIMESTAMPS_SUFFIX = ".timestamps"
+"""Suffix of the files that store the time span of log segments"""
+
+LogFile = tuple[str, str, os.stat_result]
+Timestamps = tuple[Optional[str], Optional[str]]
+
+
+def get_segment_order(name: str, prefix: str) -> Optional[tuple[int, int]]:
+    """Get a key that sorts log files from the latest to the oldest
+
+    Args:
+
+        name:
+            The name of a file in the log directory
+
+        prefix:
+            The name of the current log file
+
+    Returns:
+
+        The sort key or ``None``, if the file is not a log file
+
+    Examples:
+
+        >>> names = ["icodaq.log.2", "icodaq.log.20240102-030405-000000.gz",
+        ...          "icodaq.log", "icodaq.log.20240103-030405-000000",
+        ...          "icodaq.log.1", "icodaq.log.lock", "other.log"]
+        >>> sorted((name for name in names
+        ...         if get_segment_order(name, "icodaq.log") is not None),
+        ...        key=lambda name: get_segment_order(name, "icodaq.log"))
+        ... # doctest: +NORMALIZE_WHITESPACE
+        ['icodaq.log', 'icodaq.log.20240103-030405-000000',
+         'icodaq.log.20240102-030405-000000.gz', 'icodaq.log.1',
+         'icodaq.log.2']
+
+    """
+
+    if name == prefix:
+        return (0, 0)
+    if not name.startswith(prefix):
+        return None
+    match = SEGMENT_PATTERN.fullmatch(name, len(prefix))
+    if match is None:
+        return None
+    if match["time"] is not None:
+        return (1, -int(match["time"].replace("-", "")))
+    # Numbered log files of older versions
+    return (2, int(match["number"]))
+
+
+def get_log_files(directory: str, prefix: str) -> list[LogFile]:
+    """Get the name, path and status of the log files (latest first)
+
+    Args:
+
+        directory:
+            The directory that contains the log files
+
+        prefix:
+            The name of the current log file
+
+    Returns:
+
+        The name, path and status of the current log file and every log
+        segment
+
+    """
+
+    files = []
+    for name in os.listdir(directory):
+        order = get_segment_order(name, prefix)
+        if order is None:
+            continue
+        path = os.path.join(directory, name)
+        try:
+            files.append((order, name, path, os.stat(path)))
+        except FileNotFoundError:
+            continue
+
+    return [(name, path, stat) for _, name, path, stat in sorted(files)]
+
+
+def is_compressed(path: str) -> bool:
+    """Check if a log file is compressed"""
+
+    return path.endswith(COMPRESSED_SUFFIX)
+
+
+def get_archive_name(name: str) -> str:
+    """Get the name of the uncompressed content of a log file
+
+    Examples:
+
+        >>> get_archive_name("icodaq.log.20240102-030405-000000.gz")
+        'icodaq.log.20240102-030405-000000'
+        >>> get_archive_name("icodaq.log")
+        'icodaq.log'
+
+    """
+
+    return name.removesuffix(COMPRESSED_SUFFIX)
+
+
+def get_timestamps_path(path: str) -> str:
+    """Get the path of the file that stores the time span of a log segment
+
+    Examples:
+
+        >>> get_timestamps_path("logs/icodaq.log.20240102-030405-000000.gz")
+        'logs/icodaq.log.20240102-030405-000000.timestamps'
+
+    """
+
+    return f"{get_archive_name(path)}{TIMESTAMPS_SUFFIX}"
+
+
+def read_segment_timestamps(path: str) -> Optional[Timestamps]:
+    """Read the stored first and last timestamp of a log segment
+
+    Args:
+
+        path:
+            The path of the (compressed or uncompressed) log segment
+
+    Returns:
+
+        The first and last timestamp or ``None``, if the timestamps of the
+        segment were not stored
+
+    """
+
+    try:
+        with open(get_timestamps_path(path), "rb") as timestamps_file:
+            timestamps = json.load(timestamps_file)
+        return timestamps["first"], timestamps["last"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def write_segment_timestamps(path: str, timestamps: Timestamps) -> None:
+    """Store the first and last timestamp of a log segment
+
+    Args:
+
+        path:
+            The path of the (compressed or uncompressed) log segment
+
+        timestamps:
+            The first and last timestamp of the segment
+
+    """
+
+    first, last = timestamps
+    timestamps_path = get_timestamps_path(path)
+    temporary_path = f"{timestamps_path}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as timestamps_file:
+        json.dump({"first": first, "last": last}, timestamps_file)
+    os.replace(temporary_path, timestamps_path)
+
+
+def open_log_file(path: str, seekable: bool = False) -> BinaryIO:
+    """Open the (uncompressed) content of a log file for reading
+
+    Args:
+
+        path:
+            The path of the log file
+
+        seekable:
+            Specifies if the content should support seeking backwards
+            efficiently (compressed segments are decompressed into memory)
+
+    Returns:
+
+        The content of the log file
+
+    Raises:
+
+        FileNotFoundError:
+            If neither the log file nor its compressed version exist
+
+    """
+
+    if not is_compressed(path):
+        try:
+            return open(path, "rb")  # pylint: disable=consider-using-with
+        except FileNotFoundError:
+            # The segment might have been compressed in the meantime
+            path = f"{path}{COMPRESSED_SUFFIX}"
+    if seekable:
+        with gzip.open(path, "rb") as log_file:
+            return io.BytesIO(log_file.read())
+    return gzip.open(path, "rb")  # type: ignore[return-value]
+
+
+def get_content_size(path: str, stat: os.stat_result) -> int:
+    """Get the size of the uncompressed content of a log file
+
+    Args:
+
+        path:
+            The path of the log file
+
+        stat:
+            The status of the log file
+
+    Returns:
+
+        The size of the content in bytes
+
+    """
+
+    if not is_compressed(path):
+        return stat.st_size
+    with open(path, "rb") as log_file:
+        # The last four bytes of a gzip file contain the uncompressed size
+        log_file.seek(-4, os.SEEK_END)
+        return int.from_bytes(log_file.read(4), "little")
+
+
+def get_segment_id(path: str) -> str:
+    """Get an id of a log file that does not change on rotation
+
+    The id is based on the first bytes of the content, which means it
+    stays the same if the file is renamed or compressed.
+    """
+
+    with open_log_file(path) as log_file:
+        start = log_file.read(SEGMENT_ID_SIZE)
+    return hashlib.sha256(start).hexdigest()[:16]
+
+
+def compress_segment(path: str) -> str:
+    """Compress a log segment and remove the uncompressed segment
+
+    Args:
+
+        path:
+            The path of the uncompressed segment
+
+    Returns:
+
+        The path of the compressed segment
+
+    """
+
+    compressed_path = f"{path}{COMPRESSED_SUFFIX}"
+    temporary_path = f"{compressed_path}.tmp"
+    with open(path, "rb") as source:
+        with gzip.open(temporary_path, "wb", compresslevel=6) as target:
+            shutil.copyfileobj(source, target, LOG_CHUNK_SIZE)
+    # Keep the time of the rotation for the retention by age
+    stat = os.stat(path)
+    os.utime(temporary_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.replace(temporary_path, compressed_path)
+    os.remove(path)
+    return compressed_path
+
+
+def apply_retention(
+    directory: str,
+    prefix: str,
+    max_count: int,
+    max_bytes: int,
+    max_age: float,
+) -> list[str]:
+    """Remove the oldest log segments that exceed the retention limits
+
+    Args:
+
+        directory:
+            The directory that contains the log files
+
+        prefix:
+            The name of the current log file
+
+        max_count:
+            The maximum number of log segments (``0`` for no limit)
+
+        max_bytes:
+            The maximum size of all log files, including the current log
+            file, in bytes (``0`` for no limit)
+
+        max_age:
+            The maximum age of log segments in seconds (``0`` for no limit)
+
+    Returns:
+
+        The names of the removed segments
+
+    """
+
+    removed = []
+    total = 0
+    count = 0
+    now = time()
+    for name, path, stat in get_log_files(directory, prefix):
+        total += stat.st_size
+        if name == prefix:
+            continue
+        count += 1
+        exceeds_limits = (
+            0 < max_count < count,
+            0 < max_bytes < total,
+            0 < max_age < now - stat.st_mtime,
+        )
+        if any(exceeds_limits):
+            try:
+                os.remove(path)
+                removed.append(name)
+            except FileNotFoundError:
+                pass
+            try:
+                os.remove(get_timestamps_path(path))
+            except FileNotFoundError:
+                pass
+
+    return removed
+
+
+# pylint: disable=too-many-instance-attributes
+
+
+class CompressingRotatingFileHandler(RotatingFileHandler):
+    """Rotating file handler that compresses and cleans up rotated logs
+
+    Args:
+
+        filename:
+            The path of the current log file
+
+        max_bytes:
+            The size of the current log file that triggers a rotation
+
+        max_count:
+            The maximum number of rotated segments (``0`` for no limit)
+
+        retention_bytes:
+            The maximum size of all log files in bytes (``0`` for no limit)
+
+        retention_age:
+            The maximum age of rotated segments in seconds (``0`` for no
+            limit)
+
+        compress:
+            Compress rotated segments
+
+        find_timestamps:
+            Function that gets the first and last timestamp of a rotated
+            segment, which are stored before the segment is compressed
+
+        encoding:
+            The encoding of the log file
+
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        filename: str,
+        *,
+        max_bytes: int,
+        max_count: int = 0,
+        retention_bytes: int = 0,
+        retention_age: float = 0,
+        compress: bool = True,
+        find_timestamps: Optional[Callable[[str], Timestamps]] = None,
+        encoding: str = "utf-8",
+    ) -> None:
+        super().__init__(filename, maxBytes=max_bytes, encoding=encoding)
+        self.max_count = max_count
+        self.retention_bytes = retention_bytes
+        self.retention_age = retention_age
+        self.compress = compress
+        self.find_timestamps = find_timestamps
+        self.segments: queue.SimpleQueue[Optional[str]] = queue.SimpleQueue()
+        self.worker = threading.Thread(
+            target=self.process_segments, name="log_rotation", daemon=True
+        )
+        self.worker.start()
+
+        # Segments of a previous run that were not compressed yet
+        directory = os.path.dirname(self.baseFilename)
+        prefix = os.path.basename(self.baseFilename)
+        for name, path, _ in get_log_files(directory, prefix):
+            match = SEGMENT_PATTERN.fullmatch(name, len(prefix))
+            if match and match["time"] and not match["compressed"]:
+                self.segments.put(path)
+        self.segments.put("")
+
+    def doRollover(self) -> None:  # pylint: disable=invalid-name
+        if self.stream:
+            self.stream.close()
+            self.stream = None  # type: ignore[assignment]
+
+        if os.path.exists(self.baseFilename):
+            segment = (
+                f"{self.baseFilename}.{datetime.now():%Y%m%d-%H%M%S-%f}"
+            )
+            os.rename(self.baseFilename, segment)
+            self.segments.put(segment)
+
+        if not self.delay:
+            self.stream = self._open()
+
+    def process_segments(self) -> None:
+        """Index and compress rotated segments and apply the retention limits
+
+        An empty path only applies the retention limits, ``None`` stops
+        processing.
+        """
+
+        directory = os.path.dirname(self.baseFilename)
+        prefix = os.path.basename(self.baseFilename)
+        while (path := self.segments.get()) is not None:
+            try:
+                if path and self.find_timestamps is not None:
+                    write_segment_timestamps(path, self.find_timestamps(path))
+                if path and self.compress:
+                    compress_segment(path)
+                apply_retention(
+                    directory,
+                    prefix,
+                    self.max_count,
+                    self.retention_bytes,
+                    self.retention_age,
+                )
+            except OSError as error:
+                # Logging the error could trigger another rotation
+                print(
+                    f"Unable to process log segment {path}: {error}",
+                    file=sys.stderr,
+                )
+
+    def close(self) -> None:
+        """Close the log file and wait for the background thread"""
+
+        if self.worker.is_alive():
+            self.segments.put(None)
+            self.worker.join(timeout=10)
+        super().close()
+
+
+# pylint: enable=too-many-instance-attributes
@@ -0,0 +1,535 @@
+"""Search the log files
+
+A search reads the log records of the current and the rotated log files
+either latest first (reading blocks backwards from the end of the files) or
+oldest first and returns one page of matching records at a time. Lines
+without a timestamp (e.g. tracebacks) belong to the preceding log record.
+
+The time range of a search skips log files outside the range using the log
+index. In rotated log files, the sparse timestamp index of the log index
+also skips the parts of the file outside the range.
+
+The cursor of the next page stores an id of the log file, based on its first
+bytes, and the offset of the next record. Since rotating and compressing the
+log files does not change their content, cursors stay valid after a
+rotation.
+"""
+
+import base64
+import binascii
+import logging
+import os
+import re
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime
+from typing import BinaryIO, Optional
+
+import orjson
+
+from icoapi.models.models import LogEntry, LogSearchResponse
+from icoapi.utils.log_index import (
+    LOG_INDEX_BLOCK_SIZE,
+    LogIndex,
+    get_file_version,
+    log_index,
+    parse_timestamps,
+    read_lines,
+    read_lines_reversed,
+)
+from icoapi.utils.log_rotation import (
+    LogFile,
+    get_content_size,
+    get_log_files,
+    get_segment_id,
+    open_log_file,
+)
+
+LOG_LINE_PATTERN = re.compile(
+    r"(?P<timestamp>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) "
+    r"\[(?P<level>\w+)\] \[(?P<logger>[^\]]*)\] ?(?P<message>.*)",
+    re.DOTALL,
+)
+"""Format of the first line of a (text) log record"""
+
+
+def to_datetime(timestamp: Optional[str]) -> Optional[datetime]:
+    """Convert a timestamp in ISO format into a datetime object"""
+
+    if timestamp is None:
+        return None
+    try:
+        return datetime.fromisoformat(timestamp)
+    except ValueError:
+        return None
+
+
+def parse_log_line(line: str, file: str, offset: int) -> Optional[LogEntry]:
+    """Parse the first line of a log record
+
+    Args:
+
+        line:
+            A line of a log file (text or JSON format)
+
+        file:
+            The name of the log file
+
+        offset:
+            The offset of the line in the log file
+
+    Returns:
+
+        The log record or ``None``, if the line continues the previous
+        log record
+
+    Examples:
+
+        >>> parse_log_line(
+        ...     "2024-01-02 03:04:05,678 [ERROR] [icoapi.can] No answer",
+        ...     "icodaq.log", 10)  # doctest: +NORMALIZE_WHITESPACE
+        LogEntry(file='icodaq.log', offset=10,
+                 timestamp='2024-01-02T03:04:05.678000', level='ERROR',
+                 logger='icoapi.can', message='No answer', measurement=None,
+                 session=None)
+        >>> entry = parse_log_line(
+        ...     '{"timestamp": "2024-01-02 03:04:05,678", "level": "INFO", '
+        ...     '"logger": "icoapi", "message": "Started", '
+        ...     '"measurement": "Test"}', "icodaq.log", 0)
+        >>> entry.message, entry.measurement
+        ('Started', 'Test')
+        >>> parse_log_line("Traceback (most recent call last):",
+        ...                "icodaq.log", 0) is None
+        True
+
+    """
+
+    if line.startswith("{"):
+        try:
+            record = orjson.loads(line)  # pylint: disable=no-member
+        except orjson.JSONDecodeError:  # pylint: disable=no-member
+            return None
+        if not isinstance(record, dict) or "timestamp" not in record:
+            return None
+        timestamp = str(record["timestamp"])
+        return LogEntry(
+            file=file,
+            offset=offset,
+            timestamp=parse_timestamps([timestamp])[0] or timestamp,
+            level=record.get("level"),
+            logger=record.get("logger"),
+            message=str(record.get("message", "")),
+            measurement=record.get("measurement"),
+            session=record.get("session"),
+        )
+
+    match = LOG_LINE_PATTERN.match(line)
+    if match is None:
+        return None
+    return LogEntry(
+        file=file,
+        offset=offset,
+        timestamp=parse_timestamps([match["timestamp"]])[0],
+        level=match["level"],
+        logger=match["logger"],
+        message=match["message"],
+    )
+
+
+def read_records(
+    log_file: BinaryIO,
+    file: str,
+    start: int,
+    end: int,
+    block_size: int = LOG_INDEX_BLOCK_SIZE,
+) -> Iterator[tuple[LogEntry, int]]:
+    """Read the log records of a log file (oldest first)
+
+    Returns:
+
+        An iterator over the log records and the offset after them
+
+    """
+
+    entry: Optional[LogEntry] = None
+    for offset, line in read_lines(log_file, start, end, block_size):
+        text = line.decode("utf-8", errors="replace")
+        parsed = parse_log_line(text, file, offset)
+        if parsed is None:
+            if entry is not None:
+                entry.message += f"\n{text}"
+            continue
+        if entry is not None:
+            yield entry, offset
+        entry = parsed
+
+    if entry is not None:
+        yield entry, end
+
+
+def read_records_reversed(
+    log_file: BinaryIO,
+    file: str,
+    end: int,
+    block_size: int = LOG_INDEX_BLOCK_SIZE,
+) -> Iterator[tuple[LogEntry, int]]:
+    """Read the log records of a log file (latest first)
+
+    Returns:
+
+        An iterator over the log records and their offset
+
+    """
+
+    continuation: list[str] = []
+    for offset, line in read_lines_reversed(log_file, end, block_size):
+        text = line.decode("utf-8", errors="replace")
+        entry = parse_log_line(text, file, offset)
+        if entry is None:
+            continuation.append(text)
+            continue
+        if continuation:
+            entry.message = "\n".join([entry.message, *reversed(continuation)])
+            continuation = []
+        yield entry, offset
+
+
+def encode_cursor(segment: str, offset: int) -> str:
+    """Encode the position of the next log record as cursor
+
+    Examples:
+
+        >>> decode_cursor(encode_cursor("0123456789abcdef", 5678))
+        ('0123456789abcdef', 5678)
+
+    """
+
+    return base64.urlsafe_b64encode(f"{segment}:{offset}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    """Decode the segment id and offset stored in a cursor
+
+    Raises:
+
+        ValueError:
+            If the cursor is invalid
+
+    Examples:
+
+        >>> decode_cursor("invalid")
+        Traceback (most recent call last):
+           ...
+        ValueError: Invalid cursor: invalid
+
+    """
+
+    try:
+        segment, offset = base64.urlsafe_b64decode(cursor).decode().split(":")
+        return segment, int(offset)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as error:
+        raise ValueError(f"Invalid cursor: {cursor}") from error
+
+
+@dataclass
+class LogQuery:
+    """Filter for log records
+
+    Args:
+
+        level:
+            The minimum level of the log records
+
+        loggers:
+            Only include log records of these loggers (and their children)
+
+        since:
+            Only include log records at or after this (local) time
+
+        until:
+            Only include log records at or before this (local) time
+
+        pattern:
+            Only include log records whose message matches this pattern
+
+        measurement:
+            Only include log records of this measurement (structured JSON
+            log files only)
+
+    """
+
+    level: int = logging.NOTSET
+    loggers: Optional[list[str]] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    pattern: Optional[re.Pattern[str]] = None
+    measurement: Optional[str] = None
+
+    def is_before(self, time: Optional[datetime]) -> bool:
+        """Check if a time is before the time range of the filter"""
+
+        return time is not None and self.since is not None and time < self.since
+
+    def is_after(self, time: Optional[datetime]) -> bool:
+        """Check if a time is after the time range of the filter"""
+
+        return time is not None and self.until is not None and time > self.until
+
+    def matches(self, entry: LogEntry) -> bool:
+        """Check if a log record matches the filter
+
+        Examples:
+
+            >>> entry = LogEntry("icodaq.log", 0, "2024-01-02T03:04:05",
+            ...                  "ERROR", "icoapi.can", "No answer")
+            >>> LogQuery(logging.WARNING, ["icoapi"],
+            ...          pattern=re.compile("answer")).matches(entry)
+            True
+            >>> LogQuery(until=datetime(2024, 1, 1)).matches(entry)
+            False
+
+        """
+
+        level = logging.getLevelNamesMapping().get(entry.level or "", 0)
+        if level < self.level or (
+            self.measurement is not None
+            and entry.measurement != self.measurement
+        ):
+            return False
+        logger = entry.logger or ""
+        if self.loggers and not any(
+            logger == name or logger.startswith(f"{name}.")
+            for name in self.loggers
+        ):
+            return False
+        time = to_datetime(entry.timestamp)
+        if self.is_before(time) or self.is_after(time):
+            return False
+        return self.pattern is None or bool(self.pattern.search(entry.message))
+
+
+def get_range(
+    query: LogQuery,
+    offsets: list[tuple[str, int]],
+    start: int,
+    end: int,
+) -> tuple[int, int]:
+    """Restrict the read part of a log file to the time range of a query
+
+    Examples:
+
+        >>> offsets = [("2024-01-01T00:00:00", 0),
+        ...            ("2024-01-02T00:00:00", 100),
+        ...            ("2024-01-03T00:00:00", 200)]
+        >>> get_range(LogQuery(since=datetime(2024, 1, 2, 12),
+        ...                    until=datetime(2024, 1, 2, 18)),
+        ...           offsets, 0, 300)
+        (100, 200)
+
+    """
+
+    for timestamp, offset in offsets:
+        time = to_datetime(timestamp)
+        if time is None:
+            continue
+        if query.since is not None and time < query.since:
+            start = max(start, offset)
+        if query.until is not None and time > query.until:
+            end = min(end, offset)
+            break
+
+    return start, end
+
+
+def find_record_range(
+    path: str,
+    stat: os.stat_result,
+    query: LogQuery,
+    *,
+    rotated: bool,
+    index: LogIndex = log_index,
+) -> Optional[tuple[int, int]]:
+    """Get the part of a log file inside the time range of a query
+
+    Args:
+
+        path:
+            The path of the log file
+
+        stat:
+            The status of the log file
+
+        query:
+            The filter that contains the time range
+
+        rotated:
+            Specifies if the log file is a rotated (unchanging) log file
+
+        index:
+            The index of the log files
+
+    Returns:
+
+        The offset of the first record inside the time range and the offset
+        after the last record inside the time range or ``None``, if the log
+        file does not contain records inside the time range
+
+    """
+
+    start, end = 0, get_content_size(path, stat)
+    if query.since is None and query.until is None:
+        return start, end
+
+    first, last = (
+        to_datetime(timestamp) for timestamp in index.get_timestamps(path, stat)
+    )
+    if query.is_before(last) or query.is_after(first):
+        return None
+    if rotated:
+        start, end = get_range(query, index.get_offsets(path, stat), start, end)
+
+    first_offset: Optional[int] = None
+    with open_log_file(path) as log_file:
+        for entry, _ in read_records(
+            log_file, os.path.basename(path), start, end, index.block_size
+        ):
+            time = to_datetime(entry.timestamp)
+            if query.is_after(time):
+                end = entry.offset
+                break
+            if first_offset is None and not query.is_before(time):
+                first_offset = entry.offset
+
+    if first_offset is None or first_offset >= end:
+        return None
+    return first_offset, end
+
+
+def resume_search(
+    files: list[LogFile], cursor: str
+) -> tuple[list[LogFile], int]:
+    """Get the log files and the offset where a search continues
+
+    Raises:
+
+        ValueError:
+            If the cursor is invalid
+
+    """
+
+    segment, offset = decode_cursor(cursor)
+    for position, (_, path, _) in enumerate(files):
+        try:
+            if get_segment_id(path) == segment:
+                return files[position:], offset
+        except (OSError, EOFError):
+            continue
+    raise ValueError(f"Log file of cursor {cursor} does not exist")
+
+
+def search_logs(  # pylint: disable=too-many-arguments, too-many-locals
+    directory: str,
+    prefix: str,
+    query: LogQuery,
+    *,
+    latest_first: bool = True,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    index: LogIndex = log_index,
+) -> LogSearchResponse:
+    """Search the log files
+
+    Args:
+
+        directory:
+            The directory that contains the log files
+
+        prefix:
+            The name of the current log file
+
+        query:
+            The filter for the log records
+
+        latest_first:
+            Return the latest log records first
+
+        limit:
+            The maximum number of returned log records
+
+        cursor:
+            The cursor returned for the previous page
+
+        index:
+            The index of the log files
+
+    Returns:
+
+        The matching log records and the cursor of the next page (``None``,
+        if there are no more log records)
+
+    Raises:
+
+        ValueError:
+            If the cursor is invalid
+
+    """
+
+    files = get_log_files(directory, prefix)
+    if not latest_first:
+        files.reverse()
+    index.prune({get_file_version(stat) for _, _, stat in files})
+
+    position: Optional[int] = None
+    if cursor is not None:
+        files, position = resume_search(files, cursor)
+
+    entries: list[LogEntry] = []
+    for name, path, stat in files:
+        first, last = (
+            to_datetime(timestamp)
+            for timestamp in index.get_timestamps(path, stat)
+        )
+        if query.is_before(last) or query.is_after(first):
+            continue
+
+        start, end = 0, get_content_size(path, stat)
+        if position is not None:
+            if latest_first:
+                end = min(end, position)
+            else:
+                start = position
+            position = None
+        if name != prefix and (query.since or query.until):
+            # Rotated log files do not change anymore
+            start, end = get_range(
+                query, index.get_offsets(path, stat), start, end
+            )
+
+        with open_log_file(path, seekable=latest_first) as log_file:
+            records = (
+                read_records_reversed(log_file, name, end, index.block_size)
+                if latest_first
+                else read_records(
+                    log_file, name, start, end, index.block_size
+                )
+            )
+            for entry, offset in records:
+                time = to_datetime(entry.timestamp)
+                if (
+                    latest_first
+                    and (offset < start or query.is_before(time))
+                ) or (not latest_first and query.is_after(time)):
+                    # The remaining log records are outside the time range
+                    break
+                if not query.matches(entry):
+                    continue
+                entries.append(entry)
+                if len(entries) == limit:
+                    return LogSearchResponse(
+                        entries=entries,
+                        next_cursor=encode_cursor(
+                            get_segment_id(path), offset
+                        ),
+                    )
+
+    return LogSearchResponse(entries=entries, next_cursor=None)
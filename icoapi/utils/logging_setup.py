@@ -1,51 +1,216 @@
-"""Logging setup code"""
+"""Logging setup code
+
+Loggers only put records into a queue. A background thread (queue listener)
+writes them to the log file, the console and the log WebSocket. This way
+logging does not block the event loop (e.g. while a measurement is
+running). To protect the pipeline against high-frequency messages,
+records below ``WARNING`` can be sampled and rate limited per logger. The
+number of dropped records is logged periodically and part of the report
+``GET /api/v1/diagnostics/logging``.
+"""
 
 import asyncio
+import atexit
 import logging
 import os
-import re
+import queue
 import sys
-from datetime import datetime
-from logging.handlers import RotatingFileHandler
-from typing import List, Optional
+import threading
+from collections import Counter, deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from logging.handlers import QueueHandler, QueueListener
+from time import monotonic, strftime
 
 import orjson
 from colorlog import ColoredFormatter
 from fastapi import WebSocket
 from platformdirs import user_data_dir
-from icoapi.scripts.file_handling import load_env_file
+from icoapi.models.models import LoggingReport
+from icoapi.utils.log_index import log_index
+from icoapi.utils.log_rotation import CompressingRotatingFileHandler
+from icoapi.utils.loop_monitor import current_route, current_session
 
 
-log_watchers: List[WebSocket] = []
-log_queue: asyncio.Queue[str] = asyncio.Queue()
+def get_default_log_path(folder: str, name: str) -> str:
+    """Get default log path"""
 
-load_env_file()
+    base = user_data_dir(folder, appauthor=False)
+    log_dir = os.path.join(base, "logs")
+    os.makedirs(log_dir, exist_ok=True)
+    return os.path.join(log_dir, name)
+
+
+# pylint: disable=too-many-instance-attributes
+
+
+@dataclass
+class LogSettings:
+    """Logging configuration (environment variables ``LOG_…``)
+
+    The settings are read when the module is imported and again by
+    ``setup_logging``, after the environment file was loaded.
+    """
+
+    level: str
+    use_json: bool
+    use_color: bool
+    max_bytes: int
+    backup_count: int
+    retention_bytes: int
+    retention_days: float
+    compression: str
+    name: str
+    level_uvicorn: str
+    path: str
+    queue_size: int
+    rate_limit: float
+    sample_rates: str
+    drop_report_interval: float
+    stream_backfill: int
+    stream_queue_size: int
+    stream_batch: int
+
+    @classmethod
+    def from_env(cls) -> "LogSettings":
+        """Read the logging configuration from the environment"""
+
+        name = f"{os.getenv('LOG_NAME_WITHOUT_EXTENSION', 'icodaq')}.log"
+        path = os.getenv("LOG_PATH") or get_default_log_path(
+            os.getenv("VITE_APPLICATION_FOLDER", "ICOdaq"), name
+        )
 
-LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG").upper()
-LOG_USE_JSON = os.getenv("LOG_USE_JSON", "0") == "1"
-LOG_USE_COLOR = os.getenv("LOG_USE_COLOR", "0") == "1"
-LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(5 * 1024 * 1024)))
-LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "10"))
-LOG_NAME_WITHOUT_EXTENSION = os.getenv("LOG_NAME_WITHOUT_EXTENSION", "icodaq")
-LOG_NAME = f"{LOG_NAME_WITHOUT_EXTENSION}.log"
-LOG_LEVEL_UVICORN = os.getenv("LOG_LEVEL_UVICORN", "INFO")
-LOG_FOLDER = os.getenv("VITE_APPLICATION_FOLDER", "ICOdaq")
+        return cls(
+            level=os.getenv("LOG_LEVEL", "DEBUG").upper(),
+            use_json=os.getenv("LOG_USE_JSON", "0") == "1",
+            use_color=os.getenv("LOG_USE_COLOR", "0") == "1",
+            max_bytes=int(os.getenv("LOG_MAX_BYTES", str(5 * 1024 * 1024))),
+            backup_count=int(os.getenv("LOG_BACKUP_COUNT", "100")),
+            retention_bytes=int(
+                os.getenv("LOG_RETENTION_BYTES", str(100 * 1024 * 1024))
+            ),
+            retention_days=float(os.getenv("LOG_RETENTION_DAYS", "30")),
+            compression=os.getenv("LOG_COMPRESSION", "gzip").lower(),
+            name=name,
+            level_uvicorn=os.getenv("LOG_LEVEL_UVICORN", "INFO"),
+            path=path,
+            queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+            rate_limit=float(os.getenv("LOG_RATE_LIMIT", "200")),
+            sample_rates=os.getenv("LOG_SAMPLE_RATES", ""),
+            drop_report_interval=float(
+                os.getenv("LOG_DROP_REPORT_INTERVAL", "10")
+            ),
+            stream_backfill=int(os.getenv("LOG_STREAM_BACKFILL", "200")),
+            stream_queue_size=int(os.getenv("LOG_STREAM_QUEUE_SIZE", "1000")),
+            stream_batch=int(os.getenv("LOG_STREAM_BATCH", "100")),
+        )
 
 
-def get_default_log_path() -> str:
-    """Get default log path"""
+# pylint: enable=too-many-instance-attributes
 
-    base = user_data_dir(LOG_FOLDER, appauthor=False)
-    log_dir = os.path.join(base, "logs")
-    os.makedirs(log_dir, exist_ok=True)
-    return os.path.join(log_dir, LOG_NAME)
+log_settings = LogSettings.from_env()
+"""Current logging configuration"""
+
+
+current_measurement: ContextVar[str | None] = ContextVar(
+    "current_measurement", default=None
+)
+"""Name of the measurement handled in the current context"""
+
+LOG_CONTEXT_FIELDS = ("measurement", "session", "route", "task")
+"""Attributes of log records that describe the context of the record"""
+
+
+def get_task_name() -> str | None:
+    """Get the name of the current asyncio task (if there is one)"""
+
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        return None
+    return None if task is None else task.get_name()
+
+
+class ContextFilter(logging.Filter):  # pylint: disable=too-few-public-methods
+    """Add the context (measurement, session, route, task) to log records
+
+    Filters of the queue handler run in the thread that creates the log
+    record, which is why the context variables are still available.
+    Records of other processes already contain the context.
+
+    Examples:
+
+        >>> token = current_measurement.set("Measurement")
+        >>> record = logging.makeLogRecord({})
+        >>> ContextFilter().filter(record)
+        True
+        >>> record.measurement, record.task
+        ('Measurement', None)
+        >>> current_measurement.reset(token)
+
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "measurement"):
+            record.measurement = current_measurement.get()
+            record.session = current_session.get()
+            record.route = current_route.get()
+            record.task = get_task_name()
+        return True
+
+
+class CachedTimeFormatter(logging.Formatter):
+    """Log formatter that formats the date and time only once per second
+
+    Examples:
 
+        >>> formatter = CachedTimeFormatter()
+        >>> record = logging.makeLogRecord({"created": 1700000000.25,
+        ...                                 "msecs": 250})
+        >>> formatter.formatTime(record) == (
+        ...     logging.Formatter().formatTime(record))
+        True
 
-LOG_PATH = os.getenv("LOG_PATH", get_default_log_path())
+    """
 
+    def __init__(self, *arguments, **keyword_arguments) -> None:
+        super().__init__(*arguments, **keyword_arguments)
+        self.cached_time: tuple[int, str] = (-1, "")
 
-class JSONFormatter(logging.Formatter):
-    """Log formatter for JSON output"""
+    def formatTime(  # pylint: disable=invalid-name
+        self, record: logging.LogRecord, datefmt: str | None = None
+    ) -> str:
+        if datefmt is not None:
+            return super().formatTime(record, datefmt)
+
+        second = int(record.created)
+        cached_second, formatted = self.cached_time
+        if second != cached_second:
+            formatted = strftime(
+                "%Y-%m-%d %H:%M:%S", self.converter(record.created)
+            )
+            self.cached_time = (second, formatted)
+        return f"{formatted},{int(record.msecs):03d}"
+
+
+class JSONFormatter(CachedTimeFormatter):
+    """Log formatter for structured JSON output
+
+    Every log record is a single JSON line. Besides the timestamp, level,
+    logger and message, the line contains the context of the record
+    (measurement, session, route and task) if available and the traceback
+    of exceptions.
+
+    Examples:
+
+        >>> record = logging.makeLogRecord({
+        ...     "created": 1700000000.25, "msecs": 250, "name": "icoapi",
+        ...     "levelname": "INFO", "msg": "Started %s", "args": ("test",),
+        ...     "measurement": "Measurement", "session": None})
+        >>> orjson.loads(JSONFormatter().format(record))["measurement"]
+        'Measurement'
+
+    """
 
     def format(self, record: logging.LogRecord) -> str:
         log_data = {
@@ -54,51 +219,473 @@ class JSONFormatter(logging.Formatter):
             "logger": record.name,
             "message": record.getMessage(),
         }
-        return orjson.dumps(log_data).decode(  # pylint: disable=no-member
-            "utf-8"
+        for name in LOG_CONTEXT_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                log_data[name] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            log_data["exception"] = record.exc_text
+        if record.stack_info:
+            log_data["stack"] = self.formatStack(record.stack_info)
+        return orjson.dumps(  # pylint: disable=no-member
+            log_data, default=str
+        ).decode("utf-8")
+
+
+@dataclass(frozen=True)
+class LogLine:
+    """Formatted log record for log viewers"""
+
+    level: int
+    logger: str
+    message: str
+
+
+class LogWatcher:
+    """Log viewer connected via WebSocket
+
+    Every watcher has its own bounded queue. If a viewer can not keep up,
+    the oldest lines are dropped, which means a slow viewer never delays
+    other viewers or the logging pipeline.
+
+    Args:
+
+        level:
+            The minimum level of the sent lines
+
+        loggers:
+            The names of the loggers (including child loggers) whose lines
+            should be sent (default: all loggers)
+
+        size:
+            The maximum number of lines waiting to be sent (default:
+            ``LOG_STREAM_QUEUE_SIZE``)
+
+    """
+
+    def __init__(
+        self,
+        level: int = logging.DEBUG,
+        loggers: list[str] | None = None,
+        size: int | None = None,
+    ) -> None:
+        if size is None:
+            size = log_settings.stream_queue_size
+        self.level = level
+        self.loggers = loggers or []
+        self.lines: asyncio.Queue[LogLine] = asyncio.Queue(max(size, 1))
+        self.dropped = 0
+
+    def matches(self, line: LogLine) -> bool:
+        """Check if a log line should be sent to the viewer
+
+        Examples:
+
+            >>> watcher = LogWatcher(logging.INFO, ["icoapi.scripts"])
+            >>> watcher.matches(LogLine(logging.INFO, "icoapi.scripts.a", ""))
+            True
+            >>> watcher.matches(LogLine(logging.INFO, "icoapi.scriptsx", ""))
+            False
+            >>> watcher.matches(LogLine(logging.DEBUG, "icoapi.scripts", ""))
+            False
+
+        """
+
+        return line.level >= self.level and (
+            not self.loggers
+            or any(
+                line.logger == name or line.logger.startswith(f"{name}.")
+                for name in self.loggers
+            )
         )
 
+    def put(self, line: LogLine) -> None:
+        """Queue a log line, dropping the oldest line if necessary"""
+
+        if not self.matches(line):
+            return
+        if self.lines.full():
+            self.lines.get_nowait()
+            self.dropped += 1
+        self.lines.put_nowait(line)
+
+    async def send(self, websocket: WebSocket) -> None:
+        """Send queued log lines in frames (separated by newlines)"""
+
+        while True:
+            lines = [(await self.lines.get()).message]
+            while (
+                len(lines) < log_settings.stream_batch
+                and not self.lines.empty()
+            ):
+                lines.append(self.lines.get_nowait().message)
+            if self.dropped > 0:
+                lines.append(
+                    f"[{self.dropped} log line(s) dropped: viewer too slow]"
+                )
+                self.dropped = 0
+            await websocket.send_text("\n".join(lines))
+
+
+class LogBroadcaster:
+    """Distribute log lines to all connected log viewers
+
+    The broadcaster keeps the most recent lines in a ring buffer, which
+    viewers receive (as backfill) after connecting.
+
+    Args:
+
+        size:
+            The number of lines stored in the ring buffer (default:
+            ``LOG_STREAM_BACKFILL``)
+
+    """
+
+    def __init__(self, size: int | None = None) -> None:
+        if size is None:
+            size = log_settings.stream_backfill
+        self.lock = threading.Lock()
+        self.recent: deque[LogLine] = deque(maxlen=max(size, 0))
+        self.watchers: list[LogWatcher] = []
+        self.loop: asyncio.AbstractEventLoop | None = None
+
+    def add(self, line: LogLine) -> None:
+        """Add a log line (thread-safe)"""
+
+        with self.lock:
+            self.recent.append(line)
+            loop = self.loop if self.watchers else None
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self.publish, line)
+            except RuntimeError:
+                # Event loop already closed
+                pass
+
+    def publish(self, line: LogLine) -> None:
+        """Send a log line to all watchers (runs in the event loop)"""
+
+        for watcher in list(self.watchers):
+            watcher.put(line)
+
+    def add_watcher(
+        self,
+        level: int = logging.DEBUG,
+        loggers: list[str] | None = None,
+        backfill: int | None = None,
+    ) -> LogWatcher:
+        """Register a log viewer
+
+        Args:
+
+            level:
+                The minimum level of the sent lines
+
+            loggers:
+                The names of the loggers whose lines should be sent
+
+            backfill:
+                The maximum number of recent lines sent first (default:
+                all stored lines)
+
+        Returns:
+
+            The watcher that queues the lines for the viewer
+
+        """
+
+        watcher = LogWatcher(level, loggers)
+        with self.lock:
+            self.loop = asyncio.get_running_loop()
+            recent = [line for line in self.recent if watcher.matches(line)]
+            self.watchers.append(watcher)
+        if backfill is None:
+            backfill = len(recent)
+        for line in recent[max(len(recent) - backfill, 0):]:
+            watcher.put(line)
+        return watcher
+
+    def remove_watcher(self, watcher: LogWatcher) -> None:
+        """Unregister a log viewer"""
+
+        with self.lock:
+            if watcher in self.watchers:
+                self.watchers.remove(watcher)
+
+    def resize(self, size: int) -> None:
+        """Change the number of lines stored in the ring buffer"""
+
+        with self.lock:
+            self.recent = deque(self.recent, maxlen=max(size, 0))
+
+
+log_broadcaster = LogBroadcaster()
+"""Distributes log lines to the viewers of ``/api/v1/logs/stream``"""
+
 
 class WebSocketLogHandler(logging.Handler):
     """Handler for emitting log data via WebSocket"""
 
     def emit(self, record: logging.LogRecord):
         try:
-            message = self.format(record)
-            log_queue.put_nowait(message)
+            log_broadcaster.add(
+                LogLine(record.levelno, record.name, self.format(record))
+            )
         except Exception:  # pylint: disable=broad-exception-caught
             pass
 
 
-async def log_broadcaster():
-    """Broadcast log data to all WebSockets in log queue"""
+def parse_sample_rates(sample_rates: str) -> dict[str, float]:
+    """Parse the sample rates of loggers
+
+    Examples:
+
+        >>> parse_sample_rates("icoapi.scripts.measurement=0.1, a.b=1")
+        {'icoapi.scripts.measurement': 0.1, 'a.b': 1.0}
+        >>> parse_sample_rates("")
+        {}
+
+    """
+
+    rates: dict[str, float] = {}
+    for item in sample_rates.split(","):
+        name, separator, rate = item.partition("=")
+        if separator:
+            rates[name.strip()] = min(max(float(rate), 0), 1)
+    return rates
+
+
+class DroppedRecords:
+    """Thread-safe counter for log records that were not written"""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.counts: Counter[str] = Counter()
+        self.reported = 0
+
+    def add(self, reason: str) -> None:
+        """Count a dropped record"""
+
+        with self.lock:
+            self.counts[reason] += 1
+
+    def total(self) -> int:
+        """Get the number of all dropped records"""
+
+        with self.lock:
+            return sum(self.counts.values())
+
+    def take_unreported(self) -> int:
+        """Get the number of records dropped since the last call"""
+
+        with self.lock:
+            total = sum(self.counts.values())
+            unreported = total - self.reported
+            self.reported = total
+        return unreported
 
-    while True:
-        message = await log_queue.get()
-        for ws in list(log_watchers):
-            try:
-                await ws.send_text(message)
-            except Exception:  # pylint: disable=broad-exception-caught
-                log_watchers.remove(ws)
+
+dropped_records = DroppedRecords()
+"""Number of dropped log records for every reason"""
+
+
+class RateLimitFilter(logging.Filter):
+    """Sample and rate limit log records below ``WARNING`` per logger
+
+    Examples:
+
+        >>> rate_filter = RateLimitFilter(rate=2, sample_rates={"noisy": 0.5})
+        >>> record = logging.makeLogRecord(
+        ...     {"name": "test", "levelno": logging.DEBUG})
+        >>> [rate_filter.filter(record) for _ in range(3)]
+        [True, True, False]
+        >>> noisy = logging.makeLogRecord(
+        ...     {"name": "noisy.child", "levelno": logging.INFO})
+        >>> [rate_filter.filter(noisy) for _ in range(2)]
+        [True, False]
+        >>> warning = logging.makeLogRecord({"levelno": logging.WARNING})
+        >>> all(rate_filter.filter(warning) for _ in range(10))
+        True
+
+    """
+
+    def __init__(
+        self,
+        rate: float | None = None,
+        sample_rates: dict[str, float] | None = None,
+        dropped: DroppedRecords | None = None,
+    ) -> None:
+        super().__init__()
+        self.rate = log_settings.rate_limit if rate is None else rate
+        self.sample_rates = (
+            parse_sample_rates(log_settings.sample_rates)
+            if sample_rates is None
+            else sample_rates
+        )
+        self.dropped = DroppedRecords() if dropped is None else dropped
+        self.lock = threading.Lock()
+        self.buckets: dict[str, tuple[float, float]] = {}
+        self.samples: Counter[str] = Counter()
+        self.logger_rates: dict[str, float] = {}
+
+    def get_sample_rate(self, name: str) -> float:
+        """Get the sample rate of a logger (or its closest ancestor)"""
+
+        rate = self.logger_rates.get(name)
+        if rate is None:
+            rate = 1
+            ancestor = name
+            while ancestor:
+                if ancestor in self.sample_rates:
+                    rate = self.sample_rates[ancestor]
+                    break
+                ancestor = ancestor.rpartition(".")[0]
+            self.logger_rates[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+
+        with self.lock:
+            sample_rate = self.get_sample_rate(record.name)
+            if sample_rate < 1:
+                self.samples[record.name] += 1
+                if sample_rate <= 0 or (
+                    (self.samples[record.name] - 1) % round(1 / sample_rate)
+                ):
+                    self.dropped.add("sampled")
+                    return False
+
+            if self.rate <= 0:
+                return True
+
+            # Token bucket: up to `rate` records per second (and burst)
+            now = monotonic()
+            tokens, updated = self.buckets.get(record.name, (self.rate, now))
+            tokens = min(self.rate, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self.buckets[record.name] = (tokens, now)
+                self.dropped.add("rate_limited")
+                return False
+            self.buckets[record.name] = (tokens - 1, now)
+
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Queue handler that drops records instead of blocking
+
+    The handler does not format the records (the queue listener runs in the
+    same process) and periodically adds a record about the number of
+    dropped records.
+    """
+
+    def __init__(
+        self,
+        records: queue.Queue,
+        dropped: DroppedRecords,
+        report_interval: float | None = None,
+    ) -> None:
+        super().__init__(records)
+        if report_interval is None:
+            report_interval = log_settings.drop_report_interval
+        self.dropped = dropped
+        self.report_interval = report_interval
+        self.next_report = monotonic() + report_interval
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped.add("queue_full")
+            return
+
+        if monotonic() >= self.next_report:
+            self.next_report = monotonic() + self.report_interval
+            unreported = self.dropped.take_unreported()
+            if unreported > 0:
+                report = logging.makeLogRecord({
+                    "name": __name__,
+                    "levelno": logging.WARNING,
+                    "levelname": logging.getLevelName(logging.WARNING),
+                    "msg": "Dropped %d log record(s) in the last %.0f seconds",
+                    "args": (unreported, self.report_interval),
+                })
+                try:
+                    self.queue.put_nowait(report)
+                except queue.Full:
+                    self.dropped.add("queue_full")
+
+
+log_records: queue.Queue[logging.LogRecord] = queue.Queue(
+    log_settings.queue_size
+)
+"""Records waiting to be written by the queue listener"""
+
+log_listener: QueueListener | None = None  # pylint: disable=invalid-name
+"""Background thread that writes log records"""
+
+
+def get_logging_report() -> LoggingReport:
+    """Get the state of the logging pipeline"""
+
+    with dropped_records.lock:
+        dropped = dict(dropped_records.counts)
+
+    return LoggingReport(
+        queued=log_records.qsize(),
+        capacity=log_records.maxsize,
+        dropped=dropped,
+    )
+
+
+def stop_logging() -> None:
+    """Write all queued log records and stop the queue listener"""
+
+    global log_listener  # pylint: disable=global-statement
+
+    if log_listener is not None:
+        log_listener.stop()
+        for handler in log_listener.handlers:
+            handler.close()
+        log_listener = None
 
 
 def setup_logging() -> None:
-    """Set up logging facility"""
+    """Set up logging facility
+
+    The logging configuration is read from the environment, which means the
+    environment file should be loaded before.
+    """
+
+    global log_listener  # pylint: disable=global-statement
+
+    settings = LogSettings.from_env()
+    vars(log_settings).update(vars(settings))
+    with log_records.mutex:
+        log_records.maxsize = settings.queue_size
+    log_broadcaster.resize(settings.stream_backfill)
 
     root_logger = logging.getLogger()
-    root_logger.setLevel(LOG_LEVEL)
+    root_logger.setLevel(settings.level)
 
-    formatter = logging.Formatter(
+    formatter: logging.Formatter = CachedTimeFormatter(
         "%(asctime)s [%(levelname)s] [%(name)s] %(message)s"
     )
-    console_formatter = logging.Formatter(
+    console_formatter: logging.Formatter = CachedTimeFormatter(
         "%(asctime)s [%(levelname)s] [%(name)s] %(message)s"
     )
 
-    if LOG_USE_JSON:
+    if settings.use_json:
         formatter = JSONFormatter()
         console_formatter = JSONFormatter()
-    elif LOG_USE_COLOR:
+    elif settings.use_color:
         console_formatter = ColoredFormatter(
             "%(log_color)s%(asctime)s [%(levelname)s] [%(name)s] %(message)s",
             log_colors={
@@ -110,11 +697,14 @@ def setup_logging() -> None:
             },
         )
 
-    file_handler = RotatingFileHandler(
-        LOG_PATH,
-        maxBytes=LOG_MAX_BYTES,
-        backupCount=LOG_BACKUP_COUNT,
-        encoding="utf-8",
+    file_handler = CompressingRotatingFileHandler(
+        settings.path,
+        max_bytes=settings.max_bytes,
+        max_count=settings.backup_count,
+        retention_bytes=settings.retention_bytes,
+        retention_age=settings.retention_days * 24 * 60 * 60,
+        compress=settings.compression == "gzip",
+        find_timestamps=log_index.find_timestamps,
     )
     file_handler.setFormatter(formatter)
 
@@ -124,8 +714,20 @@ def setup_logging() -> None:
     ws_handler = WebSocketLogHandler()
     ws_handler.setFormatter(formatter)
 
-    for h in (file_handler, console_handler, ws_handler):
-        root_logger.addHandler(h)
+    stop_logging()
+    log_listener = QueueListener(
+        log_records,
+        file_handler,
+        console_handler,
+        ws_handler,
+        respect_handler_level=True,
+    )
+    queue_handler = NonBlockingQueueHandler(log_records, dropped_records)
+    queue_handler.addFilter(RateLimitFilter(dropped=dropped_records))
+    queue_handler.addFilter(ContextFilter())
+    root_logger.addHandler(queue_handler)
+    log_listener.start()
+    atexit.register(stop_logging)
 
     logging.getLogger("uvicorn").handlers.clear()
     logging.getLogger("uvicorn.error").handlers.clear()
@@ -134,28 +736,6 @@ def setup_logging() -> None:
     logging.getLogger("uvicorn.error").propagate = True
     logging.getLogger("uvicorn.access").propagate = True
 
-    logging.getLogger("uvicorn").setLevel(LOG_LEVEL_UVICORN)
-    logging.getLogger("uvicorn.error").setLevel(LOG_LEVEL_UVICORN)
-    logging.getLogger("uvicorn.access").setLevel(LOG_LEVEL_UVICORN)
-
-
-def parse_timestamps(lines: list[str]) -> tuple[Optional[str], Optional[str]]:
-    """Parse logger timestamps"""
-
-    ts_pattern = re.compile(
-        r"(?P<ts>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3})"
-    )
-    timestamps = []
-    for line in lines:
-        match = ts_pattern.search(line)  # ← use .search instead of .match
-        if match:
-            try:
-                ts = datetime.strptime(
-                    match.group("ts"), "%Y-%m-%d %H:%M:%S,%f"
-                )
-                timestamps.append(ts.isoformat())
-            except ValueError:
-                continue
-    if not timestamps:
-        return None, None
-    return timestamps[0], timestamps[-1]
+    logging.getLogger("uvicorn").setLevel(settings.level_uvicorn)
+    logging.getLogger("uvicorn.error").setLevel(settings.level_uvicorn)
+    logging.getLogger("uvicorn.access").setLevel(settings.level_uvicorn)
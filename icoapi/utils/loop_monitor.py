@@ -0,0 +1,389 @@
+"""Monitor the health of the asyncio event loop
+
+The measurement shares the event loop with every REST route. A handler that
+blocks the loop therefore delays reading CAN messages, which shows up as data
+loss. The monitor in this module
+
+- samples the lag of the event loop periodically,
+- uses a watchdog thread to find out which task (and route) blocks the loop,
+  and
+- keeps a rolling report of both that clients can request.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import traceback
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from time import monotonic
+from typing import Awaitable, Callable
+from uuid import uuid4
+
+import numpy as np
+
+from icoapi.models.models import LoopLagStatistics, LoopReport, SlowCallback
+
+logger = logging.getLogger(__name__)
+
+LOOP_MONITOR_INTERVAL = float(os.getenv("LOOP_MONITOR_INTERVAL", "0.25"))
+LOOP_LAG_WARNING_MS = float(os.getenv("LOOP_LAG_WARNING_MS", "100"))
+LOOP_MONITOR_WINDOW = int(os.getenv("LOOP_MONITOR_WINDOW", "600"))
+LOOP_REPORT_INTERVAL = float(os.getenv("LOOP_REPORT_INTERVAL", "5"))
+
+current_route: ContextVar[str | None] = ContextVar(
+    "current_route", default=None
+)
+"""Route (method and path) of the request handled in the current context"""
+
+current_session: ContextVar[str | None] = ContextVar(
+    "current_session", default=None
+)
+"""Session id of the request handled in the current context"""
+
+SESSION_HEADER = b"x-session-id"
+"""Header that contains the session id of a client"""
+
+SESSION_ID_LENGTH = 64
+"""Maximum number of characters of a session id"""
+
+
+# pylint: disable=too-few-public-methods
+
+
+class RouteContextMiddleware:
+    """ASGI middleware that stores the current route and session in context
+    variables
+
+    The session id is the value of the header ``X-Session-ID`` or a new
+    random id for every request. Tasks inherit the context of the task that
+    created them. This way the route and session are also known for tasks
+    started while handling a request (e.g. a measurement).
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        method = scope.get("method", "WEBSOCKET")
+        session = dict(scope.get("headers", [])).get(SESSION_HEADER)
+        token = current_route.set(f"{method} {scope['path']}")
+        session_token = current_session.set(
+            uuid4().hex
+            if session is None
+            else session.decode("latin-1")[:SESSION_ID_LENGTH]
+        )
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_session.reset(session_token)
+            current_route.reset(token)
+
+
+# pylint: enable=too-few-public-methods
+
+
+def describe_task(task: asyncio.Task | None) -> tuple[str | None, str | None]:
+    """Get the name and route of a task
+
+    Args:
+
+        task:
+            The task that should be described
+
+    Returns:
+
+        A tuple containing the name of the task and the route the task
+        belongs to
+
+    """
+
+    if task is None:
+        return None, None
+
+    return task.get_name(), task.get_context().get(current_route)
+
+
+def get_lag_statistics(lags: list[float]) -> LoopLagStatistics:
+    """Calculate statistics for event loop lag samples
+
+    Args:
+
+        lags:
+            Lag samples in milliseconds
+
+    Returns:
+
+        Statistics about the given lag samples
+
+    Examples:
+
+        >>> statistics = get_lag_statistics([1.0, 2.0, 3.0, 4.0])
+        >>> statistics.mean, statistics.max, statistics.samples
+        (2.5, 4.0, 4)
+
+        >>> get_lag_statistics([]).samples
+        0
+
+    """
+
+    if not lags:
+        return LoopLagStatistics(
+            samples=0,
+            current=None,
+            mean=None,
+            p50=None,
+            p95=None,
+            p99=None,
+            max=None,
+        )
+
+    values = np.asarray(lags)
+    p50, p95, p99 = np.percentile(values, (50, 95, 99))
+    return LoopLagStatistics(
+        samples=len(lags),
+        current=lags[-1],
+        mean=float(values.mean()),
+        p50=float(p50),
+        p95=float(p95),
+        p99=float(p99),
+        max=float(values.max()),
+    )
+
+
+# pylint: disable=too-many-instance-attributes
+
+
+class LoopMonitor:
+    """Sample event loop lag and detect slow callbacks
+
+    Args:
+
+        interval:
+            The time between two lag samples in seconds
+
+        threshold:
+            Lag in milliseconds above which a callback counts as slow
+
+        window:
+            The number of lag samples kept for the report
+
+    """
+
+    def __init__(
+        self,
+        interval: float = LOOP_MONITOR_INTERVAL,
+        threshold: float = LOOP_LAG_WARNING_MS,
+        window: int = LOOP_MONITOR_WINDOW,
+    ) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.lags: deque[float] = deque(maxlen=window)
+        self.slow_callbacks: deque[SlowCallback] = deque(maxlen=50)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._heartbeat = monotonic()
+        self._blocker: SlowCallback | None = None
+        self._blocker_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watchdog: threading.Thread | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._is_measurement_running: Callable[[], bool] = lambda: False
+
+    @property
+    def running(self) -> bool:
+        """Check if the monitor is active"""
+
+        return bool(self._tasks)
+
+    def start(
+        self,
+        is_measurement_running: Callable[[], bool],
+        publish: Callable[[LoopReport], Awaitable[None]] | None = None,
+    ) -> None:
+        """Start monitoring the running event loop
+
+        Args:
+
+            is_measurement_running:
+                Function that returns if a measurement is currently active
+
+            publish:
+                Coroutine function that is called periodically with the
+                current report
+
+        """
+
+        if self.running:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._is_measurement_running = is_measurement_running
+        self._heartbeat = monotonic()
+        self._stop.clear()
+
+        self._tasks.append(
+            asyncio.create_task(self._sample(), name="loop_monitor")
+        )
+        if publish is not None:
+            self._tasks.append(
+                asyncio.create_task(
+                    self._publish(publish), name="loop_monitor_report"
+                )
+            )
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop_monitor_watchdog", daemon=True
+        )
+        self._watchdog.start()
+        logger.info(
+            "Started event loop monitor with interval %s s and threshold "
+            "%s ms",
+            self.interval,
+            self.threshold,
+        )
+
+    async def stop(self) -> None:
+        """Stop monitoring the event loop"""
+
+        self._stop.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=self.interval * 2)
+            self._watchdog = None
+        logger.info("Stopped event loop monitor")
+
+    def report(self) -> LoopReport:
+        """Get the rolling report of the event loop health"""
+
+        return LoopReport(
+            interval=self.interval,
+            threshold=self.threshold,
+            lag=get_lag_statistics(list(self.lags)),
+            slow_callbacks=list(self.slow_callbacks),
+            measurement_running=self._is_measurement_running(),
+        )
+
+    async def _sample(self) -> None:
+        """Measure how late the event loop wakes up after sleeping"""
+
+        while True:
+            start = monotonic()
+            await asyncio.sleep(self.interval)
+            self._heartbeat = monotonic()
+            lag = (self._heartbeat - start - self.interval) * 1000
+            self.lags.append(lag)
+
+            if lag >= self.threshold:
+                self._record_slow_callback(lag)
+
+    def _record_slow_callback(self, lag: float) -> None:
+        """Store information about the callback that blocked the loop"""
+
+        with self._blocker_lock:
+            blocker, self._blocker = self._blocker, None
+
+        if blocker is None:
+            blocker = SlowCallback(
+                timestamp=datetime.now().isoformat(),
+                duration=lag,
+                task=None,
+                route=None,
+                stack=[],
+            )
+        blocker.duration = lag
+        self.slow_callbacks.append(blocker)
+
+        if self._is_measurement_running():
+            logger.warning(
+                "Event loop blocked for %.1f ms during measurement by task "
+                "<%s> (route <%s>) at %s",
+                lag,
+                blocker.task,
+                blocker.route,
+                blocker.stack[-1] if blocker.stack else "unknown location",
+            )
+        else:
+            logger.debug(
+                "Event loop blocked for %.1f ms by task <%s> (route <%s>)",
+                lag,
+                blocker.task,
+                blocker.route,
+            )
+
+    def _watch(self) -> None:
+        """Capture the blocking code, if the loop misses its heartbeat"""
+
+        # Check a few times per sample interval to catch blocking callbacks
+        # while they are still running
+        check_interval = min(self.interval, self.threshold / 1000) / 2
+        reported_heartbeat = None
+        while not self._stop.wait(check_interval):
+            heartbeat = self._heartbeat
+            overdue = (monotonic() - heartbeat - self.interval) * 1000
+            if overdue < self.threshold or heartbeat == reported_heartbeat:
+                continue
+
+            reported_heartbeat = heartbeat
+            blocker = self._capture_blocker(overdue)
+            with self._blocker_lock:
+                self._blocker = blocker
+
+    def _capture_blocker(self, overdue: float) -> SlowCallback:
+        """Get information about the code currently running in the loop"""
+
+        task = None
+        if self._loop is not None:
+            task = asyncio.current_task(self._loop)
+        task_name, route = describe_task(task)
+
+        stack: list[str] = []
+        frame = sys._current_frames().get(  # pylint: disable=protected-access
+            self._loop_thread_id or 0
+        )
+        if frame is not None:
+            stack = [
+                f"{entry.filename}:{entry.lineno} in {entry.name}"
+                for entry in traceback.extract_stack(frame)[-5:]
+            ]
+
+        return SlowCallback(
+            timestamp=datetime.now().isoformat(),
+            duration=overdue,
+            task=task_name,
+            route=route,
+            stack=stack,
+        )
+
+    async def _publish(
+        self, publish: Callable[[LoopReport], Awaitable[None]]
+    ) -> None:
+        """Publish the report periodically"""
+
+        while True:
+            await asyncio.sleep(LOOP_REPORT_INTERVAL)
+            try:
+                await publish(self.report())
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.warning("Could not publish event loop report: %s", e)
+
+
+# pylint: enable=too-many-instance-attributes
+
+loop_monitor = LoopMonitor()
+
+
+def get_loop_monitor() -> LoopMonitor:
+    """Get event loop monitor"""
+
+    return loop_monitor
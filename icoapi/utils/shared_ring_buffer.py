@@ -0,0 +1,221 @@
+"""Ring buffer for passing records between processes via shared memory
+
+The buffer supports exactly one writer and one reader. The writer never
+blocks: If the buffer is full, it drops the records that do not fit and
+counts them. This way a slow reader (e.g. the API process under load) can
+never slow down the writer (the acquisition process).
+"""
+
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+HEADER = np.dtype([
+    ("capacity", np.uint64),
+    ("write_index", np.uint64),
+    ("read_index", np.uint64),
+    ("dropped", np.uint64),
+])
+"""Layout of the header stored in front of the records"""
+
+HEADER_SIZE = 64
+"""Size of the header in bytes (padded to one cache line)"""
+
+
+class SharedRingBuffer:
+    """Single producer, single consumer ring buffer in shared memory
+
+    Use :meth:`create` to allocate a new buffer and :meth:`attach` to open
+    an existing buffer in another process.
+
+    Args:
+
+        memory:
+            The shared memory block that stores header and records
+
+        dtype:
+            The (structured) data type of a single record
+
+    Examples:
+
+        >>> dtype = np.dtype([("timestamp", np.float64), ("value", np.float64)])
+        >>> buffer = SharedRingBuffer.create(4, dtype)
+        >>> reader = SharedRingBuffer.attach(buffer.name, dtype)
+
+        >>> records = np.array([(0.0, 1.0), (1.0, 2.0), (2.0, 3.0)], dtype)
+        >>> buffer.write(records)
+        3
+        >>> buffer.write(records)
+        1
+        >>> buffer.dropped
+        2
+        >>> reader.read()["value"].tolist()
+        [1.0, 2.0, 3.0, 1.0]
+        >>> len(reader.read())
+        0
+
+        >>> reader.close()
+        >>> buffer.close()
+        >>> buffer.unlink()
+
+    """
+
+    def __init__(self, memory: SharedMemory, dtype: np.dtype) -> None:
+        self.memory = memory
+        self.dtype = np.dtype(dtype)
+        self._header = np.ndarray((1,), dtype=HEADER, buffer=memory.buf)
+        capacity = int(self._header["capacity"][0])
+        self._records = np.ndarray(
+            (capacity,), dtype=self.dtype, buffer=memory.buf, offset=HEADER_SIZE
+        )
+
+    @classmethod
+    def create(cls, capacity: int, dtype: np.dtype) -> "SharedRingBuffer":
+        """Allocate a new ring buffer
+
+        Args:
+
+            capacity:
+                The maximum number of records stored in the buffer
+
+            dtype:
+                The (structured) data type of a single record
+
+        Returns:
+
+            The new ring buffer
+
+        """
+
+        if capacity <= 0:
+            raise ValueError(f"Invalid capacity: {capacity}")
+
+        memory = SharedMemory(
+            create=True, size=HEADER_SIZE + capacity * np.dtype(dtype).itemsize
+        )
+        header = np.ndarray((1,), dtype=HEADER, buffer=memory.buf)
+        header[0] = (capacity, 0, 0, 0)
+        del header
+        return cls(memory, dtype)
+
+    @classmethod
+    def attach(cls, name: str, dtype: np.dtype) -> "SharedRingBuffer":
+        """Open an existing ring buffer
+
+        Args:
+
+            name:
+                The name of the shared memory block of the buffer
+
+            dtype:
+                The (structured) data type of a single record
+
+        Returns:
+
+            The ring buffer using the existing shared memory
+
+        """
+
+        return cls(SharedMemory(name=name), dtype)
+
+    @property
+    def name(self) -> str:
+        """Get the name of the shared memory block"""
+
+        return self.memory.name
+
+    @property
+    def capacity(self) -> int:
+        """Get the maximum number of records stored in the buffer"""
+
+        return len(self._records)
+
+    @property
+    def dropped(self) -> int:
+        """Get the number of records the writer could not store"""
+
+        return int(self._header["dropped"][0])
+
+    def available(self) -> int:
+        """Get the number of records the reader did not read yet"""
+
+        return int(self._header["write_index"][0]) - int(
+            self._header["read_index"][0]
+        )
+
+    def write(self, records: np.ndarray) -> int:
+        """Store records in the buffer
+
+        Only the writing process should call this method.
+
+        Args:
+
+            records:
+                The records that should be stored
+
+        Returns:
+
+            The number of stored records
+
+        """
+
+        write_index = int(self._header["write_index"][0])
+        free = self.capacity - (
+            write_index - int(self._header["read_index"][0])
+        )
+        count = min(len(records), free)
+        if count < len(records):
+            self._header["dropped"] += len(records) - count
+
+        start = write_index % self.capacity
+        first = min(count, self.capacity - start)
+        self._records[start : start + first] = records[:first]
+        self._records[: count - first] = records[first:count]
+
+        # Publish the records only after they were copied completely
+        self._header["write_index"] = write_index + count
+        return count
+
+    def read(self, max_records: int | None = None) -> np.ndarray:
+        """Remove records from the buffer
+
+        Only the reading process should call this method.
+
+        Args:
+
+            max_records:
+                The maximum number of returned records
+
+        Returns:
+
+            A copy of the (oldest) unread records
+
+        """
+
+        read_index = int(self._header["read_index"][0])
+        count = int(self._header["write_index"][0]) - read_index
+        if max_records is not None:
+            count = min(count, max_records)
+
+        start = read_index % self.capacity
+        first = min(count, self.capacity - start)
+        records = np.concatenate((
+            self._records[start : start + first],
+            self._records[: count - first],
+        ))
+
+        self._header["read_index"] = read_index + count
+        return records
+
+    def close(self) -> None:
+        """Release the access to the shared memory of this process"""
+
+        # The views on the buffer have to be removed before closing it
+        del self._header
+        del self._records
+        self.memory.close()
+
+    def unlink(self) -> None:
+        """Free the shared memory (after all processes closed it)"""
+
+        self.memory.unlink()
@@ -0,0 +1,194 @@
+"""Create ZIP archives on the fly
+
+The functions in this module generate a ZIP archive piece by piece while
+reading the archived files. The archive is never stored completely (neither
+in memory nor on disk), which means the memory usage does not depend on the
+size of the archived files. Since the size of the archive is not known in
+advance, all entries use ZIP64 extensions.
+"""
+
+import zipfile
+from collections.abc import Callable, Iterable, Iterator
+from io import RawIOBase
+from typing import BinaryIO
+
+ZIP_CHUNK_SIZE = 1024 * 1024
+"""Number of bytes read from an archived file at once"""
+
+
+class StreamBuffer(RawIOBase):
+    """Non-seekable output that collects the bytes written by ``ZipFile``
+
+    Examples:
+
+        >>> buffer = StreamBuffer()
+        >>> buffer.write(b"Hello")
+        5
+        >>> buffer.take()
+        b'Hello'
+        >>> buffer.take()
+        b''
+
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:  # type: ignore[override]
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def take(self) -> bytes:
+        """Remove and return all bytes written since the last call"""
+
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def open_binary(path: str) -> BinaryIO:
+    """Open a file for reading in binary mode"""
+
+    return open(path, "rb")  # pylint: disable=consider-using-with
+
+
+def read_chunks(
+    path: str,
+    start: int = 0,
+    end: int | None = None,
+    chunk_size: int = ZIP_CHUNK_SIZE,
+    opener: Callable[[str], BinaryIO] = open_binary,
+) -> Iterator[bytes]:
+    """Read (a part of) a file in chunks
+
+    Args:
+
+        path:
+            The path of the file
+
+        start:
+            The offset of the first read byte
+
+        end:
+            The offset after the last read byte (``None`` for the end of
+            the file)
+
+        chunk_size:
+            The number of bytes read at once
+
+        opener:
+            The function that opens the file (e.g. to decompress it)
+
+    Returns:
+
+        The consecutive chunks of the file
+
+    """
+
+    with opener(path) as source:
+        source.seek(start)
+        remaining = -1 if end is None else end - start
+        while remaining != 0:
+            size = chunk_size if remaining < 0 else min(chunk_size, remaining)
+            chunk = source.read(size)
+            if not chunk:
+                break
+            if remaining > 0:
+                remaining -= len(chunk)
+            yield chunk
+
+
+def stream_zip_entries(
+    entries: Iterable[tuple[zipfile.ZipInfo, Iterable[bytes]]],
+    compression: int = zipfile.ZIP_STORED,
+) -> Iterator[bytes]:
+    """Generate a ZIP archive from the chunks of every archived file
+
+    Args:
+
+        entries:
+            The description of every archived file and its content
+
+        compression:
+            The compression method (e.g. ``zipfile.ZIP_DEFLATED``)
+
+    Returns:
+
+        The consecutive parts of the archive
+
+    Examples:
+
+        >>> import io
+        >>> archive = b"".join(stream_zip_entries(
+        ...     [(zipfile.ZipInfo("hello.txt"), [b"Hello", b" World"])],
+        ...     zipfile.ZIP_DEFLATED))
+        >>> zipfile.ZipFile(io.BytesIO(archive)).read("hello.txt")
+        b'Hello World'
+
+    """
+
+    output = StreamBuffer()
+    with zipfile.ZipFile(
+        output, mode="w", compression=compression, allowZip64=True
+    ) as archive:
+        for info, chunks in entries:
+            info.compress_type = compression
+            with archive.open(info, mode="w", force_zip64=True) as entry:
+                for chunk in chunks:
+                    entry.write(chunk)
+                    if data := output.take():
+                        yield data
+
+    # Remaining data of the last entry and the central directory
+    yield output.take()
+
+
+def stream_zip(
+    files: Iterable[tuple[str, str]],
+    compression: int = zipfile.ZIP_STORED,
+    chunk_size: int = ZIP_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """Generate a ZIP archive containing the given files
+
+    Args:
+
+        files:
+            The path of every archived file and its name in the archive
+
+        compression:
+            The compression method (e.g. ``zipfile.ZIP_DEFLATED``)
+
+        chunk_size:
+            The number of bytes read from a file at once
+
+    Returns:
+
+        The consecutive parts of the archive
+
+    Examples:
+
+        >>> import io, os, tempfile
+        >>> with tempfile.TemporaryDirectory() as directory:
+        ...     path = os.path.join(directory, "data.txt")
+        ...     with open(path, "w", encoding="utf-8") as text_file:
+        ...         _ = text_file.write("Hello World")
+        ...     archive = b"".join(stream_zip([(path, "hello.txt")]))
+        >>> zipfile.ZipFile(io.BytesIO(archive)).read("hello.txt")
+        b'Hello World'
+
+    """
+
+    return stream_zip_entries(
+        (
+            (
+                zipfile.ZipInfo.from_file(path, name),
+                read_chunks(path, chunk_size=chunk_size),
+            )
+            for path, name in files
+        ),
+        compression,
+    )
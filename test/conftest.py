@@ -2,6 +2,7 @@
 
 # -- Imports ------------------------------------------------------------------
 
+from pathlib import Path
 from re import match
 from typing import Any
 
@@ -12,6 +13,10 @@ from netaddr import EUI
 from pytest import fixture
 
 from icoapi.api import app, setup_config
+from icoapi.models.globals import get_trident_client
+from icoapi.scripts.acquisition import RECORD
+from icoapi.scripts.file_handling import get_measurement_dir
+from icoapi.utils.shared_ring_buffer import SharedRingBuffer
 
 # -- Functions ----------------------------------------------------------------
 
@@ -175,6 +180,26 @@ async def async_client():
         yield async_client
 
 
+@fixture
+def temporary_measurement_dir(tmp_path: Path):
+    """Override the measurement directory with a temporary path"""
+
+    app.dependency_overrides[get_measurement_dir] = lambda: str(tmp_path)
+    yield tmp_path
+    app.dependency_overrides.pop(get_measurement_dir, None)
+    app.dependency_overrides.pop(get_trident_client, None)
+
+
+@fixture
+def ring_buffer():
+    """Shared memory ring buffer for ten measurement values"""
+
+    buffer = SharedRingBuffer.create(10, RECORD)
+    yield buffer
+    buffer.close()
+    buffer.unlink()
+
+
 @fixture(scope="session")
 def test_sensor_node(sth_prefix, client):
     """Get test sensor node information"""
@@ -0,0 +1,151 @@
+"""Tests for the cloud connection"""
+
+# -- Imports ------------------------------------------------------------------
+
+import base64
+import json
+from time import time
+from typing import Any
+
+from requests import Response
+from requests.adapters import BaseAdapter
+
+import icoapi.models.cloud as cloud_module
+from icoapi.models.trident import StorageClient
+
+# -- Classes ------------------------------------------------------------------
+
+
+class CloudAdapter(BaseAdapter):
+    """Answer requests of the cloud client with predefined responses"""
+
+    def __init__(self, status_codes: list[int]) -> None:
+        super().__init__()
+        self.status_codes = status_codes
+        self.requests: list[tuple[str, str]] = []
+        self.timeouts: list[Any] = []
+
+    def send(  # pylint: disable=unused-argument
+        self, request, *args, **kwargs
+    ) -> Response:
+        path = request.path_url
+        self.requests.append((request.method, path))
+        self.timeouts.append(kwargs.get("timeout"))
+        response = Response()
+        response.request = request
+        response.url = request.url
+        body: dict[str, Any]
+        if path.startswith("/auth/"):
+            expiry = time() + 3600
+            payload = base64.urlsafe_b64encode(
+                json.dumps({"exp": expiry}).encode()
+            ).decode()
+            body = {
+                "access_token": f"header.{payload}.signature",
+                "refresh_token": "refresh",
+            }
+            response.status_code = 200
+        else:
+            response.status_code = self.status_codes.pop(0)
+            body = {"files": [], "total": 0, "page": 1, "size": 0}
+        # pylint: disable=protected-access
+        response._content = json.dumps(body).encode()
+        # pylint: enable=protected-access
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+# -- Functions ----------------------------------------------------------------
+
+
+def create_client(
+    status_codes: list[int],
+) -> tuple[StorageClient, CloudAdapter]:
+    """Create a storage client that uses predefined responses"""
+
+    client = StorageClient("https://cloud", "user", "password", "cloud")
+    adapter = CloudAdapter(status_codes)
+    client.get_client().session.mount("https://", adapter)
+    return client, adapter
+
+
+# -- Tests --------------------------------------------------------------------
+
+
+class TestCloud:
+    """Cloud connection test methods"""
+
+    def test_token_expiry(self) -> None:
+        """Test that requests reuse a valid access token"""
+
+        client, adapter = create_client([200, 200])
+        client.authenticate()
+
+        assert client.get_client().get_refresh_delay() > 3000
+
+        client.get_remote_objects()
+        client.get_remote_objects()
+
+        assert adapter.requests == [
+            ("POST", "/auth/login"),
+            ("GET", "/management/files"),
+            ("GET", "/management/files"),
+        ]
+
+    def test_request_timeout(self, monkeypatch) -> None:
+        """Test that all requests to the cloud use a timeout"""
+
+        monkeypatch.setattr(cloud_module, "CLOUD_SETUP_TIMEOUT", 2.5)
+        client, adapter = create_client([401, 200])
+        client.authenticate()
+        client.get_remote_objects()
+
+        assert len(adapter.requests) == 4
+        assert adapter.timeouts == [2.5] * 4
+
+    def test_expired_token(self) -> None:
+        """Test that requests are retried once after a 401"""
+
+        client, adapter = create_client([401, 200, 401, 200, 401, 401])
+        client.authenticate()
+
+        assert not client.get_remote_objects().files
+        assert adapter.requests == [
+            ("POST", "/auth/login"),
+            ("GET", "/management/files"),
+            ("POST", "/auth/refresh"),
+            ("GET", "/management/files"),
+        ]
+
+        connection = client.get_client()
+        # pylint: disable=protected-access
+        response = connection._send(
+            "POST", "https://cloud/management/files", json={}
+        )
+        assert response.status_code == 200
+        response = connection._send(
+            "POST", "https://cloud/management/files", json={}
+        )
+        # pylint: enable=protected-access
+        assert response.status_code == 401
+        assert adapter.requests.count(("POST", "/management/files")) == 4
+        assert adapter.requests.count(("POST", "/auth/refresh")) == 3
+
+    def test_server_error(self, monkeypatch) -> None:
+        """Test retries of idempotent requests after server errors"""
+
+        monkeypatch.setattr(cloud_module, "CLOUD_RETRY_BACKOFF", 0)
+        client, adapter = create_client([503, 502, 200, 503])
+        client.authenticate()
+
+        assert not client.get_remote_objects().files
+        assert adapter.requests.count(("GET", "/management/files")) == 3
+
+        connection = client.get_client()
+        response = connection._send(  # pylint: disable=protected-access
+            "POST", "https://cloud/management/files", json={}
+        )
+        assert response.status_code == 503
+        assert adapter.requests.count(("POST", "/management/files")) == 1
@@ -2,7 +2,7 @@
 
 # -- Imports ------------------------------------------------------------------
 
-from asyncio import TaskGroup, wait_for
+from asyncio import TaskGroup, sleep, wait_for
 from datetime import datetime, timedelta
 from logging import getLogger
 from typing import Any
@@ -12,6 +12,8 @@ from httpx import AsyncClient
 from httpx_ws import aconnect_ws, AsyncWebSocketSession
 from pytest import mark
 
+import icoapi.models.globals as globals_module
+
 # -- Functions ----------------------------------------------------------------
 
 
@@ -144,6 +146,39 @@ class TestCommon:
             assert measurement_status[attribute] is None
         assert measurement_status["running"] is False
 
+    def test_state_readiness(self, state_prefix, client) -> None:
+        """Test readiness of the subsystems in endpoint ``/state``"""
+
+        response = client.get(state_prefix)
+
+        assert response.status_code == 200
+
+        readiness = response.json()["readiness"]
+        statuses = {"pending", "ready", "failed", "disabled"}
+        assert readiness["can"] in statuses
+        assert readiness["cloud"] in statuses
+
+    async def test_cloud_setup_retry(self, monkeypatch) -> None:
+        """Test timeout and retries of the cloud setup"""
+
+        attempts = 0
+
+        async def setup_trident():
+            nonlocal attempts
+            attempts += 1
+            await sleep(1)
+
+        monkeypatch.setattr(globals_module, "setup_trident", setup_trident)
+        monkeypatch.setattr(globals_module, "CLOUD_SETUP_TIMEOUT", 0.01)
+        monkeypatch.setattr(globals_module, "CLOUD_SETUP_RETRIES", 2)
+        monkeypatch.setattr(globals_module, "CLOUD_SETUP_RETRY_DELAY", 0)
+        monkeypatch.setattr(globals_module.readiness, "cloud", "pending")
+
+        await globals_module.connect_trident()
+
+        assert attempts == 3
+        assert globals_module.get_readiness().cloud == "failed"
+
     @mark.hardware
     def test_state_measurement(
         self,
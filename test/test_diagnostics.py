@@ -0,0 +1,62 @@
+"""Tests for diagnostics endpoints"""
+
+# -- Imports ------------------------------------------------------------------
+
+from asyncio import create_task, sleep
+from time import sleep as blocking_sleep
+
+from icoapi.utils.loop_monitor import LoopMonitor
+
+# -- Tests --------------------------------------------------------------------
+
+
+class TestDiagnostics:
+    """Diagnostics endpoint test methods"""
+
+    def test_loop_report(self, client) -> None:
+        """Test endpoint ``/diagnostics/loop``"""
+
+        response = client.get("diagnostics/loop")
+
+        assert response.status_code == 200
+
+        body = response.json()
+        assert body["interval"] > 0
+        assert body["threshold"] > 0
+        assert body["measurement_running"] is False
+        assert isinstance(body["slow_callbacks"], list)
+        assert body["lag"]["samples"] >= 0
+
+    def test_logging_report(self, client) -> None:
+        """Test endpoint ``/diagnostics/logging``"""
+
+        response = client.get("diagnostics/logging")
+
+        assert response.status_code == 200
+
+        body = response.json()
+        assert body["capacity"] > 0
+        assert body["queued"] >= 0
+        assert isinstance(body["dropped"], dict)
+
+    async def test_slow_callback_detection(self) -> None:
+        """Check that the loop monitor reports blocking tasks"""
+
+        monitor = LoopMonitor(interval=0.02, threshold=50, window=100)
+        monitor.start(is_measurement_running=lambda: False)
+
+        async def block_loop():
+            blocking_sleep(0.3)
+
+        await sleep(0.1)
+        await create_task(block_loop(), name="blocking_task")
+        await sleep(0.1)
+        await monitor.stop()
+
+        report = monitor.report()
+        assert report.lag.samples > 0
+        assert report.lag.max is not None and report.lag.max >= 50
+        assert any(
+            callback.task == "blocking_task"
+            for callback in report.slow_callbacks
+        )
@@ -0,0 +1,60 @@
+"""Tests for loading the environment configuration"""
+
+# -- Imports ------------------------------------------------------------------
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# -- Tests --------------------------------------------------------------------
+
+
+class TestEnvironment:  # pylint: disable=too-few-public-methods
+    """Environment configuration test methods"""
+
+    def test_env_file(self, tmp_path: Path) -> None:
+        """Check that settings read on import use the environment file"""
+
+        (tmp_path / ".env").write_text(
+            "VITE_API_ORIGINS=http://example.test\n"
+            "SUMMARY_BACKFILL=1\n"
+            "HDF5_EXECUTOR_WORKERS=3\n"
+        )
+        settings = (
+            "VITE_API_ORIGINS",
+            "SUMMARY_BACKFILL",
+            "HDF5_EXECUTOR_WORKERS",
+        )
+        environment = {
+            key: value
+            for key, value in os.environ.items()
+            if key not in settings
+        }
+        environment["PYTHONPATH"] = os.pathsep.join(
+            [str(Path(__file__).parent.parent), *sys.path]
+        )
+
+        process = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "from icoapi.api import origins\n"
+                "from icoapi.scripts.summary import SUMMARY_BACKFILL\n"
+                "from icoapi.utils.executor import hdf5_executor\n"
+                "print(origins, SUMMARY_BACKFILL,"
+                " hdf5_executor._max_workers)",
+            ],
+            capture_output=True,
+            check=True,
+            cwd=tmp_path,
+            env=environment,
+            text=True,
+            timeout=60,
+        )
+
+        assert process.stdout.split() == [
+            "['http://example.test']",
+            "True",
+            "3",
+        ]
@@ -2,33 +2,29 @@
 
 # -- Imports ------------------------------------------------------------------
 
+import asyncio
 import json
 import os
+from base64 import b64encode
+from hashlib import sha256
+from io import BytesIO
 from pathlib import Path
 from types import SimpleNamespace
 
 import numpy as np
 import tables
-from pytest import fixture
+from PIL import Image
+from pytest import fixture, raises
 
 from icoapi.api import app
 from icoapi.models.globals import get_trident_client
 from icoapi.models.trident import RemoteObjectDetails
-from icoapi.scripts.file_handling import get_measurement_dir
+from icoapi.scripts import file_handling
+from icoapi.scripts.pictures import write_pictures
 
 # -- Fixtures -----------------------------------------------------------------
 
 
-@fixture(name="temporary_measurement_dir")
-def fixture_temporary_measurement_dir(tmp_path: Path):
-    """Override the measurement directory with a temporary path"""
-
-    app.dependency_overrides[get_measurement_dir] = lambda: str(tmp_path)
-    yield tmp_path
-    app.dependency_overrides.pop(get_measurement_dir, None)
-    app.dependency_overrides.pop(get_trident_client, None)
-
-
 @fixture(name="measurement_hdf5_file")
 def fixture_measurement_hdf5_file(
     temporary_measurement_dir: Path,
@@ -432,6 +428,36 @@ class TestFileRoutes:
             assert dataset.attrs["mime"] == "text/plain"
             assert dataset.attrs["original_name"] == "hello.txt"
 
+    def test_upload_large_embedded_file(
+        self, client, measurement_hdf5_file: Path, monkeypatch
+    ) -> None:
+        """Test chunked storage of embedded files"""
+
+        monkeypatch.setattr(file_handling, "EMBEDDED_FILE_CHUNK_SIZE", 1000)
+        monkeypatch.setattr(file_handling, "EMBEDDED_FILE_COMPRESSION", 5)
+        payload = bytes(range(250)) * 10
+
+        response = client.post(
+            "files/measurement.hdf5/embedded",
+            files=[("files", ("large.bin", payload, "video/mp4"))],
+        )
+
+        assert response.status_code == 200
+        assert response.json()[0]["size"] == len(payload)
+
+        with tables.open_file(str(measurement_hdf5_file), mode="r") as hdf5_file:
+            dataset = hdf5_file.get_node("/embedded_files/large_bin")
+
+            assert isinstance(dataset, tables.EArray)
+            assert dataset.filters.complevel == 5
+            assert dataset.read().tobytes() == payload
+            assert dataset.attrs["sha256"] == sha256(payload).hexdigest()
+
+        response = client.get("files/measurement.hdf5/embedded/large_bin")
+
+        assert response.status_code == 200
+        assert response.content == payload
+
     def test_upload_embedded_file_duplicate_name(
         self, client, measurement_hdf5_file: Path
     ) -> None:
@@ -491,6 +517,39 @@ class TestFileRoutes:
             assert hello.read().tobytes() == b"first"
             assert world.read().tobytes() == b"\x01\x02"
 
+    def test_upload_embedded_files_rollback(
+        self, measurement_hdf5_file: Path
+    ) -> None:
+        """Test that failed batch uploads do not keep any embedded file"""
+
+        class BrokenFile(BytesIO):
+            """File that can not be read completely"""
+
+            def read(self, size: int | None = -1) -> bytes:
+                if self.tell() > 0:
+                    raise OSError("Connection lost")
+                return super().read(size)
+
+        with tables.open_file(str(measurement_hdf5_file), mode="a") as hdf5_file:
+            group = hdf5_file.create_group("/", "embedded_files")
+            hdf5_file.create_array(group, "old_txt", np.array([1, 2, 3]))
+
+        with raises(OSError):
+            file_handling.append_embedded_files_to_hdf5(
+                str(measurement_hdf5_file),
+                [
+                    ("new.txt", BytesIO(b"complete"), "text/plain"),
+                    ("broken.bin", BrokenFile(b"partial"), None),
+                ],
+            )
+
+        with tables.open_file(str(measurement_hdf5_file), mode="r") as hdf5_file:
+            names = [
+                node.name
+                for node in hdf5_file.list_nodes("/embedded_files")
+            ]
+            assert names == ["old_txt"]
+
     def test_upload_embedded_file_not_found(self, client) -> None:
         """Test endpoint ``/{name}/embedded`` for missing HDF5 files"""
 
@@ -551,6 +610,86 @@ class TestFileRoutes:
             )
         )
 
+    def test_download_embedded_file_range(
+        self, client, measurement_hdf5_file: Path
+    ) -> None:
+        """Test range and conditional requests for embedded files"""
+
+        payload = bytes(range(256)) * 4
+        with tables.open_file(str(measurement_hdf5_file), mode="a") as hdf5_file:
+            group = hdf5_file.create_group("/", "embedded_files")
+            dataset = hdf5_file.create_array(
+                group, "data_bin", np.frombuffer(payload, dtype=np.uint8)
+            )
+            dataset.attrs["size"] = len(payload)
+
+        url = "files/measurement.hdf5/embedded/data_bin"
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.content == payload
+        assert response.headers["accept-ranges"] == "bytes"
+        etag = response.headers["etag"]
+
+        response = client.get(url, headers={"Range": "bytes=1000-"})
+        assert response.status_code == 206
+        assert response.content == payload[1000:]
+        assert response.headers["content-range"] == "bytes 1000-1023/1024"
+
+        response = client.get(
+            url, headers={"Range": "bytes=0-9", "If-Range": '"outdated"'}
+        )
+        assert response.status_code == 200
+        assert response.content == payload
+
+        response = client.get(url, headers={"Range": "bytes=2000-"})
+        assert response.status_code == 416
+        assert response.headers["content-range"] == "bytes */1024"
+
+        response = client.get(url, headers={"Range": "bytes=5-3"})
+        assert response.status_code == 200
+        assert response.content == payload
+
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+
+        response = client.get(
+            url,
+            headers={"If-Modified-Since": response.headers["last-modified"]},
+        )
+        assert response.status_code == 304
+
+    def test_upload_during_download(
+        self, client, measurement_hdf5_file: Path, monkeypatch
+    ) -> None:
+        """Test that a running download does not block changes of the file"""
+
+        monkeypatch.setattr(file_handling, "EMBEDDED_FILE_CHUNK_SIZE", 100)
+        payload = bytes(range(250))
+        with tables.open_file(str(measurement_hdf5_file), mode="a") as hdf5_file:
+            group = hdf5_file.create_group("/", "embedded_files")
+            hdf5_file.create_array(
+                group, "data_bin", np.frombuffer(payload, dtype=np.uint8)
+            )
+
+        async def download() -> bytes:
+            chunks = file_handling.read_embedded_file_chunks(
+                str(measurement_hdf5_file), "data_bin", 0, len(payload)
+            )
+            content = await anext(chunks)
+
+            response = client.post(
+                "files/measurement.hdf5/embedded",
+                files=[("files", ("hello.txt", b"hello", "text/plain"))],
+            )
+            assert response.status_code == 200
+
+            async for chunk in chunks:
+                content += chunk
+            return content
+
+        assert asyncio.run(download()) == payload
+
     def test_download_embedded_file_not_found(
         self, client, measurement_hdf5_file: Path
     ) -> None:
@@ -637,4 +776,83 @@ class TestFileRoutes:
             "mime": "text/plain",
             "size": len(payload),
             "download_path": "files/analyze.hdf5/embedded/hello_txt",
+            "sha256": sha256(payload).hexdigest(),
         }]
+
+    def test_download_picture(self, client, analyze_hdf5_file: Path) -> None:
+        """Test endpoint ``/{name}/pictures/{parameter}/{index}``"""
+
+        png = b"\x89PNG\r\n\x1a\n" + bytes(range(32))
+        encoded = [
+            b"data:image/jpeg;base64," + b64encode(b"\xff\xd8\xff\xe0"),
+            b64encode(png),
+        ]
+        with tables.open_file(str(analyze_hdf5_file), mode="a") as hdf5_file:
+            hdf5_file.create_array(
+                "/", "pre__tool_pictures", np.array(encoded, dtype="S64")
+            )
+
+        response = client.get("files/analyze/meta/analyze.hdf5")
+
+        assert response.status_code == 200
+        pictures = response.json()["pictures"]["pre__tool_pictures"]
+        assert [picture["mime"] for picture in pictures] == [
+            "image/jpeg",
+            "image/png",
+        ]
+        assert pictures[1]["size"] == len(png)
+        assert pictures[1]["sha256"] == sha256(png).hexdigest()
+
+        url = pictures[1]["download_path"].removeprefix("/api/v1/")
+        response = client.get(url)
+
+        assert response.status_code == 200
+        assert response.content == png
+        assert response.headers["content-type"] == "image/png"
+
+        response = client.get(
+            url, headers={"If-None-Match": response.headers["etag"]}
+        )
+        assert response.status_code == 304
+
+        response = client.get(
+            "files/analyze.hdf5/pictures/pre__tool_pictures/2"
+        )
+        assert response.status_code == 404
+
+    def test_download_picture_thumbnail(
+        self, client, analyze_hdf5_file: Path
+    ) -> None:
+        """Test thumbnails of pictures stored as binary data"""
+
+        picture = BytesIO()
+        Image.new("RGB", (800, 600), "red").save(picture, format="PNG")
+        content = picture.getvalue()
+        with tables.open_file(str(analyze_hdf5_file), mode="a") as hdf5_file:
+            write_pictures(
+                hdf5_file,
+                "post__tool_pictures",
+                [b64encode(content).decode(), "not a picture"],
+            )
+
+        response = client.get("files/analyze/meta/analyze.hdf5")
+
+        assert response.status_code == 200
+        pictures = response.json()["pictures"]["post__tool_pictures"]
+        assert pictures[0]["mime"] == "image/png"
+        assert (pictures[0]["width"], pictures[0]["height"]) == (800, 600)
+        assert pictures[0]["size"] == len(content)
+        assert pictures[1]["thumbnail_path"] is None
+
+        url = "files/analyze.hdf5/pictures/post__tool_pictures/0"
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.content == content
+
+        response = client.get(url, params={"thumbnail": True})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/jpeg"
+        assert Image.open(BytesIO(response.content)).size == (256, 192)
+
+        response = client.get(url[:-1] + "1", params={"thumbnail": True})
+        assert response.status_code == 404
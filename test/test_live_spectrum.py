@@ -0,0 +1,96 @@
+"""Tests for the live spectrum of running measurements"""
+
+# -- Imports ------------------------------------------------------------------
+
+import numpy as np
+
+from icoapi.scripts.live_spectrum import LiveSpectrum
+
+# -- Constants ----------------------------------------------------------------
+
+MESSAGE_RATE = 1000
+VALUES_PER_MESSAGE = 3
+SAMPLE_RATE = MESSAGE_RATE * VALUES_PER_MESSAGE
+
+# -- Functions ----------------------------------------------------------------
+
+
+def add_messages(
+    spectrum: LiveSpectrum,
+    messages: int,
+    frequency: float,
+    first_message: int = 0,
+) -> None:
+    """Add streaming messages containing a sine wave for channel ``first``"""
+
+    for message in range(first_message, first_message + messages):
+        samples = np.arange(
+            message * VALUES_PER_MESSAGE, (message + 1) * VALUES_PER_MESSAGE
+        )
+        spectrum.add(
+            message / MESSAGE_RATE,
+            {
+                "first": np.sin(
+                    2 * np.pi * frequency * samples / SAMPLE_RATE
+                ).tolist(),
+                "second": [],
+                "third": [],
+            },
+        )
+
+
+# -- Tests --------------------------------------------------------------------
+
+
+class TestLiveSpectrum:
+    """Live spectrum test methods"""
+
+    def test_peak_frequency(self) -> None:
+        """Check the amplitude spectrum of a sine wave"""
+
+        spectrum = LiveSpectrum(window=1024, interval=0, budget=1)
+        add_messages(spectrum, 300, frequency=375)
+
+        # The window is not filled yet
+        assert spectrum.calculate() is None
+
+        add_messages(spectrum, 300, frequency=375, first_message=300)
+        frame = spectrum.calculate()
+
+        assert frame is not None
+        assert frame.type == "spectrum"
+        assert [dataset.name for dataset in frame.datasets] == ["first"]
+        amplitudes = frame.datasets[0].data
+        assert len(amplitudes) == 1024 // 2 + 1
+        assert abs(frame.frequency_resolution - SAMPLE_RATE / 1024) < 0.1
+
+        peak = int(np.argmax(amplitudes)) * frame.frequency_resolution
+        assert abs(peak - 375) <= frame.frequency_resolution
+        assert abs(max(amplitudes) - 1) < 0.1
+
+    def test_throttling(self) -> None:
+        """Check that spectra are only calculated after the interval"""
+
+        spectrum = LiveSpectrum(window=256, interval=60_000, budget=1)
+        add_messages(spectrum, 100, frequency=100)
+
+        assert spectrum.due()
+        assert spectrum.calculate() is not None
+        assert not spectrum.due()
+
+        # A tiny CPU budget increases the time until the next spectrum
+        spectrum = LiveSpectrum(window=256, interval=0, budget=1e-9)
+        add_messages(spectrum, 100, frequency=100)
+
+        assert spectrum.calculate() is not None
+        assert not spectrum.due()
+
+    def test_reset(self) -> None:
+        """Check that resetting removes all values"""
+
+        spectrum = LiveSpectrum(window=256, interval=0, budget=1)
+        add_messages(spectrum, 100, frequency=100)
+        spectrum.reset()
+
+        assert spectrum.sample_rate() == 0
+        assert spectrum.calculate() is None
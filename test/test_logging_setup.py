@@ -0,0 +1,485 @@
+"""Tests for the logging pipeline"""
+
+# -- Imports ------------------------------------------------------------------
+
+import asyncio
+import logging
+import os
+import queue
+import re
+import zipfile
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+
+import orjson
+
+from icoapi.utils import log_index as log_index_module
+from icoapi.utils.log_index import LogIndex
+from icoapi.utils.log_rotation import (
+    CompressingRotatingFileHandler,
+    apply_retention,
+    get_log_files,
+    get_timestamps_path,
+    is_compressed,
+    open_log_file,
+)
+from icoapi.utils.log_search import LogQuery, search_logs
+from icoapi.utils.executor import run_in_hdf5_executor
+from icoapi.utils.logging_setup import (
+    CachedTimeFormatter,
+    ContextFilter,
+    DroppedRecords,
+    JSONFormatter,
+    LogLine,
+    LogWatcher,
+    NonBlockingQueueHandler,
+    RateLimitFilter,
+    current_measurement,
+    log_broadcaster,
+    log_settings,
+)
+from icoapi.utils.loop_monitor import current_session
+
+# -- Functions ----------------------------------------------------------------
+
+
+def create_logger(
+    name: str, handler: logging.Handler
+) -> logging.Logger:
+    """Create a logger that only uses the given handler"""
+
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    return logger
+
+
+# -- Tests --------------------------------------------------------------------
+
+
+class TestLoggingSetup:
+    """Logging pipeline test methods"""
+
+    def test_queue_full(self) -> None:
+        """Check that a full queue drops records instead of blocking"""
+
+        records: queue.Queue[logging.LogRecord] = queue.Queue(2)
+        dropped = DroppedRecords()
+        handler = NonBlockingQueueHandler(records, dropped, report_interval=0)
+        logger = create_logger("test.queue_full", handler)
+
+        for number in range(5):
+            logger.debug("Message %d", number)
+
+        assert records.qsize() == 2
+        assert dropped.counts == {"queue_full": 3}
+
+        # The next successfully queued record triggers the report
+        records.get_nowait()
+        records.get_nowait()
+        logger.warning("Warning")
+        queued = [records.get_nowait() for _ in range(records.qsize())]
+        assert [record.getMessage() for record in queued] == [
+            "Warning",
+            "Dropped 3 log record(s) in the last 0 seconds",
+        ]
+
+    def test_rate_limit(self) -> None:
+        """Check that only high-frequency debug messages are dropped"""
+
+        records: queue.Queue[logging.LogRecord] = queue.Queue()
+        dropped = DroppedRecords()
+        handler = NonBlockingQueueHandler(records, dropped)
+        handler.addFilter(
+            RateLimitFilter(
+                rate=10,
+                sample_rates={"test.rate_limit.sampled": 0.25},
+                dropped=dropped,
+            )
+        )
+        logger = create_logger("test.rate_limit", handler)
+        sampled = logging.getLogger("test.rate_limit.sampled")
+        sampled.setLevel(logging.DEBUG)
+
+        for _ in range(100):
+            logger.debug("Frequent message")
+            logger.error("Important message")
+        for _ in range(8):
+            sampled.info("Sampled message")
+
+        messages = [
+            records.get_nowait().getMessage()
+            for _ in range(records.qsize())
+        ]
+        assert messages.count("Frequent message") == 10
+        assert messages.count("Important message") == 100
+        assert messages.count("Sampled message") == 2
+        assert dropped.counts == {"rate_limited": 90, "sampled": 6}
+
+    async def test_slow_log_viewer(self) -> None:
+        """Check that a slow log viewer only loses its oldest lines"""
+
+        class WebSocket:  # pylint: disable=too-few-public-methods
+            """Collect sent messages and stop after the first one"""
+
+            def __init__(self) -> None:
+                self.messages: list[str] = []
+
+            async def send_text(self, message: str) -> None:
+                """Store a sent message"""
+
+                self.messages.append(message)
+                raise ConnectionError
+
+        watcher = LogWatcher(level=logging.INFO, size=3)
+        for number in range(5):
+            watcher.put(LogLine(logging.INFO, "test", f"Line {number}"))
+        watcher.put(LogLine(logging.DEBUG, "test", "Ignored"))
+
+        websocket = WebSocket()
+        try:
+            await watcher.send(websocket)  # type: ignore[arg-type]
+        except ConnectionError:
+            pass
+
+        assert websocket.messages == [
+            "Line 2\nLine 3\nLine 4\n"
+            "[2 log line(s) dropped: viewer too slow]"
+        ]
+
+    def test_log_stream(self, client) -> None:
+        """Test WebSocket endpoint ``/logs/stream``"""
+
+        name = "test.log_stream"
+        for level, message in (
+            (logging.WARNING, "First warning"),
+            (logging.INFO, "Information"),
+            (logging.ERROR, "First error"),
+            (logging.WARNING, "Second warning"),
+        ):
+            log_broadcaster.add(LogLine(level, name, message))
+        log_broadcaster.add(LogLine(logging.ERROR, "test.other", "Other"))
+
+        ws_url = str(client.base_url).replace("http", "ws")
+        with client.websocket_connect(
+            f"{ws_url}logs/stream?level=WARNING&logger={name}&backfill=2"
+        ) as websocket:
+            assert websocket.receive_text() == "First error\nSecond warning"
+
+            log_broadcaster.add(LogLine(logging.DEBUG, name, "Debug"))
+            log_broadcaster.add(LogLine(logging.CRITICAL, name, "Critical"))
+            assert websocket.receive_text() == "Critical"
+
+    def test_log_index(self, tmp_path: Path, monkeypatch) -> None:
+        """Check that the log index only reads changed log files"""
+
+        lines = [
+            f"2024-01-02 03:04:{second:02},000 INFO Line {second}\n"
+            for second in range(60)
+        ]
+        log_path = tmp_path / "test.log"
+        log_path.write_text("Start\n" + "".join(lines) + "Traceback\n")
+
+        log_index = LogIndex(block_size=32)
+        read_paths: list[str] = []
+        read_timestamps = log_index.read_timestamps
+
+        def read(path: str, size: int):
+            read_paths.append(os.path.basename(path))
+            return read_timestamps(path, size)
+
+        monkeypatch.setattr(log_index, "read_timestamps", read)
+
+        files = log_index.list_files(str(tmp_path), "test.log")
+        assert [(file.name, file.first_timestamp, file.last_timestamp)
+                for file in files] == [
+            ("test.log", "2024-01-02T03:04:00", "2024-01-02T03:04:59")
+        ]
+
+        # Rotating only renames the file
+        log_path.rename(tmp_path / "test.log.1")
+        log_path.write_text(lines[0])
+        files = log_index.list_files(str(tmp_path), "test.log")
+        assert [file.name for file in files] == ["test.log", "test.log.1"]
+        assert files[1].last_timestamp == "2024-01-02T03:04:59"
+        assert read_paths == ["test.log", "test.log"]
+        assert len(log_index.timestamps) == 2
+
+    def test_log_search(self, tmp_path: Path) -> None:
+        """Check searching and paging through rotated log files"""
+
+        def write_log(name: str, minute: int) -> None:
+            (tmp_path / name).write_text(
+                "".join(
+                    f"2024-01-02 03:{minute:02}:{second:02},000 "
+                    f"[{'ERROR' if second % 10 == 0 else 'INFO'}] "
+                    f"[icoapi.{'can' if second % 20 == 0 else 'api'}] "
+                    f"Message {minute}:{second:02}\n"
+                    + ("Traceback\n" if second % 10 == 0 else "")
+                    for second in range(60)
+                )
+            )
+
+        write_log("test.log.2", 1)
+        write_log("test.log.1", 2)
+        write_log("test.log", 3)
+        log_index = LogIndex(block_size=64, offset_interval=256)
+
+        query = LogQuery(level=logging.ERROR)
+        page = search_logs(
+            str(tmp_path), "test.log", query, limit=4, index=log_index
+        )
+        assert [entry.message for entry in page.entries] == [
+            "Message 3:50\nTraceback",
+            "Message 3:40\nTraceback",
+            "Message 3:30\nTraceback",
+            "Message 3:20\nTraceback",
+        ]
+
+        # Cursors stay valid after a rotation
+        (tmp_path / "test.log.2").rename(tmp_path / "test.log.3")
+        (tmp_path / "test.log.1").rename(tmp_path / "test.log.2")
+        (tmp_path / "test.log").rename(tmp_path / "test.log.1")
+        write_log("test.log", 4)
+        page = search_logs(
+            str(tmp_path),
+            "test.log",
+            query,
+            limit=4,
+            cursor=page.next_cursor,
+            index=log_index,
+        )
+        assert [
+            (entry.file, entry.message.split("\n")[0])
+            for entry in page.entries
+        ] == [
+            ("test.log.1", "Message 3:10"),
+            ("test.log.1", "Message 3:00"),
+            ("test.log.2", "Message 2:50"),
+            ("test.log.2", "Message 2:40"),
+        ]
+
+        query = LogQuery(
+            loggers=["icoapi.can"],
+            since=datetime(2024, 1, 2, 3, 1, 30),
+            until=datetime(2024, 1, 2, 3, 2, 30),
+            pattern=re.compile(r"Message \d:\d0"),
+        )
+        page = search_logs(
+            str(tmp_path),
+            "test.log",
+            query,
+            latest_first=False,
+            index=log_index,
+        )
+        assert [entry.timestamp for entry in page.entries] == [
+            "2024-01-02T03:01:40",
+            "2024-01-02T03:02:00",
+            "2024-01-02T03:02:20",
+        ]
+        assert page.next_cursor is None
+
+    def test_search_logs(self, client) -> None:
+        """Test endpoint ``/logs/search``"""
+
+        response = client.get(
+            "logs/search", params={"level": "CRITICAL", "limit": 1}
+        )
+        assert response.status_code == 200
+        assert len(response.json()["entries"]) <= 1
+
+        response = client.get("logs/search", params={"pattern": "("})
+        assert response.status_code == 400
+        response = client.get("logs/search", params={"cursor": "invalid"})
+        assert response.status_code == 400
+
+    def test_download_logs(
+        self, client, tmp_path: Path, monkeypatch
+    ) -> None:
+        """Test downloading single log files and the log archive"""
+
+        log_name = log_settings.name
+        monkeypatch.setattr(log_settings, "path", str(tmp_path / log_name))
+        contents = {
+            f"{log_name}{suffix}": "".join(
+                f"2024-01-02 03:0{minute}:{second:02},000 [INFO] [icoapi] "
+                f"Message {minute}:{second:02}\n"
+                for second in range(0, 60, 15)
+            )
+            for minute, suffix in ((1, ".1"), (2, ""))
+        }
+        for name, content in contents.items():
+            (tmp_path / name).write_text(content)
+
+        response = client.get(
+            f"logs/download/{log_name}",
+            headers={"Range": "bytes=0-22"},
+        )
+        assert response.status_code == 206
+        assert response.text == "2024-01-02 03:02:00,000"
+
+        response = client.get("logs/all")
+        assert response.status_code == 200
+        with zipfile.ZipFile(BytesIO(response.content)) as archive:
+            assert {
+                name: archive.read(name).decode() for name in archive.namelist()
+            } == contents
+
+        response = client.get(
+            "logs/all",
+            params={
+                "since": "2024-01-02T03:01:30",
+                "until": "2024-01-02T03:02:10",
+            },
+        )
+        with zipfile.ZipFile(BytesIO(response.content)) as archive:
+            assert {
+                name: archive.read(name).decode().splitlines()
+                for name in archive.namelist()
+            } == {
+                f"{log_name}.1": [
+                    "2024-01-02 03:01:30,000 [INFO] [icoapi] Message 1:30",
+                    "2024-01-02 03:01:45,000 [INFO] [icoapi] Message 1:45",
+                ],
+                log_name: [
+                    "2024-01-02 03:02:00,000 [INFO] [icoapi] Message 2:00",
+                ],
+            }
+
+    async def test_structured_logging(self) -> None:
+        """Check that JSON log records contain the context of the record"""
+
+        records: queue.Queue[logging.LogRecord] = queue.Queue()
+        handler = NonBlockingQueueHandler(records, DroppedRecords())
+        handler.addFilter(ContextFilter())
+        logger = create_logger("test.structured_logging", handler)
+
+        async def measure() -> None:
+            current_measurement.set("Measurement")
+            logger.info("Task")
+            await run_in_hdf5_executor(logger.info, "Executor")
+
+        token = current_session.set("session")
+        try:
+            await asyncio.create_task(measure(), name="run_measurement")
+            logger.info("Request")
+        finally:
+            current_session.reset(token)
+
+        formatter = JSONFormatter()
+        lines = [
+            orjson.loads(  # pylint: disable=no-member
+                formatter.format(records.get_nowait())
+            )
+            for _ in range(records.qsize())
+        ]
+        assert [
+            {
+                name: line.get(name)
+                for name in ("message", "measurement", "session", "task")
+            }
+            for line in lines
+        ] == [
+            {
+                "message": "Task",
+                "measurement": "Measurement",
+                "session": "session",
+                "task": "run_measurement",
+            },
+            {
+                "message": "Executor",
+                "measurement": "Measurement",
+                "session": "session",
+                "task": None,
+            },
+            {
+                "message": "Request",
+                "measurement": None,
+                "session": "session",
+                "task": lines[2].get("task"),
+            },
+        ]
+
+    def test_log_rotation(self, tmp_path: Path, monkeypatch) -> None:
+        """Check compressed log rotation and reading compressed segments"""
+
+        log_index = LogIndex()
+        handler = CompressingRotatingFileHandler(
+            str(tmp_path / "test.log"),
+            max_bytes=300,
+            max_count=3,
+            find_timestamps=log_index.find_timestamps,
+        )
+        handler.setFormatter(
+            CachedTimeFormatter(
+                "%(asctime)s [%(levelname)s] [%(name)s] %(message)s"
+            )
+        )
+        logger = create_logger("test.log_rotation", handler)
+        for number in range(30):
+            logger.info("Message %d", number)
+
+        query = LogQuery()
+        page = search_logs(
+            str(tmp_path), "test.log", query, limit=2, index=log_index
+        )
+        assert [entry.message for entry in page.entries] == [
+            "Message 29",
+            "Message 28",
+        ]
+
+        # Rotate the current log file and wait for the compression
+        handler.doRollover()
+        handler.close()
+        files = get_log_files(str(tmp_path), "test.log")
+        assert [name == "test.log" for name, _, _ in files] == [
+            True,
+            False,
+            False,
+            False,
+        ]
+        assert all(name.endswith(".gz") for name, _, _ in files[1:])
+        assert all(
+            os.path.exists(get_timestamps_path(path))
+            for _, path, _ in files[1:]
+        )
+
+        # Cursors stay valid after rotation and compression
+        page = search_logs(
+            str(tmp_path),
+            "test.log",
+            query,
+            limit=2,
+            cursor=page.next_cursor,
+            index=log_index,
+        )
+        assert [entry.message for entry in page.entries] == [
+            "Message 27",
+            "Message 26",
+        ]
+        # Listing the files uses the stored timestamps of the segments
+
+        def open_uncompressed(path: str, seekable: bool = False):
+            assert not is_compressed(path)
+            return open_log_file(path, seekable)
+
+        monkeypatch.setattr(
+            log_index_module, "open_log_file", open_uncompressed
+        )
+        log_index.prune(set())
+        listed = log_index.list_files(str(tmp_path), "test.log")
+        assert None not in (
+            listed[1].first_timestamp,
+            listed[1].last_timestamp,
+        )
+
+        # Remove segments older than an hour
+        _, oldest_path, _ = files[-1]
+        os.utime(oldest_path, (0, 0))
+        removed = apply_retention(
+            str(tmp_path), "test.log", max_count=0, max_bytes=0, max_age=3600
+        )
+        assert removed == [files[-1][0]]
+        assert not os.path.exists(get_timestamps_path(oldest_path))
@@ -0,0 +1,505 @@
+"""Tests for measurement data routes"""
+
+# -- Imports ------------------------------------------------------------------
+
+import io
+import json
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import tables
+from pytest import fixture
+
+from icoapi.scripts import export, spectrum
+from icoapi.utils.executor import hdf5_executor
+
+# -- Fixtures -----------------------------------------------------------------
+
+
+@fixture(name="range_hdf5_file")
+def fixture_range_hdf5_file(
+    temporary_measurement_dir: Path,
+) -> Path:
+    """Create a three channel measurement file with 10 seconds of data"""
+
+    hdf5_path = temporary_measurement_dir / "range.hdf5"
+    rows = 10_000
+    with tables.open_file(str(hdf5_path), mode="w") as hdf5_file:
+        data = np.zeros(
+            rows,
+            dtype=[
+                ("counter", np.uint8),
+                ("timestamp", np.uint64),
+                ("x", np.float32),
+                ("y", np.float32),
+                ("z", np.float32),
+            ],
+        )
+        data["counter"] = np.arange(rows) % 256
+        # One row per millisecond
+        data["timestamp"] = np.arange(rows) * 1000
+        data["x"] = np.arange(rows)
+        data["y"] = -np.arange(rows)
+        hdf5_file.create_table("/", "acceleration", data)
+
+    return hdf5_path
+
+
+# -- Tests --------------------------------------------------------------------
+
+
+class TestMeasurementDataRoutes:
+    """Measurement data route test methods"""
+
+    def test_measurement_range_time_window(
+        self, client, range_hdf5_file: Path
+    ) -> None:
+        """Test endpoint ``/{name}/range`` for a time window"""
+
+        assert range_hdf5_file.is_file()
+
+        response = client.get(
+            "files/range.hdf5/range",
+            params={"start": 2.5, "end": 2.504, "channels": ["x", "z"]},
+        )
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["name"] == "range.hdf5"
+        assert body["timestamp"] == [2_500_000, 2_501_000, 2_502_000,
+                                     2_503_000, 2_504_000]
+        assert body["counter"] == [row % 256 for row in range(2500, 2505)]
+        assert [dataset["name"] for dataset in body["datasets"]] == ["x", "z"]
+        assert body["datasets"][0]["data"] == [2500, 2501, 2502, 2503, 2504]
+
+    def test_measurement_range_rows(
+        self, client, range_hdf5_file: Path
+    ) -> None:
+        """Test endpoint ``/{name}/range`` for a row range"""
+
+        assert range_hdf5_file.is_file()
+
+        response = client.get(
+            "files/range.hdf5/range",
+            params={"first_row": 9990, "stop_row": 20_000, "step": 5},
+        )
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["timestamp"] == [9_990_000, 9_995_000]
+        assert [dataset["name"] for dataset in body["datasets"]] == [
+            "x", "y", "z"
+        ]
+        assert body["datasets"][1]["data"] == [-9990, -9995]
+
+    def test_measurement_range_outside(
+        self, client, range_hdf5_file: Path
+    ) -> None:
+        """Test endpoint ``/{name}/range`` for a window without data"""
+
+        assert range_hdf5_file.is_file()
+
+        response = client.get(
+            "files/range.hdf5/range", params={"start": 20, "end": 30}
+        )
+
+        assert response.status_code == 200
+        assert response.json()["timestamp"] == []
+
+    def test_measurement_range_invalid(
+        self, client, range_hdf5_file: Path
+    ) -> None:
+        """Test endpoint ``/{name}/range`` for invalid requests"""
+
+        assert range_hdf5_file.is_file()
+
+        for params in (
+            {"start": 2, "end": 1},
+            {"start": 1, "first_row": 10},
+            {"channels": ["unknown"]},
+        ):
+            response = client.get("files/range.hdf5/range", params=params)
+            assert response.status_code == 400
+            assert response.json() == {
+                "detail": "Invalid data range or channel selection."
+            }
+
+        response = client.get("files/missing.hdf5/range")
+        assert response.status_code == 404
+
+    def test_measurement_overview(
+        self, client, range_hdf5_file: Path
+    ) -> None:
+        """Test endpoint ``/{name}/overview`` for the whole measurement"""
+
+        response = client.get(
+            "files/range.hdf5/overview",
+            params={"width": 10, "channels": ["x"]},
+        )
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["rows_per_point"] == 1024
+        assert len(body["timestamp"]) == 10
+        assert body["timestamp"][:2] == [0, 1_024_000]
+        [dataset] = body["datasets"]
+        assert dataset["name"] == "x"
+        assert dataset["minimum"][:2] == [0, 1024]
+        assert dataset["maximum"][:2] == [1023, 2047]
+        assert dataset["mean"][0] == 511.5
+        assert dataset["maximum"][-1] == 9999
+
+        overview_path = (
+            range_hdf5_file.parent / ".cache" / "range.hdf5.overview.npz"
+        )
+        assert overview_path.is_file()
+        assert [
+            file["name"] for file in client.get("files").json()["files"]
+        ] == ["range.hdf5"]
+
+        response = client.delete("files/range.hdf5")
+        assert response.status_code == 200
+        assert not overview_path.exists()
+
+    def test_measurement_overview_time_window(
+        self, client, range_hdf5_file: Path
+    ) -> None:
+        """Test endpoint ``/{name}/overview`` for a short time window"""
+
+        assert range_hdf5_file.is_file()
+
+        response = client.get(
+            "files/range.hdf5/overview",
+            params={"start": 2.5, "end": 2.504, "channels": ["y"]},
+        )
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["rows_per_point"] == 1
+        assert body["timestamp"] == [2_500_000, 2_501_000, 2_502_000,
+                                     2_503_000, 2_504_000]
+        [dataset] = body["datasets"]
+        values = [-2500, -2501, -2502, -2503, -2504]
+        assert dataset["minimum"] == dataset["maximum"] == values
+        assert dataset["mean"] == values
+
+    def test_measurement_overview_invalid(
+        self, client, range_hdf5_file: Path
+    ) -> None:
+        """Test endpoint ``/{name}/overview`` for invalid requests"""
+
+        assert range_hdf5_file.is_file()
+
+        for params in ({"start": 2, "end": 1}, {"channels": ["unknown"]}):
+            response = client.get("files/range.hdf5/overview", params=params)
+            assert response.status_code == 400
+
+        response = client.get(
+            "files/range.hdf5/overview", params={"width": 0}
+        )
+        assert response.status_code == 422
+
+    def test_measurement_summary(
+        self, client, range_hdf5_file: Path
+    ) -> None:
+        """Test endpoint ``/{name}/summary`` and summary in file list"""
+
+        assert range_hdf5_file.is_file()
+
+        response = client.get("files/range.hdf5/summary")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["rows"] == 10_000
+        assert body["duration"] == 9.999
+        assert body["dataloss"] == 0
+        x, y, z = body["channels"]
+        assert (x["minimum"], x["maximum"], x["mean"]) == (0, 9999, 4999.5)
+        assert y["peak"] == 9999
+        assert abs(x["percentiles"]["50"] - 4999.5) < 10
+        assert z["rms"] == 0
+        assert z["crest_factor"] is None
+        assert z["dominant_frequency"] is None
+        assert [density["name"] for density in body["psd"]] == ["x", "y", "z"]
+
+        [details] = client.get("files").json()["files"]
+        assert details["summary"]["rows"] == 10_000
+        assert "psd" not in details["summary"]
+
+        # Statistics of changed measurement data are outdated
+        with tables.open_file(str(range_hdf5_file), mode="a") as hdf5_file:
+            table = hdf5_file.root.acceleration
+            table.append(table[:10])
+        [details] = client.get("files").json()["files"]
+        assert details["summary"] is None
+
+        response = client.get("files/range.hdf5/summary")
+        assert response.status_code == 200
+        assert response.json()["rows"] == 10_010
+        [details] = client.get("files").json()["files"]
+        assert details["summary"]["rows"] == 10_010
+
+    def test_measurement_summary_dominant_frequency(
+        self, client, temporary_measurement_dir: Path
+    ) -> None:
+        """Test the dominant frequency of a sine wave with data loss"""
+
+        rows = 20_000
+        data = np.zeros(
+            rows,
+            dtype=[
+                ("counter", np.uint8),
+                ("timestamp", np.uint64),
+                ("x", np.float32),
+            ],
+        )
+        # One row per millisecond and every tenth message lost
+        data["counter"] = np.arange(rows) % 256
+        data["timestamp"] = np.arange(rows) * 1000
+        data["x"] = np.sin(2 * np.pi * 125 * np.arange(rows) / 1000)
+        data = data[np.arange(rows) % 10 != 0]
+        with tables.open_file(
+            str(temporary_measurement_dir / "sine.hdf5"), mode="w"
+        ) as hdf5_file:
+            hdf5_file.create_table("/", "acceleration", data)
+
+        response = client.get("files/sine.hdf5/summary")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert abs(body["dataloss"] - 0.1) < 0.001
+        assert abs(body["sample_rate"] - 1000) < 1
+        [x] = body["channels"]
+        assert abs(x["dominant_frequency"] - 125) < 2
+        assert abs(x["rms"] - 1 / np.sqrt(2)) < 0.01
+
+    def test_measurement_spectrum(
+        self, client, range_hdf5_file: Path
+    ) -> None:
+        """Test endpoint ``/{name}/spectrum``"""
+
+        with tables.open_file(str(range_hdf5_file), mode="a") as hdf5_file:
+            table = hdf5_file.root.acceleration
+            table.modify_column(
+                column=np.sin(2 * np.pi * 100 * np.arange(table.nrows) / 1000),
+                colname="z",
+            )
+
+        response = client.get(
+            "files/range.hdf5/spectrum",
+            params={
+                "start": 1,
+                "end": 3,
+                "channels": ["z"],
+                "segment_length": 200,
+                "window": "hamming",
+            },
+        )
+
+        assert response.status_code == 200
+        body = response.json()
+        # 2001 rows contain 19 segments of 200 rows with 100 rows overlap
+        assert body["segments"] == 19
+        assert len(body["frequencies"]) == 101
+        assert body["frequencies"][1] == 5
+        [dataset] = body["datasets"]
+        assert dataset["name"] == "z"
+        assert body["frequencies"][np.argmax(dataset["data"])] == 100
+
+        for params in (
+            {"start": 1, "end": 1.1},
+            {"segment_length": 20_000},
+            {"channels": ["unknown"]},
+        ):
+            response = client.get("files/range.hdf5/spectrum", params=params)
+            assert response.status_code == 400
+
+        response = client.get(
+            "files/range.hdf5/spectrum", params={"window": "unknown"}
+        )
+        assert response.status_code == 422
+
+    def test_measurement_spectrogram(
+        self, client, range_hdf5_file: Path
+    ) -> None:
+        """Test endpoint ``/{name}/spectrogram``"""
+
+        assert range_hdf5_file.is_file()
+
+        response = client.get(
+            "files/range.hdf5/spectrogram",
+            params={
+                "channels": ["x", "y"],
+                "segment_length": 100,
+                "overlap": 0,
+                "columns": 30,
+            },
+        )
+
+        assert response.status_code == 200
+        body = response.json()
+        # 100 segments, 4 segments per column
+        assert body["segments_per_column"] == 4
+        assert len(body["timestamp"]) == 25
+        assert body["timestamp"][:2] == [0, 400_000]
+        assert len(body["frequencies"]) == 51
+        assert [dataset["name"] for dataset in body["datasets"]] == ["x", "y"]
+        assert len(body["datasets"][0]["data"]) == 25
+        assert len(body["datasets"][0]["data"][0]) == 51
+
+    def test_measurement_spectrogram_limits(
+        self, client, range_hdf5_file: Path, monkeypatch
+    ) -> None:
+        """Test memory limits of endpoint ``/{name}/spectrogram``"""
+
+        assert range_hdf5_file.is_file()
+        # Transform the segments in batches of three segments
+        monkeypatch.setattr(spectrum, "SPECTRUM_BATCH_VALUES", 300)
+        monkeypatch.setattr(spectrum, "SPECTROGRAM_MAX_VALUES", 51 * 10)
+
+        response = client.get(
+            "files/range.hdf5/spectrogram",
+            params={
+                "channels": ["x"],
+                "segment_length": 100,
+                "overlap": 0,
+                "columns": 30,
+            },
+        )
+
+        assert response.status_code == 200
+        body = response.json()
+        # The number of columns is reduced to 10
+        assert body["segments_per_column"] == 10
+        assert len(body["datasets"][0]["data"]) == 10
+
+        response = client.get(
+            "files/range.hdf5/spectrogram", params={"overlap": 0.99}
+        )
+        assert response.status_code == 422
+
+    def test_measurement_download(self, client, range_hdf5_file: Path) -> None:
+        """Test range and conditional requests for measurement files"""
+
+        content = range_hdf5_file.read_bytes()
+        url = f"files/{range_hdf5_file.name}"
+
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.content == content
+        etag = response.headers["etag"]
+
+        response = client.get(url, headers={"Range": "bytes=-100"})
+        assert response.status_code == 206
+        assert response.content == content[-100:]
+
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+
+        response = client.get(
+            url, headers={"If-Modified-Since": "Thu, 01 Jan 1970 00:00:00 GMT"}
+        )
+        assert response.status_code == 200
+
+    def test_measurement_export(
+        self, client, range_hdf5_file: Path
+    ) -> None:
+        """Test endpoint ``/{name}/export`` for CSV and NumPy files"""
+
+        with tables.open_file(str(range_hdf5_file), mode="a") as hdf5_file:
+            hdf5_file.root.acceleration.attrs["pre_metadata"] = json.dumps(
+                {"version": "1", "profile": "test", "parameters": {}}
+            )
+
+        response = client.get("files/range.hdf5/export?format=csv")
+
+        assert response.status_code == 200
+        assert "range.csv" in response.headers["content-disposition"]
+        lines = response.text.splitlines()
+        metadata = json.loads(lines[0].removeprefix("# "))
+        assert metadata["attributes"]["pre_metadata"]["profile"] == "test"
+        assert lines[1:4:2] == ["counter,timestamp,x,y,z", "1,1000,1.0,-1.0,0.0"]
+        assert len(lines) == 10_002
+
+        export_path = range_hdf5_file.parent / ".cache/range.hdf5.export.npz"
+        for _ in range(2):
+            response = client.get("files/range.hdf5/export?format=npz")
+            assert response.status_code == 200
+            # Repeated downloads use the stored export
+            modified = export_path.stat().st_mtime_ns
+            assert modified == range_hdf5_file.stat().st_mtime_ns
+
+        with np.load(export_path) as data:
+            rows = data["acceleration"].tolist()  # pylint: disable=no-member
+            assert json.loads(str(data["metadata"]))["sensors"] == []
+        assert rows[-1] == (9999 % 256, 9_999_000, 9999, -9999, 0)
+
+        response = client.get("files/range.hdf5/export?format=xlsx")
+        assert response.status_code == 422
+
+    def test_measurement_export_blocks(
+        self, client, range_hdf5_file: Path, monkeypatch
+    ) -> None:
+        """Check that other HDF5 operations run during an export"""
+
+        assert range_hdf5_file.is_file()
+
+        monkeypatch.setattr(export, "EXPORT_BLOCK", 1000)
+        read_blocks = export.read_blocks
+        checks: list[bool] = []
+
+        def read_blocks_and_check(source: export.ExportSource):
+            for rows in read_blocks(source):
+                # This times out, if the export occupies the HDF5 executor
+                checks.append(
+                    hdf5_executor.submit(
+                        tables.is_hdf5_file, source.file_path
+                    ).result(timeout=10)
+                )
+                yield rows
+
+        monkeypatch.setattr(export, "read_blocks", read_blocks_and_check)
+
+        response = client.get("files/range.hdf5/export?format=npz")
+
+        assert response.status_code == 200
+        assert checks == [True] * 10
+        with np.load(io.BytesIO(response.content)) as data:
+            rows = data["acceleration"].tolist()  # pylint: disable=no-member
+        assert [row[2] for row in rows] == list(range(10_000))
+
+    def test_measurement_archive(
+        self, client, range_hdf5_file: Path
+    ) -> None:
+        """Test endpoint ``/archive``"""
+
+        with tables.open_file(str(range_hdf5_file), mode="a") as hdf5_file:
+            hdf5_file.root.acceleration.attrs["tool_name"] = "Tool"
+        (range_hdf5_file.parent / "analyze.hdf5").write_bytes(b"Analyze")
+
+        def get_archived_names(**params) -> list[str]:
+            response = client.get("files/archive", params=params)
+            assert response.status_code == 200
+            assert response.headers["content-type"] == "application/zip"
+            with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+                return archive.namelist()
+
+        assert get_archived_names() == ["analyze.hdf5", "range.hdf5"]
+        assert get_archived_names(tool_name="Tool") == ["range.hdf5"]
+        assert get_archived_names(names=["analyze.hdf5"]) == ["analyze.hdf5"]
+        assert get_archived_names(start="2000-01-01T00:00:00Z") == [
+            "analyze.hdf5",
+            "range.hdf5",
+        ]
+
+        response = client.get("files/archive", params={"end": "2000-01-01"})
+        assert response.status_code == 404
+        response = client.get("files/archive", params={"names": ["missing.hdf5"]})
+        assert response.status_code == 404
+
+        with zipfile.ZipFile(
+            io.BytesIO(client.get("files/archive").content)
+        ) as archive:
+            assert archive.read("range.hdf5") == range_hdf5_file.read_bytes()
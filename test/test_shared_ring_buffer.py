@@ -0,0 +1,99 @@
+"""Tests for the shared memory ring buffer"""
+
+# -- Imports ------------------------------------------------------------------
+
+import multiprocessing
+from time import monotonic
+
+import numpy as np
+from pytest import raises
+
+from icoapi.utils.shared_ring_buffer import SharedRingBuffer
+
+# -- Functions ----------------------------------------------------------------
+
+
+def create_records(dtype: np.dtype, start: int, number: int) -> np.ndarray:
+    """Create ring buffer records with increasing timestamps"""
+
+    records = np.zeros(number, dtype=dtype)
+    records["timestamp"] = np.arange(start, start + number)
+    records["counter"] = records["timestamp"] % 256
+    records["first"] = records["timestamp"] / 2
+    records["second"] = np.nan
+    records["third"] = np.nan
+    return records
+
+
+def write_records(
+    name: str, dtype: np.dtype, number: int, block: int
+) -> None:
+    """Write records into an existing ring buffer (in a child process)"""
+
+    buffer = SharedRingBuffer.attach(name, dtype)
+    written = 0
+    while written < number:
+        written += buffer.write(
+            create_records(dtype, written, min(block, number - written))
+        )
+    buffer.close()
+
+
+# -- Classes ------------------------------------------------------------------
+
+
+class TestSharedRingBuffer:
+    """Shared ring buffer test methods"""
+
+    def test_invalid_capacity(self, ring_buffer) -> None:
+        """Test creating a buffer without capacity"""
+
+        with raises(ValueError):
+            SharedRingBuffer.create(0, ring_buffer.dtype)
+
+    def test_wrap_around(self, ring_buffer) -> None:
+        """Test reading and writing records across the end of the buffer"""
+
+        dtype = ring_buffer.dtype
+        assert ring_buffer.write(create_records(dtype, 0, 7)) == 7
+        assert ring_buffer.read(5)["timestamp"].tolist() == [0, 1, 2, 3, 4]
+        assert ring_buffer.write(create_records(dtype, 7, 6)) == 6
+        assert ring_buffer.available() == 8
+
+        records = ring_buffer.read()
+        assert records["timestamp"].tolist() == list(range(5, 13))
+        assert np.isnan(records["second"]).all()
+        assert ring_buffer.dropped == 0
+
+    def test_full_buffer_drops_records(self, ring_buffer) -> None:
+        """Test that the writer never overwrites unread records"""
+
+        dtype = ring_buffer.dtype
+        assert ring_buffer.write(create_records(dtype, 0, 8)) == 8
+        assert ring_buffer.write(create_records(dtype, 8, 8)) == 2
+        assert ring_buffer.dropped == 6
+        assert ring_buffer.read()["timestamp"].tolist() == list(range(10))
+
+    def test_other_process(self, ring_buffer) -> None:
+        """Test reading records written by another process"""
+
+        number = 1000
+        context = multiprocessing.get_context("spawn")
+        process = context.Process(
+            target=write_records,
+            args=(ring_buffer.name, ring_buffer.dtype, number, 3),
+        )
+        process.start()
+
+        timestamps: list[float] = []
+        deadline = monotonic() + 60
+        while len(timestamps) < number:
+            assert monotonic() < deadline, "Timeout while reading records"
+            assert process.exitcode in (None, 0)
+            timestamps.extend(ring_buffer.read()["timestamp"].tolist())
+        process.join(timeout=10)
+
+        assert process.exitcode == 0
+
+        assert timestamps == list(range(number))
+        assert ring_buffer.available() == 0